@@ -39,8 +39,35 @@
 # ###########################################################################
 
 import os
-from datetime import datetime
-from flask import Flask, render_template, jsonify
+import gzip
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict, namedtuple
+from flask import (
+    Flask,
+    Response,
+    render_template,
+    jsonify,
+    send_file,
+    abort,
+    request,
+)
+from werkzeug.utils import safe_join
+
+from src.utils import find_stored_file, read_stored_file
+from src.manifest import ReportManifest
+from src.timeseries import MetricsStore, DRIFT_PREFIX, PERFORMANCE_COLS
+from src.reports import (
+    REPORTS,
+    INPUTS_DIR,
+    ASSETS_DIR,
+    report_exists,
+    load_report_inputs,
+    render_report_html,
+)
 
 
 STATIC_PATH = "apps/static"
@@ -48,6 +75,258 @@ TEMPLATE_PATH = "apps/templates"
 
 app = Flask(__name__, static_folder=STATIC_PATH, template_folder=TEMPLATE_PATH)
 
+manifest = ReportManifest(report_root=os.path.join(STATIC_PATH, "reports"))
+manifest_cache = {"stamp": None, "version": None, "reports": []}
+manifest_lock = threading.Lock()
+
+metrics_store = MetricsStore()
+metrics_cache = {"stamp": None, "df": None}
+metrics_lock = threading.Lock()
+
+etag_cache = {}
+
+REPORT_CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+
+def get_manifest_stamp():
+    """
+    Cheap change detector for the report manifest: its mtime and size, or the mtime of
+    the report directory if no manifest has been written.
+    """
+    for path in (manifest.path, manifest.report_root):
+        try:
+            stat = os.stat(path)
+            return (path, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            continue
+    return None
+
+
+def get_cached_reports():
+    """
+    Return the version of the report manifest and its entries (newest first) from an
+    in-memory cache, which is only reloaded from disk when the manifest has changed.
+    """
+    stamp = get_manifest_stamp()
+
+    with manifest_lock:
+        if stamp != manifest_cache["stamp"]:
+            loaded = manifest.load()
+            manifest_cache.update(
+                stamp=stamp,
+                version=loaded["version"],
+                reports=list(loaded["reports"].values()),
+            )
+        return manifest_cache["version"], manifest_cache["reports"]
+
+
+def get_cached_metrics():
+    """
+    Return the time-series metrics store as a pd.DataFrame from an in-memory cache, which
+    is only reloaded from disk when the store has changed.
+    """
+    try:
+        stat = os.stat(metrics_store.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stamp = None
+
+    with metrics_lock:
+        if stamp != metrics_cache["stamp"] or metrics_cache["df"] is None:
+            metrics_cache.update(stamp=stamp, df=metrics_store.load())
+        return metrics_cache["df"]
+
+
+def query_metrics(columns):
+    """Query the cached metrics store using the start, end and max_points parameters."""
+    max_points = request.args.get("max_points", default=500, type=int)
+    if max_points < 1:
+        abort(400, description="max_points must be at least 1")
+
+    return MetricsStore.query(
+        get_cached_metrics(),
+        columns=columns,
+        start=request.args.get("start"),
+        end=request.args.get("end"),
+        max_points=max_points,
+    )
+
+
+def paginate(items, default_page_size=None):
+    """Slice items according to the "page" (1-based) and "page_size" query parameters."""
+    page = request.args.get("page", default=1, type=int)
+    page_size = request.args.get("page_size", default=default_page_size, type=int)
+
+    if page_size is None:
+        return items, page, len(items)
+
+    page, page_size = max(page, 1), max(page_size, 1)
+    start = (page - 1) * page_size
+    return items[start : start + page_size], page, page_size
+
+
+RenderedReport = namedtuple("RenderedReport", ["content", "etag"])
+
+
+class RenderedReportCache:
+    """A size-bounded, thread-safe LRU cache of lazily rendered reports.
+
+    Reports from headless batches are only rendered when they are first opened. Renders
+    are kept gzip-compressed in memory and the least recently used ones are evicted once
+    the cache exceeds max_bytes. Concurrent requests for the same report share one render.
+
+    Attributes:
+        max_bytes (int)
+        entries (OrderedDict): cache key -> RenderedReport, least recently used first
+        nbytes (int): total size of cached content
+        render_locks (dict): cache key -> lock held while that report is being rendered
+
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.render_locks = {}
+
+    def lookup(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+        return None
+
+    def get(self, key, render):
+        """Return the cached render for key, calling render() to produce it on a miss."""
+
+        entry = self.lookup(key)
+        if entry is not None:
+            return entry
+
+        with self.lock:
+            render_lock = self.render_locks.setdefault(key, threading.Lock())
+
+        try:
+            with render_lock:
+                entry = self.lookup(key)
+                if entry is not None:
+                    return entry
+
+                content = gzip.compress(render().encode(), mtime=0)
+                entry = RenderedReport(content, hashlib.sha256(content).hexdigest()[:32])
+
+                with self.lock:
+                    self.entries[key] = entry
+                    self.nbytes += len(content)
+                    while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                        _, evicted = self.entries.popitem(last=False)
+                        self.nbytes -= len(evicted.content)
+        finally:
+            # requests already waiting on the lock still share this render; later ones
+            # find the cached entry, so the lock is not kept around
+            with self.lock:
+                if self.render_locks.get(key) is render_lock:
+                    del self.render_locks[key]
+
+        return entry
+
+
+report_cache = RenderedReportCache(max_bytes=REPORT_CACHE_MAX_BYTES)
+
+EVENT_POLL_INTERVAL = 2
+EVENT_HEARTBEAT_INTERVAL = 15
+# streams are closed after this many seconds and browsers reconnect after the retry
+# delay, so that each open dashboard does not hold a server thread indefinitely
+EVENT_STREAM_MAX_LIFETIME = 600
+EVENT_RETRY_MS = 5000
+EVENT_MAX_CONNECTIONS = 32
+event_slots = threading.BoundedSemaphore(EVENT_MAX_CONNECTIONS)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def get_etag(path):
+    """Return a strong ETag for a file, cached by path, mtime, and size."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+
+    if key not in etag_cache:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        etag_cache[key] = digest.hexdigest()[:32]
+
+    return etag_cache[key]
+
+
+def send_stored_file(path, immutable=False):
+    """
+    Serve a file that may be stored precompressed, picking the best variant the client
+    accepts and setting a matching Content-Encoding. Responses carry a strong ETag and
+    support conditional requests. Immutable files and requests for a versioned URL (with
+    a "v" query parameter) are cached as immutable; otherwise clients must revalidate.
+    """
+    variants = find_stored_file(path)
+    if not variants:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    encoding = next(
+        (enc for enc in ("br", "gzip") if enc in variants and enc in request.accept_encodings),
+        "identity" if "identity" in variants else None,
+    )
+
+    if encoding is None:
+        # client accepts no stored encoding; decompress a stored variant on the fly
+        try:
+            source, content = read_stored_file(variants)
+        except LookupError:
+            abort(406)
+        response = Response(content, mimetype=mimetype)
+        response.set_etag(f"{get_etag(variants[source])}-identity")
+        response.make_conditional(request)
+    else:
+        response = send_file(
+            variants[encoding],
+            mimetype=mimetype,
+            download_name=os.path.basename(path),
+            etag=f"{get_etag(variants[encoding])}-{encoding}",
+            conditional=True,
+        )
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    return set_cache_headers(response, immutable)
+
+
+def send_rendered_report(entry):
+    """Serve a report from the RenderedReportCache, negotiating gzip encoding."""
+    if "gzip" in request.accept_encodings:
+        response = Response(entry.content, mimetype="text/html")
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(f"{entry.etag}-gzip")
+    else:
+        response = Response(gzip.decompress(entry.content), mimetype="text/html")
+        response.set_etag(f"{entry.etag}-identity")
+
+    response.make_conditional(request)
+
+    return set_cache_headers(response)
+
+
+def set_cache_headers(response, immutable=False):
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL
+        if immutable or "v" in request.args
+        else REVALIDATE_CACHE_CONTROL
+    )
+
+    return response
+
 
 @app.route("/")
 def hello_world():
@@ -56,13 +335,132 @@ def hello_world():
 
 @app.route("/get_report_dates", methods=["GET"])
 def get_report_dates():
-    report_dates = sorted(
-        os.listdir(os.path.join(STATIC_PATH, "reports")),
-        key=lambda date: datetime.strptime(date.split("_")[0], "%m-%d-%Y"),
-        reverse=True,
+    _, all_reports = get_cached_reports()
+    reports, _, _ = paginate(all_reports)
+    return jsonify([report["key"] for report in reports])
+
+
+@app.route("/get_reports", methods=["GET"])
+def get_reports():
+    version, all_reports = get_cached_reports()
+    reports, page, page_size = paginate(all_reports, default_page_size=50)
+    return jsonify(
+        {
+            "version": version,
+            "page": page,
+            "page_size": page_size,
+            "total": len(all_reports),
+            "reports": reports,
+        }
     )
-    return jsonify(report_dates)
+
+
+@app.route("/reports/<date>/<report>", methods=["GET"])
+def get_report(date, report):
+    """
+    Serve a report HTML file. Reports built in headless mode are rendered from their
+    stored inputs the first time they are requested and kept in an LRU cache.
+    """
+    report_dir = safe_join(STATIC_PATH, "reports", date)
+    report_name = report.replace("_report.html", "")
+
+    if report_dir is None or report_name not in REPORTS:
+        abort(404)
+
+    if report_exists(report_dir, report_name):
+        return send_stored_file(os.path.join(report_dir, report))
+
+    inputs_dir = os.path.join(report_dir, INPUTS_DIR)
+    if not os.path.isdir(inputs_dir):
+        abort(404)
+
+    # inputs are rewritten if a batch is regenerated, which invalidates cached renders
+    key = (
+        report_dir,
+        report_name,
+        os.stat(os.path.join(inputs_dir, "current.npz")).st_mtime_ns,
+    )
+    entry = report_cache.get(
+        key,
+        lambda: render_report_html(report_name, *load_report_inputs(report_dir)),
+    )
+
+    return send_rendered_report(entry)
+
+
+@app.route("/api/drift", methods=["GET"])
+def get_drift_timeseries():
+    """Per-feature drift scores and dataset-level drift metrics across batches."""
+    df = get_cached_metrics()
+    columns = [col for col in df.columns if col.startswith(DRIFT_PREFIX)] + [
+        "share_drifted_features",
+        "target_drift",
+        "prediction_drift",
+    ]
+    return jsonify(query_metrics(columns))
+
+
+@app.route("/api/performance", methods=["GET"])
+def get_performance_timeseries():
+    """Regression performance metrics across batches."""
+    return jsonify(query_metrics(PERFORMANCE_COLS))
+
+
+@app.route("/assets/<filename>", methods=["GET"])
+def get_asset(filename):
+    """Serve the shared report assets, which are versioned by file name."""
+    path = safe_join(ASSETS_DIR, filename)
+    if path is None:
+        abort(404)
+    return send_stored_file(path, immutable=True)
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    """
+    Server-sent event stream that notifies open dashboards when the report manifest
+    changes, so new reports show up without restarting the application. The manifest is
+    polled cheaply by mtime; a comment line is sent periodically to keep the connection
+    alive.
+
+    Each stream ends after EVENT_STREAM_MAX_LIFETIME seconds, after which the browser
+    reconnects, and at most EVENT_MAX_CONNECTIONS streams are open at once; further
+    requests are answered with 503 and retried by the browser.
+    """
+
+    if not event_slots.acquire(blocking=False):
+        response = Response(status=503)
+        response.headers["Retry-After"] = str(EVENT_RETRY_MS // 1000)
+        return response
+
+    def stream():
+        last_version, last_sent = None, 0
+        expires = time.monotonic() + EVENT_STREAM_MAX_LIFETIME
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+
+        while time.monotonic() < expires:
+            version, reports = get_cached_reports()
+
+            if version != last_version:
+                last_version, last_sent = version, time.monotonic()
+                payload = json.dumps({"version": version, "total": len(reports)})
+                yield f"event: manifest\ndata: {payload}\n\n"
+            elif time.monotonic() - last_sent > EVENT_HEARTBEAT_INTERVAL:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+
+            time.sleep(EVENT_POLL_INTERVAL)
+
+    response = Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(event_slots.release)
+    return response
 
 
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=os.environ.get("CDSW_READONLY_PORT"))
+    app.run(
+        host="127.0.0.1", port=os.environ.get("CDSW_READONLY_PORT"), threaded=True
+    )
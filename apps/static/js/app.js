@@ -40,51 +40,158 @@
  * ***************************************************************************
  */
 
-// get report dates from Flask server route
+// get report dates from Flask server route one page at a time
 // and save to variable
 const reportDates = [];
+const reportVersions = {};
+const reportPageSize = 100;
+let reportPage = 0;
+let reportTotal = 0;
+let manifestVersion = null;
 
 const fetchReportDates = async () => {
     try {
-        const response = await axios.get('/get_report_dates')
+        const response = await axios.get('/get_reports', {
+            params: {page: reportPage + 1, page_size: reportPageSize}
+        })
         console.log("I FINISHED FETCHING REPORT DATES")
-        reportDates.push.apply(reportDates, response.data)
+        reportPage = response.data.page
+        reportTotal = response.data.total
+        manifestVersion = response.data.version
+        const newDates = response.data.reports.map(report => report.key)
+        for (const report of response.data.reports) {
+            reportVersions[report.key] = report.updated_at
+        }
+        reportDates.push.apply(reportDates, newDates)
+        return newDates
     } catch (e) {
         console.log('Error getting dates from server.')
+        return []
     }
 }
 
 // dynamically set form-select options with report dates
 let dateSelect = document.querySelector("#dateRangeSelector");
+const loadMoreValue = '__load_more__'
 
-const populateDateSelect = () => {
-    for (const [i, date] of reportDates.entries()) {
+const populateDateSelect = (dates) => {
+    const loadMoreOption = dateSelect.querySelector(`option[value='${loadMoreValue}']`)
+    if (loadMoreOption) {
+        loadMoreOption.remove()
+    }
+    for (const date of dates) {
         const newOption = document.createElement("option");
         newOption.text = date.replaceAll('-', '/').replaceAll('_', ' - ')
         newOption.value = date
-        if (i===0){
+        if (dateSelect.options.length === 0){
             newOption.setAttribute("selected", "selected")
         }
         dateSelect.appendChild(newOption)
     }
+    if (reportDates.length < reportTotal) {
+        const newOption = document.createElement("option");
+        newOption.text = 'Load older reports...'
+        newOption.value = loadMoreValue
+        dateSelect.appendChild(newOption)
+    }
     console.log('FINISHED POPULATING DATE SELECTOR')
 }
 
+// insert report dates that were added to the manifest since the dashboard loaded
+// (newest first) without changing the current selection
+const refreshReportDates = async () => {
+    try {
+        const response = await axios.get('/get_reports', {
+            params: {page: 1, page_size: reportPageSize}
+        })
+        reportTotal = response.data.total
+        manifestVersion = response.data.version
+        const newDates = []
+        for (const report of response.data.reports) {
+            reportVersions[report.key] = report.updated_at
+            if (!reportDates.includes(report.key)) {
+                newDates.push(report.key)
+            }
+        }
+        reportDates.unshift.apply(reportDates, newDates)
+        for (const date of newDates.reverse()) {
+            const newOption = document.createElement("option");
+            newOption.text = date.replaceAll('-', '/').replaceAll('_', ' - ')
+            newOption.value = date
+            dateSelect.insertBefore(newOption, dateSelect.firstChild)
+        }
+        if (displayedDate === null && reportDates.length > 0) {
+            dateSelect.value = reportDates[0]
+            updateReportUrl(getActiveDate(), getActiveReport())
+        }
+        console.log(`ADDED ${newDates.length} NEW REPORT DATES`)
+    } catch (e) {
+        console.log('Error refreshing dates from server.')
+    }
+}
+
+// listen for report manifest updates pushed by the server
+const listenForReports = () => {
+    const source = new EventSource('/events')
+    source.addEventListener('manifest', function (event) {
+        if (JSON.parse(event.data).version !== manifestVersion) {
+            refreshReportDates()
+            drawTrendChart()
+        }
+    })
+}
+
+// draw a trend chart of metrics across all batches from a single small request
+let trendChart = null;
+const trendSelect = document.querySelector("#trendSelector");
+
+const drawTrendChart = async () => {
+    try {
+        const response = await axios.get(`/api/${trendSelect.value}`)
+        const labels = response.data.start
+        const datasets = Object.entries(response.data.series).map(([name, values]) => ({
+            label: name.replace('drift.', ''),
+            data: values,
+            spanGaps: true,
+        }))
+        if (trendChart !== null) {
+            trendChart.destroy()
+        }
+        trendChart = new Chart(document.querySelector('#trendChart'), {
+            type: 'line',
+            data: {labels: labels, datasets: datasets},
+            options: {interaction: {mode: 'index', intersect: false}},
+        })
+    } catch (e) {
+        console.log('Error getting trend metrics from server.')
+    }
+}
+
+trendSelect.addEventListener('change', drawTrendChart)
+
 // async-await to setup dashboard
 // fetching report dates needs time
 const setupDashboard = async () => {
-    await fetchReportDates()
-    populateDateSelect()
+    populateDateSelect(await fetchReportDates())
 
     const currentDateSelection = getActiveDate()
     const currentReportSelection = getActiveReport()
-    updateReportUrl(currentDateSelection, currentReportSelection)
+    if (currentDateSelection) {
+        updateReportUrl(currentDateSelection, currentReportSelection)
+    }
+    listenForReports()
+    drawTrendChart()
 }
 
 setupDashboard()
 
 // update reportDisplay on new date selection event
-dateSelect.addEventListener('change', function (event){
+dateSelect.addEventListener('change', async function (event){
+    if (event.target.value === loadMoreValue) {
+        populateDateSelect(await fetchReportDates())
+        dateSelect.value = displayedDate
+        return
+    }
     const currentDateSelection = event.target.value
     const currentReportSelection = getActiveReport()
     updateReportUrl(currentDateSelection, currentReportSelection)
@@ -110,8 +217,12 @@ const getActiveReport  = () => {
 
 // helper function that updates iframe source
 // this gets called inside each eventListener
+let displayedDate = null;
+
 const updateReportUrl = function (date, report) {
     console.log('UPDATED THE REPORT URL SRC.')
-    const reportUrl = `static/reports/${date}/${report}`
+    displayedDate = date
+    // versioned report URLs can be cached by the browser indefinitely
+    const reportUrl = `reports/${date}/${report}?v=${reportVersions[date]}`
     document.querySelector('div#reportDisplay iframe').src = reportUrl;
 }
\ No newline at end of file
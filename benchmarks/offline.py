@@ -0,0 +1,137 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+"""
+Local stand-ins for the CML-only `cml` and `cmlapi` modules, so the scripts and classes
+of this project can be benchmarked fully offline. The stand-ins keep tracked metrics in
+memory and mimic the response shapes of the CML Model Metrics API.
+"""
+
+import sys
+import uuid
+import types
+import functools
+
+# prediction UUID -> {"metrics": {...}} for every call to a cml_model decorated function
+METRIC_STORE = {}
+
+_current_prediction = types.SimpleNamespace(uuid=None)
+
+
+def track_metric(key, value):
+    METRIC_STORE[_current_prediction.uuid]["metrics"][key] = value
+
+
+def track_delayed_metrics(metrics, prediction_uuid):
+    METRIC_STORE[prediction_uuid]["metrics"].update(metrics)
+
+
+def read_metrics(model_deployment_crn=None, **kwargs):
+    return {
+        "metrics": [
+            {"predictionUuid": prediction_uuid, **record}
+            for prediction_uuid, record in METRIC_STORE.items()
+        ]
+    }
+
+
+def cml_model(metrics=False):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            _current_prediction.uuid = str(uuid.uuid4())
+            METRIC_STORE[_current_prediction.uuid] = {"metrics": {}}
+            return {"uuid": _current_prediction.uuid, "prediction": func(*args, **kwargs)}
+
+        return wrapper
+
+    return decorator
+
+
+def call_model(model_access_key, ipt):
+    raise RuntimeError("Deployed models are not available offline.")
+
+
+class ApiException(Exception):
+    pass
+
+
+def default_client():
+    raise RuntimeError("The CML APIv2 is not available offline.")
+
+
+def install():
+    """Register the stand-ins under the `cml` and `cmlapi` module names."""
+
+    metrics_v1 = types.ModuleType("cml.metrics_v1")
+    metrics_v1.track_metric = track_metric
+    metrics_v1.track_delayed_metrics = track_delayed_metrics
+    metrics_v1.read_metrics = read_metrics
+
+    models_v1 = types.ModuleType("cml.models_v1")
+    models_v1.cml_model = cml_model
+    models_v1.call_model = call_model
+
+    cml = types.ModuleType("cml")
+    cml.metrics_v1 = metrics_v1
+    cml.models_v1 = models_v1
+
+    rest = types.ModuleType("cmlapi.rest")
+    rest.ApiException = ApiException
+
+    cmlapi = types.ModuleType("cmlapi")
+    cmlapi.default_client = default_client
+    cmlapi.rest = rest
+
+    sys.modules.update(
+        {
+            "cml": cml,
+            "cml.metrics_v1": metrics_v1,
+            "cml.models_v1": models_v1,
+            "cmlapi": cmlapi,
+            "cmlapi.rest": rest,
+        }
+    )
+
+
+def reset():
+    """Clear all tracked metrics."""
+
+    METRIC_STORE.clear()
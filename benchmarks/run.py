@@ -0,0 +1,510 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+"""
+Benchmark the hot paths of the project at several data sizes, fully offline.
+
+Each stage is timed on data resampled from data/raw/kc_house_data.csv to each size, in a
+temporary working directory, with local stand-ins for the CML-only modules (see
+benchmarks/offline.py). Results - median seconds per stage and size, and the scaling
+exponent fitted across sizes - are saved as JSON, and can be compared with a saved
+baseline to fail when a stage regresses beyond a threshold.
+
+Usage (from the project root):
+
+    # record a baseline on this machine
+    python benchmarks/run.py --save-baseline
+
+    # later, fail (exit code 1) if any stage is more than 25% slower than the baseline
+    python benchmarks/run.py --compare benchmarks/results/baseline.json --threshold 0.25
+"""
+
+import os
+import sys
+import json
+import time
+import runpy
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from benchmarks import offline
+
+offline.install()
+
+RAW_PATH = "data/raw/kc_house_data.csv"
+RESULTS_DIR = "benchmarks/results"
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+DEFAULT_SIZES = [2500, 10000, 40000]
+DEFAULT_REPEATS = 3
+DEFAULT_THRESHOLD = 0.25
+
+# stages faster than this are dominated by timer noise and are never flagged as regressed
+NOISE_FLOOR_SECONDS = 0.002
+
+# number of calls used to time the latency of a single prediction
+SINGLE_PREDICT_CALLS = 50
+
+
+def resample_raw(raw, size, seed=42):
+    """Resample the raw housing data to the provided number of rows, with unique IDs."""
+
+    df = raw.sample(n=size, replace=size > len(raw), random_state=seed)
+    df["id"] = np.arange(size, dtype=np.int64) + 1_000_000_000
+    return df.reset_index(drop=True)
+
+
+def make_records(raw):
+    """
+    Add sold and listed dates to the raw data, and build the records sent to the deployed
+    model from it, as the simulation does.
+    """
+
+    from src.schema import apply_schema, to_json_records
+
+    df = raw.copy()
+    df["date_sold"] = pd.to_datetime(df.date.str[:8], format="%Y%m%d")
+    df["date_listed"] = df.date_sold - pd.Timedelta(days=30)
+    df = apply_schema(df.drop(columns=["date"]))
+
+    return df, to_json_records(df)
+
+
+def make_metrics_response(df, seed=42):
+    """
+    Build a response of the shape returned by metrics.read_metrics(), with one scored
+    record per row of df, its ground truth, and its sold date.
+    """
+
+    rng = np.random.default_rng(seed)
+    features = df[
+        [
+            "bedrooms",
+            "bathrooms",
+            "sqft_living",
+            "sqft_lot",
+            "sqft_above",
+            "waterfront",
+            "zipcode",
+            "condition",
+            "view",
+        ]
+    ].to_dict(orient="records")
+    predictions = df.price.values * rng.normal(1, 0.15, len(df))
+    sold_dates = df.date_sold.astype(str).tolist()
+
+    return {
+        "metrics": [
+            {
+                "predictionUuid": f"{i:08x}-0000-4000-8000-000000000000",
+                "startTimestampMs": 1638308471198,
+                "endTimestampMs": 1638308471199,
+                "metrics": {
+                    "input_features": feature,
+                    "predicted_result": float(prediction),
+                    "ground_truth": float(gt),
+                    "date_sold": sold_date,
+                },
+            }
+            for i, (feature, prediction, gt, sold_date) in enumerate(
+                zip(features, predictions, df.price.values, sold_dates)
+            )
+        ]
+    }
+
+
+@contextmanager
+def working_directory():
+    """Run the enclosed block from a fresh temporary directory."""
+
+    previous = os.getcwd()
+    path = tempfile.mkdtemp(prefix="benchmark_")
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run_script(name):
+    return runpy.run_path(os.path.join(ROOT, "scripts", name), run_name="__main__")
+
+
+class Context:
+    """Data and artifacts of one benchmark size, shared across the stages at that size.
+
+    Artifacts that a stage depends on (prepared data, a fitted model) are produced once,
+    on first use, and are not part of any stage's timing.
+
+    Attributes:
+        size (int): number of raw records
+        raw (pd.DataFrame): resampled raw data
+        frame (pd.DataFrame): raw data with sold and listed dates
+        records (list): records sent to the deployed model
+        metrics_response (dict): stand-in output of metrics.read_metrics()
+
+    """
+
+    def __init__(self, raw, size):
+        self.size = size
+        self.raw = resample_raw(raw, size)
+        self.frame, self.records = make_records(self.raw)
+        self.metrics_response = make_metrics_response(self.frame)
+
+        os.makedirs(os.path.dirname(RAW_PATH), exist_ok=True)
+        self.raw.to_csv(RAW_PATH, index=False)
+
+        self.prepared = False
+        self.trained = False
+
+    def prepare(self):
+        if not self.prepared:
+            run_script("prepare_data.py")
+            self.prepared = True
+
+    def train(self):
+        self.prepare()
+        if not self.trained:
+            run_script("train.py")
+            self.trained = True
+
+
+# Each stage takes a Context, performs any setup, and returns the callable to time.
+
+
+def stage_prepare_data(ctx):
+    def call():
+        run_script("prepare_data.py")
+        ctx.prepared = True
+
+    return call
+
+
+def stage_train(ctx):
+    ctx.prepare()
+
+    def call():
+        run_script("train.py")
+        ctx.trained = True
+
+    return call
+
+
+def stage_predict_single(ctx):
+    ctx.train()
+    predict = run_script("predict.py")["predict"]
+    records = ctx.records[:SINGLE_PREDICT_CALLS]
+
+    def call():
+        for record in records:
+            predict({"record": record})
+
+    call.calls = len(records)
+    return call
+
+
+def stage_predict_batch(ctx):
+    ctx.train()
+    namespace = run_script("predict.py")
+    model, from_records = namespace["model"], namespace["from_records"]
+    df = from_records(ctx.records)
+
+    return lambda: model.predict(df)
+
+
+def stage_format_metadata_for_delayed_metrics(ctx):
+    from src.simulation import Simulation
+
+    sim = Simulation.__new__(Simulation)
+    sim.master_id_uuid_mapping = {
+        id_: record["predictionUuid"]
+        for id_, record in zip(ctx.frame.id, ctx.metrics_response["metrics"])
+    }
+    date_range = [ctx.frame.date_sold.min(), ctx.frame.date_sold.max()]
+
+    return lambda: sim.format_metadata_for_delayed_metrics(
+        ctx.frame, date_range, is_train=False
+    )
+
+
+def stage_format_model_metrics_query(ctx):
+    from src.simulation import Simulation
+
+    return lambda: Simulation.format_model_metrics_query(ctx.metrics_response)
+
+
+def make_stage_build_evidently_reports(headless):
+    def stage(ctx):
+        from src.simulation import Simulation
+        from src.reference import ReferenceProfile
+
+        metrics_df = Simulation.format_model_metrics_query(ctx.metrics_response)
+        reference_profile = ReferenceProfile.from_metrics_df("benchmark", metrics_df)
+        date_range = [pd.Timestamp("2015-01-01"), pd.Timestamp("2015-02-01")]
+
+        return lambda: Simulation.build_evidently_reports(
+            reference_profile, metrics_df, date_range, headless=headless
+        )
+
+    return stage
+
+
+STAGES = {
+    "prepare_data": stage_prepare_data,
+    "train": stage_train,
+    "predict_single": stage_predict_single,
+    "predict_batch": stage_predict_batch,
+    "format_metadata_for_delayed_metrics": stage_format_metadata_for_delayed_metrics,
+    "format_model_metrics_query": stage_format_model_metrics_query,
+    "build_evidently_reports": make_stage_build_evidently_reports(headless=False),
+    "build_evidently_reports_headless": make_stage_build_evidently_reports(
+        headless=True
+    ),
+}
+
+
+def time_callable(func, repeats):
+    """Return the median wall time in seconds of repeated calls to func."""
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return float(np.median(timings)) / getattr(func, "calls", 1)
+
+
+def scaling_exponent(sizes, seconds):
+    """Fit seconds ~ size ** k across sizes and return k (1.0 is linear scaling)."""
+
+    if len(sizes) < 2 or min(seconds) <= 0:
+        return None
+    return float(np.polyfit(np.log(sizes), np.log(seconds), 1)[0])
+
+
+def run_benchmarks(sizes, stages, repeats):
+    """
+    Time each stage at each size.
+
+    Returns:
+        dict: stage -> {"sizes", "seconds", "us_per_row", "scaling_exponent"}
+
+    """
+
+    raw = pd.read_csv(os.path.join(ROOT, RAW_PATH))
+    results = {name: {"sizes": [], "seconds": []} for name in stages}
+
+    for size in sizes:
+        with working_directory():
+            ctx = Context(raw, size)
+            for name in stages:
+                func = STAGES[name](ctx)
+                seconds = time_callable(func, repeats)
+                results[name]["sizes"].append(size)
+                results[name]["seconds"].append(seconds)
+                print(f"{name:<40} size={size:<8} {seconds:.4f}s", flush=True)
+
+            offline.reset()
+
+    for name, result in results.items():
+        result["us_per_row"] = [
+            s / n * 1e6 for s, n in zip(result["seconds"], result["sizes"])
+        ]
+        result["scaling_exponent"] = scaling_exponent(
+            result["sizes"], result["seconds"]
+        )
+
+    return results
+
+
+def get_environment():
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline at every stage and size present in both.
+
+    Returns:
+        pd.DataFrame: one row per stage and size with the baseline and current seconds,
+            their ratio, and whether the stage regressed beyond the threshold
+
+    """
+
+    rows = []
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            continue
+        base = dict(
+            zip(baseline["results"][name]["sizes"], baseline["results"][name]["seconds"])
+        )
+        for size, seconds in zip(result["sizes"], result["seconds"]):
+            if size not in base:
+                continue
+            ratio = seconds / base[size] if base[size] > 0 else np.nan
+            rows.append(
+                {
+                    "stage": name,
+                    "size": size,
+                    "baseline_s": base[size],
+                    "current_s": seconds,
+                    "ratio": ratio,
+                    "regressed": bool(
+                        ratio > 1 + threshold
+                        and max(seconds, base[size]) > NOISE_FLOOR_SECONDS
+                    ),
+                }
+            )
+
+    return pd.DataFrame(
+        rows,
+        columns=["stage", "size", "baseline_s", "current_s", "ratio", "regressed"],
+    )
+
+
+def save_results(output, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Saved benchmark results to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=list(STAGES)
+    )
+    parser.add_argument("--output", help="path of the results JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="maximum allowed slowdown relative to the baseline, e.g. 0.25 for 25%%",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"also save the results as the baseline, {BASELINE_PATH}",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(sorted(args.sizes), args.stages, args.repeats)
+    output = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": get_environment(),
+        "repeats": args.repeats,
+        "results": results,
+    }
+
+    print()
+    print(
+        pd.DataFrame(
+            [
+                {
+                    "stage": name,
+                    **{
+                        f"{size}_s": seconds
+                        for size, seconds in zip(result["sizes"], result["seconds"])
+                    },
+                    "scaling_exponent": result["scaling_exponent"],
+                }
+                for name, result in results.items()
+            ]
+        ).to_string(index=False, float_format="{:.4f}".format)
+    )
+    print()
+
+    save_results(
+        output,
+        args.output
+        or os.path.join(RESULTS_DIR, f"results_{time.strftime('%Y%m%d-%H%M%S')}.json"),
+    )
+    if args.save_baseline:
+        save_results(output, BASELINE_PATH)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+        if baseline.get("environment") != output["environment"]:
+            print("WARNING: baseline was recorded in a different environment.")
+
+        comparison = compare(results, baseline, args.threshold)
+        print(comparison.to_string(index=False, float_format="{:.4f}".format))
+
+        regressed = comparison[comparison.regressed]
+        if len(regressed):
+            print(
+                f"\n{len(regressed)} stage/size combination(s) regressed by more than "
+                f"{args.threshold:.0%}: {sorted(set(regressed.stage))}"
+            )
+            return 1
+
+        print(f"\nNo stage regressed by more than {args.threshold:.0%}.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -45,16 +45,56 @@
 # cml_model decorator, enabling it to call .track_metrics()
 # to store mathematical metrics associated with each prediction
 
+# Any challenger models saved to the challengers/ directory are scored
+# in the shadow of the deployed model on every request - sharing its
+# preprocessing where possible - and their predictions are logged
+# alongside the deployed model's for comparison
+
+# Each replica also keeps sliding-window drift statistics of the records it
+# scores, against the training distributions saved by scripts/train.py. They
+# are returned - without scoring anything - for requests of the form
+# {"status": true}, which are answered by the separate status function below
+# so that polling them doesn't add records to the metric store
+
+import os
 import pickle
-import pandas as pd
 import cml.models_v1 as models
 import cml.metrics_v1 as metrics
 
-from src.utils import col_order
+from src.schema import validate_record, from_records
+from src.challengers import ShadowScorer, CHALLENGER_METRIC
+from src.online import DriftReference, OnlineDriftMonitor, DRIFT_REFERENCE_PATH
 
 with open("model.pkl", "rb") as f:
     model = pickle.load(f)
 
+scorer = ShadowScorer.from_directory(model)
+
+monitor = (
+    OnlineDriftMonitor(DriftReference.load(DRIFT_REFERENCE_PATH))
+    if os.path.exists(DRIFT_REFERENCE_PATH)
+    else None
+)
+
+
+def predict(data_input):
+
+    # Report the drift status of this replica instead of scoring a record - outside
+    # of the cml_model decorator, so that no metrics are tracked
+    if data_input.get("status"):
+        return status(data_input)
+
+    return predict_record(data_input)
+
+
+def status(data_input):
+
+    # Return the online drift status of this replica, without tracking metrics
+    if monitor is None:
+        return {"error": f"No drift reference found at {DRIFT_REFERENCE_PATH}"}
+    return monitor.status()
+
+
 # The cml_model decorator equips the predict function to
 # call .track_metrics(). It also changes the return type. If the
 # raw predict function returns a value "result", the wrapped
@@ -66,12 +106,13 @@ with open("model.pkl", "rb") as f:
 
 
 @models.cml_model(metrics=True)
-def predict(data_input):
-
-    # Convert dict representation back to dataframe for inference
-    df = pd.DataFrame.from_records([data_input["record"]])
+def predict_record(data_input):
 
-    df = df[col_order].drop("price", axis=1)
+    # Validate the record and convert it back to a dataframe for inference, with
+    # columns in training order and dtypes taken from the schema
+    record = data_input["record"]
+    validate_record(record)
+    df = from_records([record])
 
     # Log raw input values of features used in inference pipeline
     active_features = [
@@ -89,10 +130,18 @@ def predict(data_input):
         "input_features", df[active_features].to_dict(orient="records")[0]
     )
 
-    # Use pipeline to make inference on request
-    result = model.predict(df).item()
+    # Use pipeline(s) to make inference on request
+    result, challenger_results = scorer.predict(df)
+    if monitor is not None:
+        monitor.update(df, result)
+    result = result.item()
 
-    # Log the prediction
+    # Log the prediction, and the challengers' predictions (rounded to cents) if any
     metrics.track_metric("predicted_result", result)
+    if challenger_results:
+        metrics.track_metric(
+            CHALLENGER_METRIC,
+            {name: round(pred.item(), 2) for name, pred in challenger_results.items()},
+        )
 
     return result
@@ -38,47 +38,14 @@
 #
 # ###########################################################################
 
-import os
-import numpy as np
-import pandas as pd
+from src.preparation import prepare_data
 
-from src.utils import random_day_offset, outlier_removal
-
-# Load raw data
-df = pd.read_csv("data/raw/kc_house_data.csv")
-
-# Drop duplicates
-df = df.drop_duplicates(subset=["id"], keep="first")
-
-# Create an artificial "listed" date to help mimic production scenario
-np.random.seed(42)
-df["date_sold"] = pd.to_datetime(df.date, infer_datetime_format=True)
-df["date_listed"] = df.date_sold.apply(lambda x: random_day_offset(x))
-df = df.drop(columns=["date"])
-df.sort_values(by="date_listed", inplace=True)
-df.reset_index(drop=True, inplace=True)
-
-# remove price outliers for simplicity
-df = outlier_removal(X=df, multiple=3, cols=["price"])
-
-# Split out first 6 months of data for training, remaining for simulating a "production" scenario
-min_sold_date = df.date_sold.min()
-max_sold_date = (
-    df.date_sold.max().to_period("M").to_timestamp()  # drop the partial last month
-)
-
-train_df = df[
-    df.date_sold.between(min_sold_date, "2014-10-31", inclusive="both")
-].sort_values("date_sold")
-
-prod_df = df[
-    df.date_sold.between("2014-10-31", max_sold_date, inclusive=False)
-].sort_values("date_sold")
-
-# Save off these dataframes
-working_dir = "data/working"
-os.makedirs(working_dir, exist_ok=True)
-dfs = [("train", train_df), ("prod", prod_df)]
-for name, dataframe in dfs:
-    path = os.path.join(working_dir, f"{name}_df.pkl")
-    dataframe.to_pickle(path)
+# Deduplicate records, create an artificial "listed" date to help mimic production
+# scenario, remove price outliers for simplicity, and split out first 6 months of data
+# for training, remaining for simulating a "production" scenario. The raw data is
+# streamed in chunks that are processed in parallel, and each chunk's records are saved
+# by its worker, so large inputs prepare in bounded memory.
+#
+# The records are saved as columnar datasets partitioned by sold month, so that
+# consumers can read only the partitions and columns they need
+prepare_data(raw_path="data/raw/kc_house_data.csv", working_dir="data/working")
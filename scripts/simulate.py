@@ -39,17 +39,16 @@
 # ###########################################################################
 
 import os
-import pandas as pd
 
 from src.simulation import Simulation
 
-train_path = "data/working/train_df.pkl"
-prod_path = "data/working/prod_df.pkl"
-
-train_df = pd.read_pickle(train_path)
-prod_df = pd.read_pickle(prod_path)
+train_path = "data/working/train"
+prod_path = "data/working/prod"
 
 sim = Simulation(
-    model_name="Price Regressor", dev_mode=eval(os.environ["DEV_MODE"].capitalize())
+    model_name="Price Regressor",
+    dev_mode=eval(os.environ["DEV_MODE"].capitalize()),
+    headless=eval(os.environ.get("HEADLESS_REPORTS", "False").capitalize()),
+    trace_memory=eval(os.environ.get("TRACE_MEMORY", "False").capitalize()),
 )
-sim.run_simulation(train_df, prod_df)
+sim.run_simulation(train_path, prod_path)
@@ -38,66 +38,38 @@
 #
 # ###########################################################################
 
-import scipy
+import os
 import pickle
 import numpy as np
-import pandas as pd
-from sklearn.pipeline import Pipeline
-from sklearn.linear_model import Ridge
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder, MinMaxScaler, StandardScaler
-from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
 from sklearn.model_selection import GridSearchCV
 
-train_path = "data/working/train_df.pkl"
-train_df = pd.read_pickle(train_path)
+from src.utils import load_partitioned
+from src.training import make_pipeline, RidgePathSearch
+from src.online import DriftReference
+
+train_path = "data/working/train"
+train_df = load_partitioned(train_path)
 
 X_train = train_df.drop("price", axis=1)
 y_train = train_df.price
 
-# define the intended features and type
-num_cols = ["sqft_living", "sqft_lot", "sqft_above"]
-cat_cols = ["bedrooms", "bathrooms", "waterfront", "zipcode", "condition", "view"]
-
-# define our numerical and categorical pipelines
-num_pipe = Pipeline(
-    steps=[
-        ("impute", SimpleImputer(strategy="mean")),
-        ("standardize", StandardScaler()),
-        ("scale", MinMaxScaler()),
-    ]
-)
-cat_pipe = Pipeline(
-    steps=[
-        ("impute", SimpleImputer(strategy="most_frequent")),
-        ("one-hot", OneHotEncoder(handle_unknown="ignore", sparse=False)),
-    ]
-)
-
-# combine preprocessing pipelines
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("numerical", num_pipe, num_cols),
-        ("categorical", cat_pipe, cat_cols),
-    ]
-)
+# construct full pipeline - preprocessing and a ridge regression on the log10 price
+full_pipe = make_pipeline()
 
-# define estimator - TransformedTargetRegressor to normalize the target variable
-estimator = TransformedTargetRegressor(
-    regressor=Ridge(), func=np.log10, inverse_func=scipy.special.exp10
-)
+# perform search to find best param settting - by default, solve the ridge regressions
+# for all alphas at once with preprocessing fit once per fold, and folds in parallel
+alphas = np.arange(0.1, 1, 0.1)
 
-# construct full pipeline
-full_pipe = Pipeline(steps=[("preprocess", preprocessor), ("model", estimator)])
-
-# perform gridsearch to find best param settting
-gscv = GridSearchCV(
-    full_pipe,
-    param_grid={"model__regressor__alpha": np.arange(0.1, 1, 0.1)},
-    cv=5,
-    scoring="neg_mean_absolute_error",
-    n_jobs=1,
-)
+if os.environ.get("HYPERPARAMETER_SEARCH", "ridge_path") == "grid":
+    gscv = GridSearchCV(
+        full_pipe,
+        param_grid={"model__regressor__alpha": alphas},
+        cv=5,
+        scoring="neg_mean_absolute_error",
+        n_jobs=1,
+    )
+else:
+    gscv = RidgePathSearch(full_pipe, alphas=alphas, cv=5, n_jobs=-1)
 
 gscv.fit(X_train, y_train)
 print(f"Best MAE: {gscv.best_score_}")
@@ -105,3 +77,7 @@ print(f"Best MAE: {gscv.best_score_}")
 # save model
 with open("model.pkl", "wb") as f:
     pickle.dump(gscv.best_estimator_, f)
+
+# save the binned distributions of the features and predictions on the training data,
+# which the deployed model monitors its requests against for drift
+DriftReference.from_frame(X_train, gscv.best_estimator_.predict(X_train)).save()
@@ -40,10 +40,16 @@
 
 import os
 import json
+import time
 import string
+import inspect
 import cmlapi
 import random
 import logging
+import functools
+import threading
+from cmlapi.rest import ApiException
+from concurrent.futures import ThreadPoolExecutor
 from packaging import version
 
 logger = logging.getLogger(__name__)
@@ -61,20 +67,120 @@ if not logger.handlers:
     logger.addHandler(file_handler)
 
 
+class TTLCache:
+    """A thread-safe cache of API lookups that expire after a time-to-live.
+
+    Results are stored as futures, so a lookup can be prefetched in the background and
+    concurrent callers of the same lookup share a single in-flight API call. Failed
+    lookups are not cached.
+
+    Attributes:
+        executor (concurrent.futures.ThreadPoolExecutor): runs lookups in the background
+        entries (dict): cache key -> (expiry time, future)
+
+    """
+
+    def __init__(self, max_workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def submit(self, key, ttl, func, *args, **kwargs):
+        """
+        Return a future for key, starting func(*args, **kwargs) if it is not cached or
+        expired.
+        """
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                entry = (
+                    time.monotonic() + ttl,
+                    self.executor.submit(func, *args, **kwargs),
+                )
+                self.entries[key] = entry
+
+        return entry[1]
+
+    def get(self, key, ttl, func, *args, **kwargs):
+        """Return the (possibly cached) result of func(*args, **kwargs)."""
+
+        future = self.submit(key, ttl, func, *args, **kwargs)
+        try:
+            return future.result()
+        except Exception:
+            with self.lock:
+                if self.entries.get(key, (None, None))[1] is future:
+                    del self.entries[key]
+            raise
+
+
+
+def cache_key(func, args, kwargs):
+    """
+    Return the cache key of a call to an ApiUtility method - its name and arguments, with
+    positional arguments named so that equivalent calls share a key.
+    """
+
+    bound = inspect.signature(func).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    kwargs = dict(list(bound.arguments.items())[1:])
+
+    return (func.__name__,) + tuple(sorted(kwargs.items()))
+
+
+def cached(ttl):
+    """Decorate an ApiUtility method so its results are cached in the instance's TTLCache."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            return self.cache.get(
+                cache_key(func, args, kwargs), ttl, func, self, *args, **kwargs
+            )
+
+        wrapper.ttl = ttl
+        return wrapper
+
+    return decorator
+
+
 class ApiUtility:
     """A utility class for working with CML API_v2
 
     This class contains methods that wrap API_v2 to achieve specific
     needs that facilitate the simulation.
 
+    Lookups that rarely change (models, deployment details, the project, runtimes) are
+    cached with a time-to-live, and independent lookups are prefetched or requested
+    concurrently so that API round trips don't dominate simulation startup or batches.
+
     Attributes:
         client (cmlapi.api.cml_service_api.CMLServiceApi)
+        project_id (str)
+        cache (TTLCache): cache of API lookups
 
     """
 
     def __init__(self):
         self.client = cmlapi.default_client()
+        self.project_id = os.environ["CDSW_PROJECT_ID"]
+        self.cache = TTLCache()
+
+    def prefetch(self, method_name, *args, **kwargs):
+        """Start a cached lookup in the background without waiting for its result."""
+
+        method = getattr(type(self), method_name)
+        self.cache.submit(
+            cache_key(method.__wrapped__, args, kwargs),
+            method.ttl,
+            method.__wrapped__,
+            self,
+            *args,
+            **kwargs,
+        )
 
+    @cached(ttl=300)
     def get_latest_deployment_details(self, model_name):
         """
         Given a APIv2 client object and Model Name, use APIv2 to retrieve details about the latest/current deployment.
@@ -82,47 +188,39 @@ class ApiUtility:
         This function only works for models deployed within the current project.
         """
 
-        project_id = os.environ["CDSW_PROJECT_ID"]
+        project_id = self.project_id
 
-        # gather model details
-        models = (
-            # fetch models for the project, sorting them in descending order by model name.
-            self.client.list_models(project_id=project_id, sort="-name" ,async_req=True)
-            .get()
-            .to_dict()
-        )
-        model_info = [
-            model for model in models["models"] if model["name"].startswith(model_name)
-        ][0]
+        # lookups needed later on to deploy the monitoring application don't depend on
+        # the model, so fetch them concurrently with the chain of model lookups below
+        self.prefetch("get_project")
+        self.prefetch("get_latest_standard_runtime")
+
+        model_info = self.get_model(model_name)
         model_name = model_info["name"]
         model_id = model_info["id"]
         model_crn = model_info["crn"]
         model_access_key = model_info["access_key"]
 
-        # gather latest build details
-        builds = (
-            self.client.list_model_builds(
-                project_id=project_id, model_id=model_id, async_req=True
-            )
-            .get()
-            .to_dict()
+        # the builds and deployments of the model don't depend on each other, so request
+        # both before waiting on either, then pick the latest deployment of the latest
+        # build from the model's deployments
+        builds_request = self.client.list_model_builds(
+            project_id=project_id, model_id=model_id, async_req=True
         )
-        build_info = builds["model_builds"][-1]  # most recent build
+        deployments_request = self.client.list_model_deployments(
+            project_id=project_id, model_id=model_id, async_req=True
+        )
+        builds = builds_request.get().to_dict()
+        deployments = deployments_request.get().to_dict()
 
+        build_info = builds["model_builds"][-1]  # most recent build
         build_id = build_info["id"]
 
-        # gather latest deployment details
-        deployments = (
-            self.client.list_model_deployments(
-                project_id=project_id,
-                model_id=model_id,
-                build_id=build_id,
-                async_req=True,
-            )
-            .get()
-            .to_dict()
-        )
-        deployment_info = deployments["model_deployments"][-1]  # most recent deployment
+        deployment_info = [
+            deployment
+            for deployment in deployments["model_deployments"]
+            if deployment["build_id"] == build_id
+        ][-1]  # most recent deployment of the build
 
         model_deployment_crn = deployment_info["crn"]
 
@@ -135,32 +233,61 @@ class ApiUtility:
             "latest_deployment_crn": model_deployment_crn,
         }
 
+    @cached(ttl=3600)
+    def get_model(self, model_name):
+        """
+        Use CML APIv2 to look up the details of the first model of the current project
+        whose name starts with model_name. A model's ID, CRN and access key don't change
+        across builds, so they are cached for longer than its deployment details.
+        """
+
+        models = (
+            # fetch all models, sorting them in descending order by model name.
+            self.client.list_models(
+                project_id=self.project_id, sort="-name", async_req=True
+            )
+            .get()
+            .to_dict()
+        )
+
+        return [
+            model for model in models["models"] if model["name"].startswith(model_name)
+        ][0]
+
+    @cached(ttl=600)
+    def get_project(self):
+        """Use CML APIv2 to fetch the current project."""
+
+        return self.client.get_project(self.project_id)
+
+    @cached(ttl=3600)
     def get_latest_standard_runtime(self):
         """
-        Use CML APIv2 to identify and return the latest version of a Python 3.6,
+        Use CML APIv2 to identify and return the latest version of a Python 3.9,
         Standard, Workbench Runtime
+
+        Raises:
+            LookupError: if no matching runtime is available
+            ApiException: if the runtimes can't be listed - failed lookups aren't cached
+
         """
 
-        try:
-            runtime_criteria = {
-                "kernel": "Python 3.9",
-                "edition": "Standard",
-                "editor": "Workbench",
-            }
-            runtimes = self.client.list_runtimes(
-                search_filter=json.dumps(runtime_criteria)
-            ).to_dict()["runtimes"]
-
-            versions = {
-                version.parse(rt["full_version"]): i for i, rt in enumerate(runtimes)
-            }
-            latest = versions[max(versions.keys())]
-
-            return runtimes[latest]["image_identifier"]
-
-        except:
-            logger.info("No matching runtime available.")
-            return None
+        runtime_criteria = {
+            "kernel": "Python 3.9",
+            "edition": "Standard",
+            "editor": "Workbench",
+        }
+        runtimes = self.client.list_runtimes(
+            search_filter=json.dumps(runtime_criteria)
+        ).to_dict()["runtimes"]
+
+        if not runtimes:
+            raise LookupError("No matching runtime available.")
+
+        versions = {version.parse(rt["full_version"]): i for i, rt in enumerate(runtimes)}
+        latest = versions[max(versions.keys())]
+
+        return runtimes[latest]["image_identifier"]
 
     def deploy_monitoring_application(self, application_name):
         """
@@ -174,7 +301,7 @@ class ApiUtility:
         ipt = {
             "name": application_name,
             "description": "An Evidently.ai dashboard for monitoring data drift, target drift, and regression performance.",
-            "project_id": os.environ["CDSW_PROJECT_ID"],
+            "project_id": self.project_id,
             "subdomain": "".join(
                 [random.choice(string.ascii_lowercase) for _ in range(6)]
             ),
@@ -185,35 +312,19 @@ class ApiUtility:
         }
 
         # configure runtime if available
-        if (
-            self.client.get_project(os.environ["CDSW_PROJECT_ID"]).default_engine_type
-            != "legacy_engine"
-        ):
-            ipt["runtime_identifier"] = self.get_latest_standard_runtime()
+        if self.get_project().default_engine_type != "legacy_engine":
+            try:
+                ipt["runtime_identifier"] = self.get_latest_standard_runtime()
+            except (ApiException, LookupError) as e:
+                logger.info(f"No matching runtime available: {e}")
+                ipt["runtime_identifier"] = None
             del ipt["kernel"]
 
         application_request = cmlapi.CreateApplicationRequest(**ipt)
 
-        self.client.create_application(
-            project_id=os.environ["CDSW_PROJECT_ID"], body=application_request
+        application = self.client.create_application(
+            project_id=self.project_id, body=application_request
         )
         logger.info(f"Created and deployed new application: {application_name}")
 
-    def restart_running_application(self, application_name):
-        """
-        Use CML APIv2 to restart a running application provided the application name.
-
-        """
-
-        search_criteria = {"name": application_name}
-
-        app = self.client.list_applications(
-            project_id=os.environ["CDSW_PROJECT_ID"],
-            search_filter=json.dumps(search_criteria),
-        ).to_dict()["applications"][0]
-
-        self.client.restart_application(
-            project_id=os.environ["CDSW_PROJECT_ID"], application_id=app["id"]
-        )
-
-        logger.info(f"Restarted existing application: {application_name}")
+        return application.id
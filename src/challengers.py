@@ -0,0 +1,215 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import glob
+import joblib
+import pickle
+import logging
+import numpy as np
+import pandas as pd
+
+from src.utils import TARGET, PREDICTION
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+CHALLENGER_DIR = "challengers"
+CHALLENGER_METRIC = "challenger_predictions"
+CHALLENGER_PREFIX = "challenger_"
+CHAMPION = "champion"
+
+
+def preprocessor_fingerprint(model):
+    """
+    Return a fingerprint of the fitted preprocessing steps of a model pipeline - models
+    with equal fingerprints transform records identically. Returns None for models
+    that aren't pipelines.
+
+    The fingerprint hashes the fitted values rather than raw pickle bytes, which depend
+    on how objects happen to be shared in memory - so that a copy of a model (e.g. one
+    saved and loaded again) has the same fingerprint as the original.
+    """
+
+    if not hasattr(model, "steps") or len(model.steps) < 2:
+        return None
+
+    return joblib.hash(model[:-1])
+
+
+def challenger_columns(metrics_df):
+    """Return the challenger prediction columns of formatted model metrics."""
+
+    return [col for col in metrics_df.columns if col.startswith(CHALLENGER_PREFIX)]
+
+
+class ShadowScorer:
+    """Score the deployed (champion) model and any number of challenger models on the
+    same records, in one pass.
+
+    Models are grouped by their fitted preprocessing, so records are transformed once
+    per group and only the final estimator of each model is applied to them. Models
+    retrained from the champion (src.retraining.Retrainer, which saves them to
+    CHALLENGER_DIR) keep its fitted preprocessing and fall into its group, so shadowing
+    them costs little more than a matrix-vector product each.
+
+    Attributes:
+        champion (sklearn.pipeline.Pipeline): the deployed model
+        challengers (dict): name -> challenger model
+        groups (list): (representative model, [(name, model), ...]) for each set of
+            models sharing preprocessing - the champion is always in the first group
+
+    """
+
+    def __init__(self, champion, challengers=None):
+        self.champion = champion
+        self.challengers = challengers or {}
+
+        groups = {}
+        for name, model in [(CHAMPION, champion)] + list(self.challengers.items()):
+            key = preprocessor_fingerprint(model)
+            # models that aren't pipelines are scored on their own
+            key = key if key is not None else f"__{name}__"
+            groups.setdefault(key, (model, []))[1].append((name, model))
+        self.groups = list(groups.values())
+
+    @classmethod
+    def from_directory(cls, champion, directory=CHALLENGER_DIR):
+        """
+        Load every challenger model (*.pkl) saved to a directory, named by file name.
+        """
+
+        challengers = {}
+        for path in sorted(glob.glob(os.path.join(directory, "*.pkl"))):
+            with open(path, "rb") as f:
+                challengers[os.path.splitext(os.path.basename(path))[0]] = pickle.load(f)
+
+        if challengers:
+            logger.info(
+                f"Loaded {len(challengers)} challenger models from {directory}: "
+                + ", ".join(challengers)
+            )
+
+        return cls(champion, challengers)
+
+    def predict(self, df):
+        """
+        Score all models on a dataframe of records.
+
+        Returns:
+            np.ndarray: champion predictions
+            dict: challenger name -> np.ndarray of predictions
+
+        """
+
+        predictions = {}
+        for representative, models in self.groups:
+            if len(models) == 1:
+                name, model = models[0]
+                predictions[name] = model.predict(df)
+                continue
+
+            X = representative[:-1].transform(df)
+            for name, model in models:
+                predictions[name] = model.steps[-1][1].predict(X)
+
+        return predictions.pop(CHAMPION), predictions
+
+
+def compare_models(metrics_df):
+    """
+    Compare the performance of the champion and challenger models on records with ground
+    truths.
+
+    Args:
+        metrics_df (pd.DataFrame): formatted model metrics, including ground truths and
+            challenger predictions (as logged by scripts/predict.py)
+
+    Returns:
+        pd.DataFrame: one row per model, with the share of records each challenger
+            predicts more accurately than the champion
+
+    """
+
+    df = metrics_df.loc[metrics_df[TARGET].notna()]
+    target = df[TARGET].astype(np.float64).values
+    champion_abs_error = np.abs(df[PREDICTION].astype(np.float64).values - target)
+
+    rows = []
+    for name, col in [(CHAMPION, PREDICTION)] + [
+        (col[len(CHALLENGER_PREFIX) :], col) for col in challenger_columns(df)
+    ]:
+        predicted = df[col].astype(np.float64).values
+        scored = ~np.isnan(predicted)
+        error = predicted[scored] - target[scored]
+        abs_error = np.abs(error)
+
+        rows.append(
+            {
+                "model": name,
+                "n": int(scored.sum()),
+                "mean_error": error.mean() if scored.any() else np.nan,
+                "mean_abs_error": abs_error.mean() if scored.any() else np.nan,
+                "mean_abs_perc_error": (
+                    100 * (abs_error / np.abs(target[scored])).mean()
+                    if scored.any()
+                    else np.nan
+                ),
+                "rmse": np.sqrt((error ** 2).mean()) if scored.any() else np.nan,
+                "share_better_than_champion": (
+                    (abs_error < champion_abs_error[scored]).mean()
+                    if scored.any()
+                    else np.nan
+                ),
+            }
+        )
+
+    return pd.DataFrame(rows).round(4)
@@ -0,0 +1,217 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import logging
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils import TARGET, PREDICTION
+from src.schema import SCHEMA
+from src.challengers import CHALLENGER_METRIC, CHALLENGER_PREFIX
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+# Metrics logged by scripts/predict.py and Simulation.add_delayed_metrics(), by path
+# within a record's "metrics", and the dtypes of their decoded columns. Any other
+# metrics are decoded too, with inferred dtypes.
+METRIC_DTYPES = {
+    (PREDICTION,): "float64",
+    (TARGET,): "float64",
+    ("date_sold",): "object",
+    **{
+        ("input_features", col): "float64" if dt.startswith("float") else "int64"
+        for col, dt in SCHEMA.items()
+        if not dt.startswith("datetime")
+    },
+}
+
+
+def get_column_name(path):
+    """
+    Name the decoded column of a metric path by its innermost key, except challenger
+    predictions, which are prefixed with CHALLENGER_PREFIX.
+    """
+
+    prefix = CHALLENGER_PREFIX if path[0] == CHALLENGER_METRIC else ""
+    return prefix + path[-1]
+
+
+def get_dtype(path):
+    if path[0] == CHALLENGER_METRIC:
+        return "float64"
+    return METRIC_DTYPES.get(path)
+
+
+def decode_column(values, dtype):
+    """
+    Decode a list of metric values (with NaN for missing values) into an array.
+
+    Integer columns with missing values are decoded as floats, and metrics without a
+    known dtype have their dtype inferred, as pd.json_normalize() would.
+    """
+
+    if dtype is None:
+        return pd.Series(values).values
+    if dtype == "object":
+        return np.array(values, dtype=object)
+
+    array = np.array(values, dtype=np.float64)
+    if dtype == "int64" and not np.isnan(array).any():
+        return array.astype(np.int64)
+    return array
+
+
+def decode_fields(dicts, prefix, columns):
+    """
+    Decode the fields of a list of dicts into columns, recursing into nested dicts.
+
+    Fields are visited in order of first appearance, so the columns are ordered as
+    pd.json_normalize() orders them.
+
+    Args:
+        dicts (list): dicts holding the fields, one per record
+        prefix (tuple): path of the dicts within a record's "metrics"
+        columns (dict): path -> decoded array, updated in place
+
+    """
+
+    nan = np.nan
+    for key in dict.fromkeys(itertools.chain.from_iterable(dicts)):
+        values = [d.get(key, nan) for d in dicts]
+        path = prefix + (key,)
+
+        if isinstance(next((v for v in values if v is not nan), None), dict):
+            decode_fields(
+                [v if isinstance(v, dict) else {} for v in values], path, columns
+            )
+        else:
+            columns[path] = decode_column(values, get_dtype(path))
+
+
+def decode_records(records):
+    """
+    Decode the records of a metrics.read_metrics() response into a pd.DataFrame with one
+    column per metric, plus the predictionUuid.
+    """
+
+    columns = {}
+    decode_fields([record.get("metrics") or {} for record in records], (), columns)
+
+    df = pd.DataFrame(
+        {i: array for i, array in enumerate(columns.values())},
+        index=pd.RangeIndex(len(records)),
+    )
+    df.columns = [get_column_name(path) for path in columns]
+    df["predictionUuid"] = np.array(
+        [record.get("predictionUuid") for record in records], dtype=object
+    )
+
+    return df
+
+
+def decode_page(page):
+    """
+    Decode one page of a metrics.read_metrics() response - either the response itself,
+    or a callable (e.g. a functools.partial of metrics.read_metrics) that returns it.
+    """
+
+    return decode_records((page() if callable(page) else page)["metrics"])
+
+
+def decode_metrics(responses, n_jobs=1):
+    """
+    Decode metrics.read_metrics() responses into a pd.DataFrame of metrics.
+
+    Unlike pd.json_normalize(), only the "metrics" and predictionUuid of each record are
+    decoded, column by column, straight into arrays of the known dtype of each metric.
+
+    Pages can be decoded in parallel processes, but only pages passed as callables: the
+    worker then both fetches and decodes its page, and only the decoded columns are sent
+    back. Sending decoded records to a worker costs more than decoding them in place.
+
+    Args:
+        responses (dict or iterable): a response, or an iterable (e.g. generator) of
+            pages - responses, or callables returning them
+        n_jobs (int): number of worker processes for pages passed as callables
+
+    Returns:
+        pd.DataFrame
+
+    """
+
+    pages = [responses] if isinstance(responses, dict) else responses
+
+    if n_jobs == 1:
+        frames = [decode_page(page) for page in pages]
+    else:
+        pages = list(pages)
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [
+                executor.submit(decode_page, page) if callable(page) else page
+                for page in pages
+            ]
+            frames = [
+                future.result() if callable(page) else decode_page(future)
+                for page, future in zip(pages, futures)
+            ]
+
+    if not frames:
+        return pd.DataFrame(columns=["predictionUuid"])
+    if len(frames) == 1:
+        return frames[0]
+
+    # keep the predictionUuid last, as it is within each page
+    df = pd.concat(frames, ignore_index=True, sort=False)
+    return df[[col for col in df.columns if col != "predictionUuid"] + ["predictionUuid"]]
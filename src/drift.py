@@ -0,0 +1,224 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import warnings
+import numpy as np
+import pandas as pd
+
+from src.utils import TARGET, PREDICTION, NUM_FEATURES, CAT_FEATURES
+
+SEGMENT_COLS = ["zipcode", "waterfront", "condition"]
+
+
+def population_stability_index(ref_counts, cur_counts, eps=1e-4):
+    """
+    Vectorized Population Stability Index between rows of two count matrices.
+
+    Args:
+        ref_counts (np.ndarray): (..., n_bins) reference bin counts
+        cur_counts (np.ndarray): (..., n_bins) current bin counts
+        eps (float): floor applied to bin proportions to avoid division by zero
+
+    Returns:
+        np.ndarray: PSI for each row; NaN where either side has no observations
+
+    """
+
+    ref_counts = np.asarray(ref_counts, dtype=np.float64)
+    cur_counts = np.asarray(cur_counts, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ref_prop = np.maximum(ref_counts / ref_counts.sum(axis=-1, keepdims=True), eps)
+        cur_prop = np.maximum(cur_counts / cur_counts.sum(axis=-1, keepdims=True), eps)
+        psi = ((cur_prop - ref_prop) * np.log(cur_prop / ref_prop)).sum(axis=-1)
+
+    empty = (ref_counts.sum(axis=-1) == 0) | (cur_counts.sum(axis=-1) == 0)
+
+    return np.where(empty, np.nan, psi)
+
+
+def bin_feature(reference, current, is_categorical, n_bins=10):
+    """
+    Map reference and current values of a feature onto a shared set of bins - quantile
+    bins of the reference distribution for numerical features, or the union of observed
+    categories for categorical features. Missing values get a bin of their own.
+
+    Returns:
+        tuple: (reference bin codes, current bin codes, number of bins)
+
+    """
+
+    reference = pd.Series(reference).reset_index(drop=True)
+    current = pd.Series(current).reset_index(drop=True)
+
+    if is_categorical:
+        categories = pd.unique(pd.concat([reference, current]).dropna())
+        ref_codes = pd.Categorical(reference, categories=categories).codes.astype(np.int64)
+        cur_codes = pd.Categorical(current, categories=categories).codes.astype(np.int64)
+        n = len(categories)
+    else:
+        edges = np.unique(
+            np.nanquantile(reference.astype(np.float64), np.linspace(0, 1, n_bins + 1)[1:-1])
+        )
+        ref_codes = np.searchsorted(edges, reference.values, side="right")
+        cur_codes = np.searchsorted(edges, current.values, side="right")
+        ref_codes[reference.isna().values] = -1
+        cur_codes[current.isna().values] = -1
+        n = len(edges) + 1
+
+    # send missing values (-1) to a dedicated last bin
+    ref_codes = np.where(ref_codes < 0, n, ref_codes)
+    cur_codes = np.where(cur_codes < 0, n, cur_codes)
+
+    return ref_codes, cur_codes, n + 1
+
+
+def segment_counts(segment_codes, bin_codes, n_segments, n_bins):
+    """Count observations per (segment, bin) in a single vectorized pass."""
+
+    return np.bincount(
+        segment_codes * n_bins + bin_codes, minlength=n_segments * n_bins
+    ).reshape(n_segments, n_bins)
+
+
+def segmented_drift(
+    reference_df,
+    current_df,
+    segment_cols=SEGMENT_COLS,
+    num_features=NUM_FEATURES + [TARGET, PREDICTION],
+    cat_features=CAT_FEATURES,
+    n_bins=10,
+    psi_threshold=0.2,
+    min_segment_size=10,
+):
+    """
+    Compute drift for every value of each segment column in one grouped, vectorized pass.
+
+    For each feature, reference and current values are binned once, then per-segment bin
+    counts are obtained for all segments at the same time with np.bincount. The PSI between
+    each segment's reference and current distributions is computed across the whole
+    (segment x bin) count matrix at once, so cost does not scale with the number of
+    segments the way building one Evidently Dashboard per segment would.
+
+    Args:
+        reference_df (pd.DataFrame): prepared reference records
+        current_df (pd.DataFrame): prepared current records
+        segment_cols (list): categorical columns to segment by
+        num_features (list): numerical features to compute drift for
+        cat_features (list): categorical features to compute drift for
+        n_bins (int): number of reference quantile bins for numerical features
+        psi_threshold (float): PSI above which a feature is considered drifted
+        min_segment_size (int): segments with fewer current records are excluded from ranking
+
+    Returns:
+        pd.DataFrame: one row per segment, ranked by mean PSI across features
+
+    """
+
+    features = [(f, False) for f in num_features] + [(f, True) for f in cat_features]
+    binned = {
+        f: bin_feature(reference_df[f], current_df[f], is_cat, n_bins)
+        for f, is_cat in features
+    }
+
+    rows = []
+    for segment_col in segment_cols:
+        ref_seg, cur_seg, _ = bin_feature(
+            reference_df[segment_col], current_df[segment_col], is_categorical=True
+        )
+        segments = pd.unique(
+            pd.concat([reference_df[segment_col], current_df[segment_col]]).dropna()
+        ).tolist() + [np.nan]
+        n_segments = len(segments)
+
+        segment_features = [f for f, _ in features if f != segment_col]
+        psi = np.empty((n_segments, len(segment_features)))
+
+        for j, feature in enumerate(segment_features):
+            ref_bins, cur_bins, n_feature_bins = binned[feature]
+            psi[:, j] = population_stability_index(
+                segment_counts(ref_seg, ref_bins, n_segments, n_feature_bins),
+                segment_counts(cur_seg, cur_bins, n_segments, n_feature_bins),
+            )
+
+        n_ref = np.bincount(ref_seg, minlength=n_segments)
+        n_cur = np.bincount(cur_seg, minlength=n_segments)
+        drifted = psi > psi_threshold
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            mean_psi = np.nanmean(psi, axis=1)
+        max_idx = np.argmax(np.nan_to_num(psi, nan=-np.inf), axis=1)
+
+        for i, segment in enumerate(segments):
+            if n_cur[i] < min_segment_size or n_ref[i] == 0:
+                continue
+            rows.append(
+                {
+                    "segment_col": segment_col,
+                    "segment": segment,
+                    "n_reference": int(n_ref[i]),
+                    "n_current": int(n_cur[i]),
+                    "n_drifted_features": int(drifted[i].sum()),
+                    "share_drifted_features": drifted[i].mean(),
+                    "mean_psi": mean_psi[i],
+                    "max_psi": psi[i, max_idx[i]],
+                    "most_drifted_feature": segment_features[max_idx[i]],
+                }
+            )
+
+    columns = [
+        "segment_col",
+        "segment",
+        "n_reference",
+        "n_current",
+        "n_drifted_features",
+        "share_drifted_features",
+        "mean_psi",
+        "max_psi",
+        "most_drifted_feature",
+    ]
+
+    return (
+        pd.DataFrame(rows, columns=columns)
+        .sort_values(["mean_psi", "max_psi"], ascending=False)
+        .reset_index(drop=True)
+    )
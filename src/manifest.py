@@ -0,0 +1,205 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import json
+import time
+import fcntl
+from datetime import datetime
+
+REPORT_ROOT = "apps/static/reports"
+MANIFEST_FILE = "manifest.json"
+DATE_FORMAT = "%m-%d-%Y"
+
+
+def get_section_metrics(profile, section_id):
+    """Return the metrics of a section from an Evidently profile dictionary, if present."""
+
+    return ((profile or {}).get(section_id) or {}).get("data", {}).get("metrics", {})
+
+
+def summarize_profiles(profiles):
+    """
+    Extract headline monitoring numbers from the Evidently profiles of a set of reports.
+
+    Args:
+        profiles (dict): report name -> Evidently profile dictionary
+
+    Returns:
+        dict
+
+    """
+
+    data_drift = get_section_metrics(profiles.get("data_drift"), "data_drift")
+    target_drift = get_section_metrics(
+        profiles.get("num_target_drift"), "num_target_drift"
+    )
+    performance = get_section_metrics(
+        profiles.get("reg_performance"), "regression_performance"
+    ).get("current", {})
+
+    return {
+        "dataset_drift": data_drift.get("dataset_drift"),
+        "n_drifted_features": data_drift.get("n_drifted_features"),
+        "share_drifted_features": data_drift.get("share_drifted_features"),
+        "target_drift": target_drift.get("target_drift"),
+        "prediction_drift": target_drift.get("prediction_drift"),
+        "mean_error": performance.get("mean_error"),
+        "mean_abs_error": performance.get("mean_abs_error"),
+        "mean_abs_perc_error": performance.get("mean_abs_perc_error"),
+    }
+
+
+def parse_report_key(key):
+    """Parse a report directory name ("%m-%d-%Y_%m-%d-%Y") into start/end datetimes."""
+
+    return [datetime.strptime(d, DATE_FORMAT) for d in key.split("_")]
+
+
+class ReportManifest:
+    """An index of all generated monitoring reports.
+
+    The manifest is maintained as reports are built, so consumers like the dashboard
+    application can list reports and their headline metrics without scanning and parsing
+    the report directories. Entries are kept sorted by date range (newest first), and a
+    version counter is incremented on every update so readers can cheaply detect changes.
+
+    Attributes:
+        report_root (str): directory containing one sub-directory of reports per date range
+        path (str): location of the manifest file
+
+    """
+
+    def __init__(self, report_root=REPORT_ROOT):
+        self.report_root = report_root
+        self.path = os.path.join(report_root, MANIFEST_FILE)
+
+    def load(self):
+        """
+        Return the manifest dictionary. If no manifest has been written yet, one is
+        rebuilt by scanning the report directories.
+        """
+
+        if not os.path.exists(self.path):
+            return self.scan()
+
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def scan(self):
+        """Build a manifest (without headline metrics) from the report directories."""
+
+        reports = {}
+        if os.path.isdir(self.report_root):
+            for key in os.listdir(self.report_root):
+                report_dir = os.path.join(self.report_root, key)
+                if os.path.isdir(report_dir):
+                    try:
+                        reports[key] = self.get_entry(key, report_dir)
+                    except ValueError:
+                        continue  # not a report directory
+
+        return {"version": 0, "reports": self.sort(reports)}
+
+    @staticmethod
+    def sort(reports):
+        return dict(
+            sorted(
+                reports.items(),
+                key=lambda item: (item[1]["start"], item[1]["end"]),
+                reverse=True,
+            )
+        )
+
+    @staticmethod
+    def get_entry(key, report_dir, summary=None):
+        start, end = parse_report_key(key)
+
+        files = {}
+        for dirpath, _, filenames in os.walk(report_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                files[os.path.relpath(path, report_dir)] = os.path.getsize(path)
+
+        return {
+            "key": key,
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+            "files": files,
+            "total_bytes": sum(files.values()),
+            "updated_at": time.time(),
+            **(summary or {}),
+        }
+
+    def update(self, report_dir, profiles=None):
+        """
+        Add or replace the manifest entry for a report directory, and atomically rewrite
+        the manifest with an incremented version.
+
+        Concurrent writers (e.g. simulations and backfills running side by side) are
+        serialized with an exclusive lock on a lock file next to the manifest, so that
+        no writer's entry is lost between loading and rewriting the manifest.
+
+        Args:
+            report_dir (str): directory of reports for one date range
+            profiles (dict): report name -> Evidently profile dictionary
+
+        """
+
+        key = os.path.basename(os.path.normpath(report_dir))
+        summary = summarize_profiles(profiles) if profiles else None
+        entry = self.get_entry(key, report_dir, summary)
+
+        os.makedirs(self.report_root, exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            manifest = self.load()
+            manifest["reports"][key] = entry
+            manifest["reports"] = self.sort(manifest["reports"])
+            manifest["version"] += 1
+
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.path)
+
+        return manifest
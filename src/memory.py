@@ -0,0 +1,270 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import json
+import time
+import logging
+import resource
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MEMORY_DIR = "logs/memory"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+MB = 1024 ** 2
+
+
+def get_rss():
+    """Return the resident set size of the current process in bytes."""
+
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # peak rather than current RSS, reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryMonitor:
+    """Per-batch and per-phase memory accounting for long-running simulations.
+
+    The resident set size (RSS) is recorded at the start and end of every phase and at
+    the end of every batch. With allocation tracing enabled, the Python allocations made
+    during each phase are recorded too, and the growth between consecutive batches is
+    attributed to the source lines that allocated it. A warning is logged when RSS grows
+    by more than a threshold from one batch to the next.
+
+    Allocation tracing (tracemalloc) noticeably slows down allocation-heavy code, so it is
+    off by default - RSS accounting alone is cheap.
+
+    Attributes:
+        name (str): name of the monitored run, used to name the saved records
+        trace_allocations (bool): flag for tracing Python allocations with tracemalloc
+        growth_threshold (int): RSS growth between batches, in bytes, that logs a warning
+        top_n (int): number of allocation sites reported per batch
+        phases (list): memory records of each phase
+        batches (list): memory records of each batch
+
+    """
+
+    def __init__(
+        self, name, trace_allocations=False, growth_threshold_mb=100, top_n=10, nframes=1
+    ):
+        self.name = name
+        self.trace_allocations = trace_allocations
+        self.growth_threshold = growth_threshold_mb * MB
+        self.top_n = top_n
+        self.phases = []
+        self.batches = []
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        self.last_snapshot = None
+        self.last_rss = get_rss()
+
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+
+    @contextmanager
+    def phase(self, name, attributes=None):
+        """
+        Record the memory used by the enclosed block.
+
+        Yields a dictionary that is filled in with the phase's memory statistics in bytes
+        once the block exits: "rss", "rss_delta" and, if allocations are traced,
+        "traced_delta".
+
+        Args:
+            name (str): phase name
+            attributes (dict): attributes of the phase to record along with its memory
+                statistics, read once the block exits
+
+        """
+
+        stats = {}
+        rss_before = get_rss()
+        traced_before = tracemalloc.get_traced_memory()[0] if self.trace_allocations else 0
+        try:
+            yield stats
+        finally:
+            stats["rss"] = get_rss()
+            stats["rss_delta"] = stats["rss"] - rss_before
+            if self.trace_allocations:
+                stats["traced_delta"] = tracemalloc.get_traced_memory()[0] - traced_before
+            self.phases.append({"phase": name, **(attributes or {}), **stats})
+
+    def take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+
+    def get_top_growth(self, snapshot):
+        """Return the allocation sites that grew the most since the last snapshot."""
+
+        if self.last_snapshot is None:
+            stats = snapshot.statistics("lineno")
+            growth = [(stat, stat.size, stat.count) for stat in stats]
+        else:
+            stats = snapshot.compare_to(self.last_snapshot, "lineno")
+            growth = [(stat, stat.size_diff, stat.count_diff) for stat in stats]
+
+        return [
+            {
+                "site": str(stat.traceback),
+                "size": stat.size,
+                "size_diff": size_diff,
+                "count_diff": count_diff,
+            }
+            for stat, size_diff, count_diff in sorted(
+                growth, key=lambda x: x[1], reverse=True
+            )[: self.top_n]
+            if size_diff > 0
+        ]
+
+    def end_batch(self, batch, **gauges):
+        """
+        Record the memory used at the end of a batch, attribute its growth, and warn if
+        RSS grew by more than the threshold since the previous batch.
+
+        Args:
+            batch (int): batch number
+            **gauges: sizes of structures worth tracking across batches, e.g. the
+                number of entries of a growing mapping
+
+        Returns:
+            dict: the batch's memory record
+
+        """
+
+        rss = get_rss()
+        record = {
+            "batch": batch,
+            "rss": rss,
+            "rss_growth": rss - self.last_rss,
+            **gauges,
+        }
+
+        if self.trace_allocations:
+            snapshot = self.take_snapshot()
+            record["traced"], record["traced_peak"] = tracemalloc.get_traced_memory()
+            record["top_growth"] = self.get_top_growth(snapshot)
+            self.last_snapshot = snapshot
+            tracemalloc.reset_peak()
+
+        self.batches.append(record)
+        self.last_rss = rss
+
+        logger.info(
+            f"Batch {batch} memory: RSS {rss / MB:.1f} MB "
+            f"({record['rss_growth'] / MB:+.1f} MB)"
+            + "".join(f", {k}={v}" for k, v in gauges.items())
+        )
+
+        if record["rss_growth"] > self.growth_threshold:
+            sites = "".join(
+                f"\n    {site['size_diff'] / MB:+.2f} MB ({site['count_diff']:+d} blocks) {site['site']}"
+                for site in record.get("top_growth", [])
+            )
+            logger.warning(
+                f"RSS grew by {record['rss_growth'] / MB:.1f} MB during batch {batch}, "
+                f"more than the {self.growth_threshold / MB:.0f} MB threshold."
+                + (
+                    f" Top allocation sites:{sites}"
+                    if sites
+                    else " Enable allocation tracing to attribute the growth."
+                )
+            )
+
+        return record
+
+    def save(self, memory_dir=MEMORY_DIR):
+        """
+        Write the per-batch and per-phase memory records of the run to a JSON file.
+
+        Returns:
+            str: path of the saved file
+
+        """
+
+        os.makedirs(memory_dir, exist_ok=True)
+        path = os.path.join(memory_dir, f"{self.name}_{self.started_at}.json")
+
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "trace_allocations": self.trace_allocations,
+                    "growth_threshold": self.growth_threshold,
+                    "batches": self.batches,
+                    "phases": self.phases,
+                },
+                f,
+                indent=2,
+                default=str,
+            )
+
+        logger.info(f"Saved memory records to {path}")
+
+        return path
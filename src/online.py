@@ -0,0 +1,308 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import json
+import time
+import threading
+import numpy as np
+import pandas as pd
+
+from src.utils import PREDICTION, NUM_FEATURES, CAT_FEATURES
+from src.drift import population_stability_index
+
+# Written by scripts/train.py next to model.pkl, so that it is bundled with the model
+DRIFT_REFERENCE_PATH = "drift_reference.json"
+
+
+class DriftReference:
+    """The binned distributions of the active features and predictions on the training
+    data, used as the reference for online drift monitoring.
+
+    Numerical features (and predictions) are binned by quantiles of the training data,
+    and categorical features by their training categories. Each feature has an extra last
+    bin for missing values and unseen categories.
+
+    Attributes:
+        features (list): names of the monitored features
+        edges (dict): numerical feature -> list of inner bin edges
+        categories (dict): categorical feature -> list of categories
+        counts (dict): feature -> list of reference counts per bin
+
+    """
+
+    def __init__(self, edges, categories, counts):
+        self.edges = edges
+        self.categories = categories
+        self.counts = counts
+        self.features = list(counts)
+        self.lookups = {
+            feature: {category: i for i, category in enumerate(values)}
+            for feature, values in categories.items()
+        }
+
+    def n_bins(self, feature):
+        return len(self.counts[feature])
+
+    def encode(self, feature, values):
+        """Map values of a feature onto its reference bins."""
+
+        if feature in self.lookups:
+            lookup, missing = self.lookups[feature], len(self.categories[feature])
+            return np.array([lookup.get(v, missing) for v in values], dtype=np.int64)
+
+        values = np.asarray(values, dtype=np.float64)
+        codes = np.searchsorted(self.edges[feature], values, side="right")
+        return np.where(np.isnan(values), len(self.edges[feature]) + 1, codes)
+
+    @classmethod
+    def from_frame(
+        cls,
+        df,
+        predictions,
+        num_features=NUM_FEATURES,
+        cat_features=CAT_FEATURES,
+        n_bins=10,
+    ):
+        """
+        Derive a drift reference from the training data and the model's predictions on it.
+
+        Args:
+            df (pd.DataFrame): training records
+            predictions (np.ndarray): predictions of the model on df
+            num_features (list)
+            cat_features (list)
+            n_bins (int): number of quantile bins for numerical features
+
+        Returns:
+            DriftReference
+
+        """
+
+        values = {col: df[col] for col in num_features + cat_features}
+        values[PREDICTION] = pd.Series(predictions)
+
+        edges = {
+            col: np.unique(
+                np.nanquantile(
+                    values[col].astype(np.float64),
+                    np.linspace(0, 1, n_bins + 1)[1:-1],
+                )
+            ).tolist()
+            for col in num_features + [PREDICTION]
+        }
+        categories = {
+            col: sorted(pd.unique(values[col].dropna().astype(object)).tolist())
+            for col in cat_features
+        }
+
+        reference = cls(edges, categories, counts={})
+        reference.counts = {
+            col: np.bincount(
+                reference.encode(col, values[col].values),
+                minlength=(
+                    len(edges[col]) + 2 if col in edges else len(categories[col]) + 1
+                ),
+            ).tolist()
+            for col in num_features + cat_features + [PREDICTION]
+        }
+        reference.features = list(reference.counts)
+
+        return reference
+
+    def save(self, path=DRIFT_REFERENCE_PATH):
+        with open(path, "w") as f:
+            json.dump(
+                {"edges": self.edges, "categories": self.categories, "counts": self.counts},
+                f,
+            )
+
+        return path
+
+    @classmethod
+    def load(cls, path=DRIFT_REFERENCE_PATH):
+        with open(path, "r") as f:
+            return cls(**json.load(f))
+
+
+class OnlineDriftMonitor:
+    """Sliding-window drift statistics of the records scored by a model replica.
+
+    The bins of the last `window` records (and predictions) are kept in a ring buffer,
+    along with the bin counts of the window, which are updated in O(number of features)
+    as each record enters and the oldest one leaves. The Population Stability Index
+    between the window and the reference is only computed on request, by status(), so
+    input drift is visible as soon as records are scored - without reading anything back
+    from the metric store.
+
+    The PSI of a small sample is biased upwards - roughly by the number of bins over the
+    number of records, even without any drift - so the PSI of each feature is only
+    reported once the window holds `min_records_per_bin` records per reference bin of
+    the feature (and at least `min_records`), and drift is only flagged once every
+    feature is reported. A feature with more bins than the window can fill is reported
+    on the full window.
+
+    Attributes:
+        reference (DriftReference)
+        window (int): number of most recent records monitored
+        psi_threshold (float): PSI above which a feature is considered drifted
+        drift_share (float): share of drifted features above which the dataset is
+            considered drifted
+        min_records (int): minimum number of records needed to report any feature
+        min_records_per_bin (int): number of records needed per reference bin of a
+            feature to report its PSI
+        required_records (np.ndarray): number of records needed to report each feature
+        n_seen (int): number of records seen
+
+    """
+
+    def __init__(
+        self,
+        reference,
+        window=1000,
+        psi_threshold=0.2,
+        drift_share=0.5,
+        min_records=100,
+        min_records_per_bin=10,
+    ):
+        self.reference = reference
+        self.window = window
+        self.psi_threshold = psi_threshold
+        self.drift_share = drift_share
+        self.min_records = min_records
+        self.min_records_per_bin = min_records_per_bin
+        self.n_seen = 0
+
+        features = reference.features
+        max_bins = max(reference.n_bins(feature) for feature in features)
+        self.required_records = np.minimum(
+            [
+                max(min_records, min_records_per_bin * reference.n_bins(feature))
+                for feature in features
+            ],
+            window,
+        )
+
+        self.rows = np.arange(len(features))
+        self.codes = np.zeros((window, len(features)), dtype=np.int64)
+        self.counts = np.zeros((len(features), max_bins), dtype=np.int64)
+        self.reference_counts = np.zeros((len(features), max_bins), dtype=np.int64)
+        for i, feature in enumerate(features):
+            self.reference_counts[i, : reference.n_bins(feature)] = reference.counts[
+                feature
+            ]
+
+        self.lock = threading.Lock()
+
+    def update(self, df, predictions):
+        """
+        Add scored records to the window.
+
+        Args:
+            df (pd.DataFrame): records, including the monitored features
+            predictions (np.ndarray): predictions of the model on df
+
+        """
+
+        codes = np.column_stack(
+            [
+                self.reference.encode(
+                    feature,
+                    np.ravel(predictions) if feature == PREDICTION else df[feature].values,
+                )
+                for feature in self.reference.features
+            ]
+        )
+
+        with self.lock:
+            for row in codes:
+                slot = self.n_seen % self.window
+                if self.n_seen >= self.window:
+                    self.counts[self.rows, self.codes[slot]] -= 1
+                self.counts[self.rows, row] += 1
+                self.codes[slot] = row
+                self.n_seen += 1
+
+    def status(self):
+        """
+        Return the drift status of the window: the PSI of each feature against the
+        reference (None until the window holds enough records for the feature), the
+        drifted features, and whether the dataset as a whole drifted.
+
+        Returns:
+            dict
+
+        """
+
+        with self.lock:
+            counts = self.counts.copy()
+            n_seen = self.n_seen
+
+        n = min(n_seen, self.window)
+        reported = n >= self.required_records
+        psi = np.where(
+            reported, population_stability_index(self.reference_counts, counts), np.nan
+        )
+        ready = bool(reported.all())
+
+        drifted = [
+            feature
+            for feature, value in zip(self.reference.features, psi)
+            if ready and value > self.psi_threshold
+        ]
+        share = len(drifted) / len(self.reference.features) if ready else None
+
+        return {
+            "n_records": n,
+            "n_seen": n_seen,
+            "window": self.window,
+            "ready": ready,
+            "required_records": dict(
+                zip(self.reference.features, self.required_records.tolist())
+            ),
+            "psi": {
+                feature: None if np.isnan(value) else round(float(value), 4)
+                for feature, value in zip(self.reference.features, psi)
+            },
+            "psi_threshold": self.psi_threshold,
+            "drifted_features": drifted,
+            "share_drifted_features": share,
+            "dataset_drift": None if share is None else share >= self.drift_share,
+            "timestamp": time.time(),
+        }
@@ -0,0 +1,314 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+
+from src.utils import TARGET, PREDICTION
+from src.sketch import QuantileSketch
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+PERFORMANCE_DIR = "data/working/monitoring/performance"
+
+OVERALL = "__all__"
+
+
+class PerformanceTracker:
+    """An incremental regression performance engine.
+
+    Rather than recomputing error metrics over every record in each report, this class
+    accumulates sufficient statistics (count, sum of errors, absolute errors, squared
+    errors and absolute percentage errors) along with a residual QuantileSketch for each
+    day and segment as delayed ground truths arrive. Statistics for any time range and
+    segment are then obtained by merging the accumulated entries - no raw predictions
+    need to be rescanned.
+
+    Errors are defined as prediction - ground truth, consistent with Evidently.
+    Statistics are kept per model build, so that the metrics of a newly deployed model
+    aren't merged into those of the model it replaced.
+
+    Attributes:
+        build_id (str): ID of the model build whose predictions are tracked
+        segment_cols (list): categorical columns to break performance down by
+        relative_accuracy (float): relative accuracy of the residual quantile sketches
+        directory (str): location where accumulated statistics are persisted
+        stats (dict): (date, segment column, segment value) -> accumulated statistics
+
+    """
+
+    sum_fields = ["n", "sum_error", "sum_abs_error", "sum_sq_error", "sum_abs_perc_error"]
+
+    def __init__(
+        self,
+        build_id,
+        segment_cols=("zipcode",),
+        relative_accuracy=0.01,
+        directory=PERFORMANCE_DIR,
+    ):
+        self.build_id = build_id
+        self.segment_cols = list(segment_cols)
+        self.relative_accuracy = relative_accuracy
+        self.directory = directory
+        self.stats = {}
+
+    @staticmethod
+    def get_path(build_id, directory=PERFORMANCE_DIR):
+        return os.path.join(directory, f"{build_id}.json")
+
+    @classmethod
+    def load_or_create(cls, build_id, directory=PERFORMANCE_DIR, **kwargs):
+        """
+        Load the statistics accumulated by previous runs for the provided model build if
+        they exist, or else create an empty tracker.
+        """
+
+        path = cls.get_path(build_id, directory)
+        if os.path.exists(path):
+            tracker = cls.load(build_id, directory)
+            logger.info(
+                f"Loaded performance statistics of {len(tracker.stats)} entries: {path}"
+            )
+            return tracker
+
+        return cls(build_id, directory=directory, **kwargs)
+
+    def update(self, metrics_df, replace=False):
+        """
+        Accumulate performance statistics for newly sold records. Each record should only
+        be passed to update() once - i.e. when its ground truth is added to the metric store.
+
+        Args:
+            metrics_df (pd.DataFrame): formatted model metrics including ground truth values
+            replace (bool): flag for replacing (rather than adding to) the statistics of the
+                days present, when the records hold all records sold on their days - so
+                that rerunning a batch doesn't count its records twice
+
+        """
+
+        df = metrics_df.loc[metrics_df[TARGET].notna()]
+        if df.empty:
+            return
+
+        error = (df[PREDICTION] - df[TARGET]).astype(np.float64)
+        frame = pd.DataFrame(
+            {
+                "date": pd.to_datetime(df["date_sold"]).dt.strftime("%Y-%m-%d").values,
+                "error": error.values,
+                "abs_error": error.abs().values,
+                "sq_error": (error ** 2).values,
+                "abs_perc_error": (error.abs() / df[TARGET].abs()).values,
+            }
+        )
+
+        if replace:
+            days = set(frame["date"].unique())
+            self.stats = {
+                key: entry for key, entry in self.stats.items() if key[0] not in days
+            }
+
+        segments = [(OVERALL, np.full(len(df), OVERALL, dtype=object))] + [
+            (col, df[col].astype(str).values) for col in self.segment_cols
+        ]
+
+        for segment_col, values in segments:
+            frame["value"] = values
+            grouped = frame.groupby(["date", "value"], sort=False)
+            sums = grouped.agg(
+                n=("error", "size"),
+                sum_error=("error", "sum"),
+                sum_abs_error=("abs_error", "sum"),
+                sum_sq_error=("sq_error", "sum"),
+                sum_abs_perc_error=("abs_perc_error", "sum"),
+            )
+
+            for (date, value), row in zip(sums.index, sums.itertuples(index=False)):
+                entry = self.get_entry(date, segment_col, value)
+                for field in self.sum_fields:
+                    entry[field] += getattr(row, field)
+
+            for (date, value), idx in grouped.indices.items():
+                self.get_entry(date, segment_col, value)["sketch"].add(
+                    frame["error"].values[idx]
+                )
+
+        logger.info(f"Updated performance statistics with {len(df)} records")
+
+    def get_entry(self, date, segment_col, value):
+        key = (date, segment_col, value)
+        if key not in self.stats:
+            self.stats[key] = {
+                **{field: 0 for field in self.sum_fields},
+                "sketch": QuantileSketch(self.relative_accuracy),
+            }
+        return self.stats[key]
+
+    def query(self, start=None, end=None, segment_col=None, quantiles=(0.05, 0.5, 0.95)):
+        """
+        Return regression performance metrics for records sold within [start, end), for
+        the whole population or broken down by a segment column.
+
+        Args:
+            start (str or pd.Timestamp): inclusive start date (unbounded if None)
+            end (str or pd.Timestamp): exclusive end date (unbounded if None)
+            segment_col (str): one of self.segment_cols, or None for overall metrics
+            quantiles (tuple): residual quantiles to estimate
+
+        Returns:
+            pd.DataFrame: one row per segment value with n, MAE, RMSE, MAPE, bias and
+                residual quantiles
+
+        """
+
+        segment_col = segment_col or OVERALL
+        start = pd.Timestamp(start).strftime("%Y-%m-%d") if start is not None else None
+        end = pd.Timestamp(end).strftime("%Y-%m-%d") if end is not None else None
+
+        merged = {}
+        for (date, col, value), entry in self.stats.items():
+            if col != segment_col:
+                continue
+            if (start is not None and date < start) or (end is not None and date >= end):
+                continue
+
+            if value not in merged:
+                merged[value] = {
+                    **{field: 0 for field in self.sum_fields},
+                    "sketch": QuantileSketch(self.relative_accuracy),
+                }
+            for field in self.sum_fields:
+                merged[value][field] += entry[field]
+            merged[value]["sketch"].merge(entry["sketch"])
+
+        rows = []
+        for value, m in merged.items():
+            n = m["n"]
+            rows.append(
+                {
+                    "segment": value,
+                    "n": n,
+                    "mae": m["sum_abs_error"] / n,
+                    "rmse": np.sqrt(m["sum_sq_error"] / n),
+                    "mape": m["sum_abs_perc_error"] / n,
+                    "bias": m["sum_error"] / n,
+                    **{
+                        f"residual_q{int(q * 100):02d}": m["sketch"].quantile(q)
+                        for q in quantiles
+                    },
+                }
+            )
+
+        columns = ["segment", "n", "mae", "rmse", "mape", "bias"] + [
+            f"residual_q{int(q * 100):02d}" for q in quantiles
+        ]
+
+        return (
+            pd.DataFrame(rows, columns=columns)
+            .sort_values("n", ascending=False)
+            .reset_index(drop=True)
+        )
+
+    def save(self):
+        """Persist accumulated statistics to disk as JSON, keyed by model build ID."""
+
+        records = [
+            {
+                "date": date,
+                "segment_col": col,
+                "value": value,
+                **{
+                    field: int(entry[field]) if field == "n" else float(entry[field])
+                    for field in self.sum_fields
+                },
+                "sketch": entry["sketch"].to_dict(),
+            }
+            for (date, col, value), entry in self.stats.items()
+        ]
+
+        path = self.get_path(self.build_id, self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "build_id": self.build_id,
+                    "segment_cols": self.segment_cols,
+                    "relative_accuracy": self.relative_accuracy,
+                    "stats": records,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(cls, build_id, directory=PERFORMANCE_DIR):
+        """Load the accumulated statistics of the provided model build from disk."""
+
+        with open(cls.get_path(build_id, directory), "r") as f:
+            d = json.load(f)
+
+        tracker = cls(
+            build_id,
+            segment_cols=d["segment_cols"],
+            relative_accuracy=d["relative_accuracy"],
+            directory=directory,
+        )
+        for record in d["stats"]:
+            key = (record["date"], record["segment_col"], record["value"])
+            tracker.stats[key] = {
+                **{field: record[field] for field in cls.sum_fields},
+                "sketch": QuantileSketch.from_dict(record["sketch"]),
+            }
+
+        return tracker
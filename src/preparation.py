@@ -0,0 +1,308 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import io
+import os
+import shutil
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from src.utils import random_day_offsets, save_partitioned, merge_partitioned
+from src.schema import apply_schema
+from src.sketch import QuantileSketch
+
+RAW_PATH = "data/raw/kc_house_data.csv"
+WORKING_DIR = "data/working"
+
+# the first 6 months of sold records are used for training, the remainder for production
+TRAIN_END_DATE = "2014-10-31"
+
+RAW_DATE_FORMAT = "%Y%m%dT%H%M%S"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+
+def find_chunk_ranges(path, chunk_bytes):
+    """
+    Split a CSV file into byte ranges of roughly chunk_bytes that each hold whole lines.
+
+    Assumes no quoted field spans multiple lines, which holds for the raw housing data.
+
+    Returns:
+        list: header column names
+        list: (start, end) byte offsets of each chunk
+
+    """
+
+    size = os.path.getsize(path)
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+
+        ranges = []
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+
+    return columns, ranges
+
+
+def read_chunk(path, chunk_range, columns, usecols=None):
+    """Parse the lines of a CSV file within a byte range into a pd.DataFrame."""
+
+    start, end = chunk_range
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    return pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=usecols)
+
+
+def scan_chunk(path, chunk_range, columns):
+    """First pass: return the IDs of a chunk."""
+
+    df = read_chunk(path, chunk_range, columns, usecols=["id"])
+
+    return df.id.values.astype(np.int64)
+
+
+def sketch_chunk(path, chunk_range, columns, keep, col, relative_accuracy):
+    """Second pass: sketch the distribution of a column over a chunk's deduplicated rows."""
+
+    df = read_chunk(path, chunk_range, columns, usecols=[col])
+
+    sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+    sketch.add(df[col].values[keep])
+
+    return sketch
+
+
+def process_chunk(path, chunk_range, columns, keep, seed, bounds, output_dirs):
+    """
+    Final pass: prepare the deduplicated rows of a chunk, split them into training and
+    production records, and save each as a partitioned dataset of the chunk.
+
+    Args:
+        path (str): raw CSV file
+        chunk_range (tuple): byte range of the chunk
+        columns (list): raw column names
+        keep (np.ndarray): boolean mask of the chunk's rows to keep
+        seed (np.random.SeedSequence): seed of the chunk's listing date offsets
+        bounds (dict): column -> (lower, upper) inclusive outlier bounds
+        output_dirs (tuple): directories to save the training and production records to
+
+    Returns:
+        pd.Timestamp: latest sold date of the prepared records, or NaT if there are none
+
+    """
+
+    df = read_chunk(path, chunk_range, columns)
+
+    # draw offsets for every row of the chunk, so they don't depend on deduplication
+    rng = np.random.default_rng(seed)
+    date_sold = pd.to_datetime(df.date, format=RAW_DATE_FORMAT)
+    date_listed = random_day_offsets(date_sold, rng)
+
+    df = df.drop(columns=["date"]).assign(date_sold=date_sold, date_listed=date_listed)
+    df = df[keep]
+
+    # remove outliers, along with any incomplete records (see src.utils.outlier_removal)
+    mask = df.notna().all(axis=1).values
+    for col, (lower, upper) in bounds.items():
+        mask = mask & df[col].between(lower, upper).values
+    df = apply_schema(df[mask], categorical=False)
+
+    # production records are cut off at the end of the data once all chunks are done
+    train_dir, prod_dir = output_dirs
+    save_partitioned(df[df.date_sold <= TRAIN_END_DATE], train_dir)
+    save_partitioned(df[df.date_sold > TRAIN_END_DATE], prod_dir)
+
+    return df.date_sold.max()
+
+
+def prepare_data(
+    raw_path=RAW_PATH,
+    working_dir=WORKING_DIR,
+    chunk_bytes=32 * 1024 ** 2,
+    multiple=3,
+    outlier_cols=("price",),
+    relative_accuracy=0.001,
+    seed=42,
+    n_jobs=None,
+):
+    """
+    Prepare the raw housing data for the simulation in a chunked, streaming fashion.
+
+    The raw CSV is split into byte ranges that are parsed in parallel by a pool of worker
+    processes, over three passes that each only hold the columns they need:
+
+        1. Scan IDs and sold dates, and find the first occurrence of every ID across
+            all chunks
+        2. Sketch the distribution of each outlier column over the deduplicated rows, to
+            find IQR outlier bounds without holding the column in memory
+        3. Parse sold dates, draw artificial listing dates from per-chunk seeded random
+            generators, remove duplicates and outliers, split records into training
+            and production sets, and save them from the workers as temporary
+            month-partitioned datasets of each chunk
+
+    The chunks' datasets are then merged into "train" and "prod" datasets under
+    working_dir one month at a time (see src.utils.merge_partitioned), dropping the
+    partial last month of production records, so the full dataset is never held in
+    memory. Records are cast to the compact dtypes of src.schema.
+
+    Args:
+        raw_path (str)
+        working_dir (str): directory to save the "train" and "prod" datasets to
+        chunk_bytes (int): approximate size of each chunk of the raw CSV
+        multiple (float): outlier strictness, in multiples of the IQR from each quartile
+        outlier_cols (tuple): columns to remove outliers from
+        relative_accuracy (float): relative accuracy of the quartile estimates
+        seed (int): seed of the artificial listing dates
+        n_jobs (int): number of worker processes, defaults to the number of CPUs
+
+    Returns:
+        dict: dataset name ("train" or "prod") -> number of records saved
+
+    """
+
+    columns, ranges = find_chunk_ranges(raw_path, chunk_bytes)
+    n_chunks = len(ranges)
+    paths, cols = [raw_path] * n_chunks, [columns] * n_chunks
+
+    os.makedirs(working_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".prepare-", dir=working_dir)
+    names = ("train", "prod")
+    output_dirs = [
+        tuple(os.path.join(tmp_dir, f"{name}-{i:05d}") for name in names)
+        for i in range(n_chunks)
+    ]
+
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+
+            # 1. keep the first occurrence of each ID, in file order
+            ids = list(executor.map(scan_chunk, paths, ranges, cols))
+            all_ids = np.concatenate(ids)
+            keep = np.zeros(len(all_ids), dtype=bool)
+            keep[np.unique(all_ids, return_index=True)[1]] = True
+            keep = np.split(keep, np.cumsum([len(chunk_ids) for chunk_ids in ids])[:-1])
+
+            logger.info(
+                f"Scanned {len(all_ids)} raw records in {n_chunks} chunks, "
+                f"{len(all_ids) - sum(k.sum() for k in keep)} duplicate IDs"
+            )
+            del all_ids, ids
+
+            # 2. IQR outlier bounds from merged quantile sketches
+            bounds = {}
+            for col in outlier_cols:
+                sketch = QuantileSketch(relative_accuracy=relative_accuracy)
+                for chunk_sketch in executor.map(
+                    sketch_chunk,
+                    paths,
+                    ranges,
+                    cols,
+                    keep,
+                    [col] * n_chunks,
+                    [relative_accuracy] * n_chunks,
+                ):
+                    sketch.merge(chunk_sketch)
+
+                q1, q3 = sketch.quantile(0.25), sketch.quantile(0.75)
+                iqr = q3 - q1
+                bounds[col] = (q1 - multiple * iqr, q3 + multiple * iqr)
+
+            logger.info(f"Outlier bounds: {bounds}")
+
+            # 3. prepare, split and save each chunk
+            seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+            max_dates = list(
+                executor.map(
+                    process_chunk,
+                    paths,
+                    ranges,
+                    cols,
+                    keep,
+                    seeds,
+                    [bounds] * n_chunks,
+                    output_dirs,
+                )
+            )
+
+        # drop the partial last month of the prepared (deduplicated, outlier-free) records
+        max_sold_date = pd.Series(max_dates).max().to_period("M").to_timestamp()
+
+        counts = {
+            name: merge_partitioned(
+                [dirs[i] for dirs in output_dirs],
+                os.path.join(working_dir, name),
+                date_range=(None, max_sold_date) if name == "prod" else None,
+                prepare=apply_schema,
+            )
+            for i, name in enumerate(names)
+        }
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    logger.info(
+        f"Prepared {counts['train']} training and {counts['prod']} production records"
+    )
+
+    return counts
@@ -0,0 +1,153 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import logging
+
+from src.utils import prepare_report_data, save_frame, load_frame
+from src.sampling import sample_frame, REPORT_STRATA
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+REFERENCE_DIR = "data/working/reference"
+
+
+class ReferenceProfile:
+    """The reference (training) side of every monitoring report for a given model build.
+
+    The training baseline only changes when a new model is built, so the prepared
+    reference data (prices scaled, indexed and sorted by sold date, and rounded) is
+    computed once per build and persisted to disk in compressed binary form. Subsequent
+    simulations and report builds load the profile instead of re-scoring the training
+    data and re-querying the metric store.
+
+    Attributes:
+        build_id (str): ID of the model build this reference belongs to
+        data (pd.DataFrame): prepared reference records
+        directory (str): location where reference profiles are persisted
+
+    """
+
+    def __init__(self, build_id, data, directory=REFERENCE_DIR):
+        self.build_id = build_id
+        self.data = data
+        self.directory = directory
+
+    def __len__(self):
+        return len(self.data)
+
+    @classmethod
+    def from_metrics_df(cls, build_id, metrics_df, directory=REFERENCE_DIR):
+        """
+        Derive a reference profile from the formatted model metrics of the training data.
+
+        Args:
+            build_id (str)
+            metrics_df (pd.DataFrame): output of Simulation.query_model_metrics()
+
+        Returns:
+            ReferenceProfile
+
+        """
+        return cls(
+            build_id=build_id,
+            data=prepare_report_data(metrics_df),
+            directory=directory,
+        )
+
+    @staticmethod
+    def get_path(build_id, directory=REFERENCE_DIR):
+        return os.path.join(directory, f"{build_id}.npz")
+
+    @classmethod
+    def exists(cls, build_id, directory=REFERENCE_DIR):
+        return os.path.exists(cls.get_path(build_id, directory))
+
+    @classmethod
+    def load(cls, build_id, directory=REFERENCE_DIR):
+        """Load the persisted reference profile for the provided model build."""
+
+        path = cls.get_path(build_id, directory)
+        profile = cls(build_id=build_id, data=load_frame(path), directory=directory)
+        logger.info(f"Loaded reference profile with {len(profile)} records: {path}")
+
+        return profile
+
+    def save(self):
+        """Persist the reference profile to disk, keyed by model build ID."""
+
+        path = self.get_path(self.build_id, self.directory)
+        save_frame(self.data, path)
+        logger.info(f"Saved reference profile with {len(self)} records: {path}")
+
+        return path
+
+    def sample(self, n, random_state=42):
+        """
+        Return a random sample of (at most) n prepared reference records, sorted by sold
+        date, stratified by REPORT_STRATA so that the sample matches the reference
+        proportions of each stratum.
+
+        Args:
+            n (int): sample size - all records are returned if n exceeds the reference
+            random_state (int)
+
+        Returns:
+            pd.DataFrame
+
+        """
+        strata = REPORT_STRATA if REPORT_STRATA in self.data.columns else None
+
+        return sample_frame(
+            self.data, n, strata=strata, seed=random_state
+        ).sort_index(kind="mergesort")
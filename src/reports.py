@@ -0,0 +1,352 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import base64
+import shutil
+import logging
+import evidently
+from evidently import ColumnMapping
+from evidently.dashboard import Dashboard
+from evidently.dashboard.tabs import (
+    DataDriftTab,
+    NumTargetDriftTab,
+    RegressionPerformanceTab,
+)
+from evidently.model_profile import Profile
+from evidently.model_profile.sections import (
+    DataDriftProfileSection,
+    NumTargetDriftProfileSection,
+    RegressionPerformanceProfileSection,
+)
+
+from src.utils import (
+    save_frame,
+    load_frame,
+    compress_file,
+    find_stored_file,
+    TARGET,
+    PREDICTION,
+    NUM_FEATURES,
+    CAT_FEATURES,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+# report name -> (Evidently dashboard tab, Evidently profile section)
+REPORTS = {
+    "data_drift": (DataDriftTab, DataDriftProfileSection),
+    "num_target_drift": (NumTargetDriftTab, NumTargetDriftProfileSection),
+    "reg_performance": (RegressionPerformanceTab, RegressionPerformanceProfileSection),
+}
+
+INPUTS_DIR = "inputs"
+
+# Evidently's JS/CSS bundle is published once (per Evidently version) to ASSETS_DIR and
+# referenced by every report, rather than inlined into each report file
+ASSETS_DIR = "apps/static/assets"
+ASSETS_URL = "../../assets"  # relative to a report's URL: reports/<date range>/<report>
+EVIDENTLY_STATIC_PATH = os.path.join(
+    os.path.dirname(evidently.__file__), "nbextension", "static"
+)
+SHARED_ASSETS = {
+    "index.js": f"evidently-{evidently.__version__}.js",
+    "material-ui-icons.woff2": f"material-ui-icons-{evidently.__version__}.woff2",
+}
+
+
+def get_column_mapping():
+    """Return the Evidently ColumnMapping shared by all monitoring reports."""
+
+    column_mapping = ColumnMapping()
+    column_mapping.target = TARGET
+    column_mapping.prediction = PREDICTION
+    column_mapping.numerical_features = NUM_FEATURES
+    column_mapping.categorical_features = CAT_FEATURES
+    column_mapping.datetime = None
+
+    return column_mapping
+
+
+def get_report_path(report_dir, report_name):
+    return os.path.join(report_dir, f"{report_name}_report.html")
+
+
+def report_exists(report_dir, report_name):
+    """Check whether the HTML report has been rendered, in plain or precompressed form."""
+    return bool(find_stored_file(get_report_path(report_dir, report_name)))
+
+
+def get_profile_path(report_dir, report_name):
+    return os.path.join(report_dir, f"{report_name}_profile.json")
+
+
+def build_profiles(reference_data, current_data, report_dir):
+    """
+    Calculate a compact JSON metric profile for each report type and save them to the
+    report directory. No HTML is rendered.
+
+    Returns:
+        dict: report name -> profile dictionary
+
+    """
+
+    profiles = {}
+    for report_name, (_, section) in REPORTS.items():
+        profile = Profile(sections=[section()])
+        profile.calculate(
+            reference_data, current_data, column_mapping=get_column_mapping()
+        )
+
+        profile_path = get_profile_path(report_dir, report_name)
+        with open(profile_path, "w") as f:
+            f.write(profile.json())
+
+        profiles[report_name] = profile.object()
+        logger.info(f"Generated new Evidently profile: {profile_path}")
+
+    return profiles
+
+
+def save_report_inputs(reference_data, current_data, report_dir):
+    """
+    Save the prepared reference and current data for a set of reports so that the HTML
+    reports can be rendered later on demand.
+    """
+
+    inputs_dir = os.path.join(report_dir, INPUTS_DIR)
+    save_frame(reference_data, os.path.join(inputs_dir, "reference.npz"))
+    save_frame(current_data, os.path.join(inputs_dir, "current.npz"))
+
+
+def load_report_inputs(report_dir):
+    """Load the prepared reference and current data saved with save_report_inputs()."""
+
+    inputs_dir = os.path.join(report_dir, INPUTS_DIR)
+
+    return (
+        load_frame(os.path.join(inputs_dir, "reference.npz")),
+        load_frame(os.path.join(inputs_dir, "current.npz")),
+    )
+
+
+def publish_shared_assets(assets_dir=ASSETS_DIR):
+    """
+    Copy the versioned Evidently JS bundle and icon font to the application's static
+    assets, precompressed, if they have not been published yet.
+
+    Report builds may publish concurrently (e.g. backfill workers) while the application
+    serves the assets as immutable, so each process writes its own temporary copies and
+    moves them into place - the uncompressed file last, since it marks the asset as
+    published. A partially written asset is never visible under its final name.
+    """
+
+    os.makedirs(assets_dir, exist_ok=True)
+
+    for source, target in SHARED_ASSETS.items():
+        target_path = os.path.join(assets_dir, target)
+        if os.path.exists(target_path):
+            continue
+
+        tmp_path = f"{target_path}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(os.path.join(EVIDENTLY_STATIC_PATH, source), tmp_path)
+            for compressed_path in compress_file(tmp_path, remove_original=False):
+                os.replace(
+                    compressed_path, target_path + compressed_path[len(tmp_path) :]
+                )
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        logger.info(f"Published shared report asset: {target_path}")
+
+
+def replace_enclosing(html, content, start_token, end_token, replacement):
+    """
+    Replace the span of html that encloses `content`, from the last `start_token` before
+    it through the first `end_token` after it. Returns None if content or either of the
+    enclosing tokens is not found.
+    """
+
+    idx = html.find(content)
+    if idx == -1:
+        return None
+
+    start = html.rfind(start_token, 0, idx)
+    end = html.find(end_token, idx + len(content))
+    if start == -1 or end == -1:
+        return None
+
+    return html[:start] + replacement + html[end + len(end_token):]
+
+
+def deduplicate_assets(html):
+    """
+    Strip the inlined Evidently JS bundle and icon font from a single-file report,
+    referencing the shared, versioned assets instead, so the report only carries its own
+    data payload. The html is returned unchanged if the bundle cannot be located.
+    """
+
+    with open(os.path.join(EVIDENTLY_STATIC_PATH, "index.js"), "r") as f:
+        lib = f.read()
+    with open(os.path.join(EVIDENTLY_STATIC_PATH, "material-ui-icons.woff2"), "rb") as f:
+        font = base64.b64encode(f.read()).decode()
+
+    deduplicated = replace_enclosing(
+        html,
+        lib,
+        "<script",
+        "</script>",
+        f'<script src="{ASSETS_URL}/{SHARED_ASSETS["index.js"]}"></script>',
+    )
+    if deduplicated is None:
+        logger.warning("Evidently bundle not found in report; keeping it inline.")
+        return html
+
+    return (
+        replace_enclosing(
+            deduplicated,
+            font,
+            "url(",
+            ")",
+            f'url({ASSETS_URL}/{SHARED_ASSETS["material-ui-icons.woff2"]})',
+        )
+        or deduplicated
+    )
+
+
+def render_report_html(report_name, reference_data, current_data):
+    """
+    Calculate a single Evidently report and return its HTML, which references the shared
+    Evidently assets published to ASSETS_DIR instead of carrying its own copy of them.
+    """
+
+    tab, _ = REPORTS[report_name]
+
+    dashboard = Dashboard(tabs=[tab()])
+    dashboard.calculate(
+        reference_data=reference_data,
+        current_data=current_data,
+        column_mapping=get_column_mapping(),
+    )
+
+    publish_shared_assets()
+
+    return deduplicate_assets(dashboard.html())
+
+
+def render_report(report_name, reference_data, current_data, report_path):
+    """
+    Calculate a single Evidently HTML report and save it precompressed (see
+    src.utils.compress_file) so it can be served with a matching Content-Encoding.
+    """
+
+    with open(report_path, "w") as f:
+        f.write(render_report_html(report_name, reference_data, current_data))
+    compress_file(report_path)
+    logger.info(f"Generated new Evidently report: {report_path}")
+
+    return report_path
+
+
+def render_report_from_profile(report_dir, report_name):
+    """
+    Render the HTML report for a report directory built in headless mode.
+
+    Evidently cannot reconstruct a dashboard from the JSON profile alone, so headless
+    builds store the prepared inputs next to their profiles and the dashboard is
+    calculated from those.
+    """
+
+    reference_data, current_data = load_report_inputs(report_dir)
+
+    return render_report(
+        report_name,
+        reference_data,
+        current_data,
+        get_report_path(report_dir, report_name),
+    )
+
+
+def build_reports(reference_data, current_data, report_dir, headless=False):
+    """
+    Build the set of monitoring reports for prepared reference and current data.
+
+    JSON metric profiles are always produced. Unless headless, the full HTML dashboards
+    are rendered as well; in headless mode only the inputs are stored, and the HTML is
+    rendered lazily by the dashboard application when a report is opened (or eagerly with
+    render_report_from_profile()).
+
+    Returns:
+        dict: report name -> profile dictionary
+
+    """
+
+    os.makedirs(report_dir, exist_ok=True)
+
+    profiles = build_profiles(reference_data, current_data, report_dir)
+
+    if headless:
+        save_report_inputs(reference_data, current_data, report_dir)
+    else:
+        for report_name in REPORTS:
+            render_report(
+                report_name,
+                reference_data,
+                current_data,
+                get_report_path(report_dir, report_name),
+            )
+
+    return profiles
@@ -0,0 +1,420 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import json
+import copy
+import pickle
+import logging
+import numpy as np
+import pandas as pd
+
+from src.utils import TARGET, NUM_FEATURES, CAT_FEATURES
+from src.schema import INPUT_COLUMNS
+from src.manifest import summarize_profiles
+from src.challengers import CHALLENGER_DIR
+
+RETRAINING_DIR = "data/working/retraining"
+RETRAINING_LOG_FILE = "retraining_log.jsonl"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+
+class RidgeStatistics:
+    """Daily sufficient statistics of a ridge regression.
+
+    For each day, the row count, feature and target sums, X'X and X'y of the
+    (preprocessed) features X and (transformed) targets y are accumulated. Summing the
+    days of any window and solving a p x p system then yields exactly the ridge
+    regression that would be fit on all rows of that window, in time proportional to
+    the number of features rather than rows.
+
+    Attributes:
+        n_features (int)
+        days (dict): "%Y-%m-%d" -> dict of statistics
+
+    """
+
+    def __init__(self, n_features):
+        self.n_features = n_features
+        self.days = {}
+
+    def __len__(self):
+        return sum(int(day["n"]) for day in self.days.values())
+
+    def update(self, X, y, dates, replace=False):
+        """
+        Accumulate rows into the statistics of their days.
+
+        Args:
+            X (np.ndarray): n x p preprocessed features
+            y (np.ndarray): n transformed targets
+            dates (pd.Series): n dates
+            replace (bool): flag for replacing (rather than adding to) the statistics of
+                the days present, when the rows hold all records of their days
+
+        """
+
+        days = pd.to_datetime(pd.Series(dates)).dt.strftime("%Y-%m-%d").values
+        for day in np.unique(days):
+            mask = days == day
+            X_day, y_day = X[mask], y[mask]
+
+            if replace:
+                self.days.pop(day, None)
+            stats = self.days.setdefault(
+                day,
+                {
+                    "n": 0.0,
+                    "sum_x": np.zeros(self.n_features),
+                    "sum_y": 0.0,
+                    "xtx": np.zeros((self.n_features, self.n_features)),
+                    "xty": np.zeros(self.n_features),
+                },
+            )
+            stats["n"] += len(y_day)
+            stats["sum_x"] += X_day.sum(axis=0)
+            stats["sum_y"] += y_day.sum()
+            stats["xtx"] += X_day.T @ X_day
+            stats["xty"] += X_day.T @ y_day
+
+    def solve(self, alpha, start=None, end=None):
+        """
+        Solve the ridge regression (with an intercept) over all days within [start, end).
+
+        Returns:
+            np.ndarray: coefficients
+            float: intercept
+            int: number of rows in the window
+
+        """
+
+        days = [
+            day
+            for day in self.days
+            if (start is None or day >= str(start)[:10])
+            and (end is None or day < str(end)[:10])
+        ]
+        if not days:
+            raise ValueError(f"No statistics within [{start}, {end})")
+
+        n = sum(self.days[day]["n"] for day in days)
+        sum_x = sum(self.days[day]["sum_x"] for day in days)
+        sum_y = sum(self.days[day]["sum_y"] for day in days)
+        xtx = sum(self.days[day]["xtx"] for day in days)
+        xty = sum(self.days[day]["xty"] for day in days)
+
+        # center on the window means, as Ridge does when fitting an intercept
+        x_mean, y_mean = sum_x / n, sum_y / n
+        gram = xtx - n * np.outer(x_mean, x_mean)
+        moment = xty - n * x_mean * y_mean
+
+        coef = np.linalg.solve(gram + alpha * np.eye(self.n_features), moment)
+
+        return coef, y_mean - x_mean @ coef, int(n)
+
+    def save(self, path):
+        days = sorted(self.days)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez(
+            path,
+            days=np.array(days, dtype=str),
+            **{
+                key: np.array([self.days[day][key] for day in days])
+                for key in ("n", "sum_x", "sum_y", "xtx", "xty")
+            },
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            stats = cls(n_features=npz["sum_x"].shape[1])
+            for i, day in enumerate(npz["days"].tolist()):
+                stats.days[day] = {
+                    key: npz[key][i] for key in ("n", "sum_x", "sum_y", "xtx", "xty")
+                }
+                stats.days[day]["n"] = float(stats.days[day]["n"])
+                stats.days[day]["sum_y"] = float(stats.days[day]["sum_y"])
+
+        return stats
+
+
+def preprocessor_input_columns(preprocessor):
+    """
+    Return the input columns that the fitted ColumnTransformer of a preprocessing
+    pipeline (or a ColumnTransformer itself) passes to its transformers.
+    """
+
+    transformer = (
+        preprocessor.steps[-1][1] if hasattr(preprocessor, "steps") else preprocessor
+    )
+
+    return [
+        col
+        for _, step, columns in transformer.transformers_
+        if step != "drop"
+        for col in columns
+    ]
+
+
+class Retrainer:
+    """Continuous, incremental retraining of the deployed price regression model.
+
+    As delayed ground truths arrive, the sold records are preprocessed with the deployed
+    model's fitted preprocessing steps and accumulated into daily RidgeStatistics. When
+    the monitoring reports of a batch cross a drift or error threshold, a new model is
+    refit on a trailing window of those statistics - keeping the deployed preprocessing
+    and regularization - and saved as a challenger model (see src.challengers), which
+    the next deployment of the model scores in its shadow. Each retrain replaces the
+    build's previous challenger, so shadow scoring doesn't slow down as retrains
+    accumulate. Retraining events are logged alongside the statistics.
+
+    Statistics are kept per model build, since they depend on the build's preprocessing.
+    Only the features logged with each prediction (src.utils.NUM_FEATURES and
+    CAT_FEATURES) are available to accumulate, so the model's preprocessing may not use
+    any other column.
+
+    Attributes:
+        build_id (str): ID of the deployed model build
+        model (sklearn.pipeline.Pipeline): the deployed model
+        stats (RidgeStatistics)
+        window_days (int): length of the trailing window retrained on
+        max_mape (float): mean absolute percentage error (%) that triggers retraining
+        target_drift_p (float): target drift p-value below which retraining triggers
+        retrain_on_dataset_drift (bool): flag for retraining when the dataset drifts
+
+    """
+
+    def __init__(
+        self,
+        build_id,
+        model,
+        window_days=180,
+        max_mape=20.0,
+        target_drift_p=0.05,
+        retrain_on_dataset_drift=True,
+        directory=RETRAINING_DIR,
+        model_dir=CHALLENGER_DIR,
+    ):
+        self.build_id = build_id
+        self.model = model
+        self.window_days = window_days
+        self.max_mape = max_mape
+        self.target_drift_p = target_drift_p
+        self.retrain_on_dataset_drift = retrain_on_dataset_drift
+        self.directory = directory
+        self.model_dir = model_dir
+
+        self.preprocessor = model[:-1]
+        self.regressor = model.steps[-1][1]
+        self.alpha = self.regressor.regressor_.alpha
+
+        unlogged = set(preprocessor_input_columns(self.preprocessor)) - set(
+            NUM_FEATURES + CAT_FEATURES
+        )
+        if unlogged:
+            raise ValueError(
+                "Cannot retrain from logged model metrics - the model's preprocessing "
+                f"uses features that aren't logged: {sorted(unlogged)}"
+            )
+
+        path = self.get_path()
+        self.stats = (
+            RidgeStatistics.load(path)
+            if os.path.exists(path)
+            else RidgeStatistics(n_features=self.regressor.regressor_.coef_.shape[-1])
+        )
+
+    @classmethod
+    def from_model_file(cls, build_id, path="model.pkl", **kwargs):
+        with open(path, "rb") as f:
+            return cls(build_id, pickle.load(f), **kwargs)
+
+    def get_path(self):
+        return os.path.join(self.directory, f"{self.build_id}.npz")
+
+    def get_model_path(self):
+        return os.path.join(self.model_dir, f"{self.build_id}_retrained.pkl")
+
+    def update(self, metrics_df):
+        """
+        Accumulate formatted model metrics with ground truths (the output of
+        Simulation.query_model_metrics()) into the statistics, and persist them.
+
+        Each call is expected to hold all records sold on its days - as each batch of
+        the simulation does - so that rerunning a batch replaces its statistics.
+        """
+
+        df = metrics_df.dropna(subset=[TARGET])
+        if not len(df):
+            return
+
+        # the preprocessor expects all the columns it was fit on, but only uses the
+        # logged features (checked on construction) - the other columns are left empty
+        X = self.preprocessor.transform(
+            df[NUM_FEATURES + CAT_FEATURES].reindex(columns=INPUT_COLUMNS)
+        )
+        y = self.regressor.func(df[TARGET].values.astype(np.float64))
+
+        X = np.asarray(X, dtype=np.float64)
+        self.stats.update(X, y, df.date_sold, replace=True)
+        self.stats.save(self.get_path())
+
+        logger.info(
+            f"Accumulated {len(df)} records into retraining statistics "
+            f"({len(self.stats)} records over {len(self.stats.days)} days)"
+        )
+
+    def check_triggers(self, profiles):
+        """
+        Return the reasons (if any) that the monitoring reports of a batch call for
+        retraining.
+
+        Args:
+            profiles (dict): report name -> Evidently profile dictionary
+
+        Returns:
+            list
+
+        """
+
+        summary = summarize_profiles(profiles)
+        reasons = []
+
+        if self.retrain_on_dataset_drift and summary["dataset_drift"]:
+            reasons.append("dataset_drift")
+        if (
+            summary["target_drift"] is not None
+            and summary["target_drift"] < self.target_drift_p
+        ):
+            reasons.append(f"target_drift (p={summary['target_drift']:.3g})")
+        if (
+            summary["mean_abs_perc_error"] is not None
+            and summary["mean_abs_perc_error"] > self.max_mape
+        ):
+            reasons.append(
+                f"mean_abs_perc_error ({summary['mean_abs_perc_error']:.1f}%)"
+            )
+
+        return reasons
+
+    def refit(self, start=None, end=None, alpha=None):
+        """
+        Refit the deployed model's regression on the records sold within [start, end).
+
+        Returns:
+            sklearn.pipeline.Pipeline: a copy of the deployed model with new coefficients
+            int: number of records the model was refit on
+
+        """
+
+        alpha = self.alpha if alpha is None else alpha
+        coef, intercept, n = self.stats.solve(alpha, start, end)
+
+        model = copy.deepcopy(self.model)
+        regressor = model.steps[-1][1]
+        regressor.regressor.set_params(alpha=alpha)
+        regressor.regressor_.set_params(alpha=alpha)
+        regressor.regressor_.coef_ = coef
+        regressor.regressor_.intercept_ = intercept
+
+        return model, n
+
+    def maybe_retrain(self, profiles, date_range):
+        """
+        Retrain on the trailing window ending with a batch if its monitoring reports
+        call for it, saving the model as a challenger and logging the event.
+
+        Returns:
+            str: path of the retrained model, or None if retraining wasn't triggered
+
+        """
+
+        reasons = self.check_triggers(profiles)
+        if not reasons:
+            return None
+
+        end = date_range[1]
+        start = end - pd.Timedelta(days=self.window_days)
+        model, n = self.refit(start, end)
+
+        # every challenger is scored on each request of the next deployment, so only the
+        # latest retrained model of a build is kept, replacing the previous one in place
+        path = self.get_model_path()
+        os.makedirs(self.model_dir, exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(model, f)
+        os.replace(f"{path}.tmp", path)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, RETRAINING_LOG_FILE), "a") as f:
+            f.write(
+                json.dumps(
+                    {
+                        "build_id": self.build_id,
+                        "start": start.strftime("%Y-%m-%d"),
+                        "end": end.strftime("%Y-%m-%d"),
+                        "n_records": n,
+                        "alpha": self.alpha,
+                        "reasons": reasons,
+                        "model_path": path,
+                    }
+                )
+                + "\n"
+            )
+
+        logger.info(
+            f"Retrained model on {n} records sold {start.date()} - {end.date()} "
+            f"({', '.join(reasons)}): {path}"
+        )
+
+        return path
@@ -0,0 +1,230 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+# Maximum number of records on each side of a monitoring report
+REPORT_SAMPLE_SIZE = 10_000
+
+# Categorical column that report samples are stratified by
+REPORT_STRATA = "zipcode"
+
+
+def allocate(totals, n):
+    """
+    Allocate n samples across strata in proportion to their totals, by largest remainder.
+
+    Args:
+        totals (pd.Series): stratum -> total (weight or count)
+        n (int)
+
+    Returns:
+        pd.Series: stratum -> number of samples
+
+    """
+
+    quotas = totals / totals.sum() * n
+    allocation = np.floor(quotas).astype(np.int64)
+    remainder = n - allocation.sum()
+    if remainder > 0:
+        extra = (quotas - allocation).sort_values(ascending=False, kind="mergesort")
+        allocation[extra.index[:remainder]] += 1
+
+    return allocation
+
+
+class Reservoir:
+    """A fixed-memory weighted, stratified random sample of a stream of records.
+
+    Each record is drawn a random key log(u) / weight, with u ~ U(0, 1], and the records
+    with the largest keys form a weighted random sample without replacement
+    (Efraimidis & Spirakis, 2006). With equal weights, this is uniform reservoir sampling.
+    Batches of records are streamed in with update(), and only the records with the
+    largest keys seen so far are kept - at most `capacity` (times `oversample` when
+    stratified) records, regardless of the length of the stream.
+
+    When stratified, the total weight of each stratum is tracked as well, and sample()
+    allocates the sample across strata in proportion to them. The records kept for a
+    stratum are the ones with its largest keys, so each stratum's share of the sample
+    is itself a weighted random sample of the stratum - while the sample as a whole
+    matches the stratum proportions of the stream exactly rather than on average.
+
+    Attributes:
+        capacity (int): maximum sample size
+        strata (str): name of the categorical column to stratify by, if any
+        weights (str): name of the (non-negative) weight column, if any
+        pool_size (int): maximum number of records kept
+        totals (pd.Series): stratum -> total weight seen
+        n_seen (int): number of records seen
+
+    """
+
+    def __init__(self, capacity, strata=None, weights=None, oversample=2.0, seed=42):
+        self.capacity = capacity
+        self.strata = strata
+        self.weights = weights
+        self.pool_size = int(np.ceil(capacity * oversample)) if strata else capacity
+        self.rng = np.random.default_rng(seed)
+
+        self.pool = None
+        self.keys = np.empty(0)
+        self.arrivals = np.empty(0, dtype=np.int64)
+        self.totals = pd.Series(dtype=np.float64)
+        self.n_seen = 0
+
+    def __len__(self):
+        return 0 if self.pool is None else len(self.pool)
+
+    def update(self, df):
+        """Stream a batch of records (pd.DataFrame) into the reservoir."""
+
+        if not len(df):
+            return
+
+        weights = (
+            df[self.weights].values.astype(np.float64)
+            if self.weights
+            else np.ones(len(df))
+        )
+        with np.errstate(divide="ignore"):
+            # records with zero weight get a key of -inf, and are never sampled
+            keys = np.log1p(-self.rng.random(len(df))) / weights
+
+        if self.strata:
+            self.totals = self.totals.add(
+                pd.Series(weights).groupby(np.asarray(df[self.strata])).sum(),
+                fill_value=0,
+            )
+        arrivals = np.concatenate(
+            [self.arrivals, np.arange(self.n_seen, self.n_seen + len(df))]
+        )
+        self.n_seen += len(df)
+
+        pool = df if self.pool is None else pd.concat([self.pool, df])
+        keys = np.concatenate([self.keys, keys])
+
+        if len(pool) > self.pool_size:
+            keep = np.argpartition(-keys, self.pool_size - 1)[: self.pool_size]
+            pool, keys, arrivals = pool.iloc[keep], keys[keep], arrivals[keep]
+
+        self.pool, self.keys, self.arrivals = pool, keys, arrivals
+
+    def sample(self, n=None):
+        """
+        Return a sample of (at most) n records, in the order they were streamed in.
+
+        Args:
+            n (int): sample size - defaults to, and is capped at, the capacity
+
+        Returns:
+            pd.DataFrame
+
+        """
+
+        if self.pool is None:
+            raise ValueError("No records have been streamed into the reservoir")
+
+        n = min(self.capacity if n is None else n, self.capacity, len(self.pool))
+        order = np.argsort(-self.keys, kind="mergesort")
+
+        if not self.strata:
+            selected = order[:n]
+        else:
+            # rank each record's key within its stratum, and take each stratum's top keys
+            strata = np.asarray(self.pool[self.strata])[order]
+            rank = pd.Series(strata).groupby(strata).cumcount().values
+            quota = allocate(self.totals, n).reindex(strata, fill_value=0).values
+            chosen = rank < quota
+
+            # strata with fewer records kept than allocated leave their remaining
+            # samples to the largest keys of the other strata
+            shortfall = n - chosen.sum()
+            if shortfall > 0:
+                chosen[np.flatnonzero(~chosen)[:shortfall]] = True
+            selected = order[chosen]
+
+        return self.pool.iloc[selected[np.argsort(self.arrivals[selected])]]
+
+
+def sample_frame(df, n, strata=None, weights=None, seed=42, chunk_rows=None):
+    """
+    Return a weighted, stratified random sample of (at most) n records of a dataframe,
+    in their original order - see Reservoir.
+
+    Args:
+        df (pd.DataFrame)
+        n (int)
+        strata (str): name of the categorical column to stratify by
+        weights (str): name of the weight column
+        seed (int)
+        chunk_rows (int): stream the dataframe through the reservoir in chunks of this
+            many rows, bounding memory use to the reservoir plus one chunk
+
+    Returns:
+        pd.DataFrame
+
+    """
+
+    if n <= 0 or not len(df):
+        return df.iloc[:0]
+
+    reservoir = Reservoir(capacity=n, strata=strata, weights=weights, seed=seed)
+    chunk_rows = chunk_rows or max(len(df), 1)
+    for start in range(0, len(df), chunk_rows):
+        reservoir.update(df.iloc[start : start + chunk_rows])
+
+    return reservoir.sample(n)
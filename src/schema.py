@@ -0,0 +1,183 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numbers
+import numpy as np
+import pandas as pd
+
+# The single definition of the housing records used across the project - from data
+# preparation and storage, through model training, to requests to the deployed model.
+# Columns are in the order the model is trained on, and use compact dtypes: 32-bit
+# numerics wherever the values fit, and categoricals for low-cardinality codes.
+SCHEMA = {
+    "id": "int64",
+    "price": "float32",
+    "bedrooms": "int32",
+    "bathrooms": "float32",
+    "sqft_living": "int32",
+    "sqft_lot": "int32",
+    "floors": "float32",
+    "waterfront": "int32",
+    "view": "category",
+    "condition": "category",
+    "grade": "int32",
+    "sqft_above": "int32",
+    "sqft_basement": "int32",
+    "yr_built": "int32",
+    "yr_renovated": "int32",
+    "zipcode": "category",
+    "lat": "float32",
+    "long": "float32",
+    "sqft_living15": "int32",
+    "sqft_lot15": "int32",
+    "date_sold": "datetime64[ns]",
+    "date_listed": "datetime64[ns]",
+}
+
+TARGET_COLUMN = "price"
+
+# columns of a request to the deployed model - the target is optional
+INPUT_COLUMNS = [col for col in SCHEMA if col != TARGET_COLUMN]
+
+DATETIME_COLUMNS = [col for col, dt in SCHEMA.items() if dt.startswith("datetime")]
+
+# dtypes of the values of each column - the values of categorical columns are integers
+VALUE_DTYPES = {col: "int32" if dt == "category" else dt for col, dt in SCHEMA.items()}
+
+
+def apply_schema(df, categorical=True):
+    """
+    Cast the schema columns of a pd.DataFrame to their compact dtypes.
+
+    Args:
+        df (pd.DataFrame)
+        categorical (bool): flag for casting categorical columns too; pass False when
+            casting chunks of a dataset that are concatenated later on, since
+            concatenating categoricals with different categories falls back to objects
+
+    Returns:
+        pd.DataFrame
+
+    """
+
+    return df.astype(
+        {
+            col: dt
+            for col, dt in SCHEMA.items()
+            if col in df.columns and (categorical or dt != "category")
+        }
+    )
+
+
+def to_json_records(df):
+    """
+    Encode a pd.DataFrame of schema columns as a list of JSON-serializable records, with
+    datetimes as "%Y-%m-%d" strings.
+    """
+
+    return df.assign(
+        **{
+            col: df[col].dt.strftime("%Y-%m-%d")
+            for col in DATETIME_COLUMNS
+            if col in df.columns
+        }
+    ).to_dict(orient="records")
+
+
+def validate_record(record, columns=INPUT_COLUMNS):
+    """
+    Check that a record holds a value of the right type for each of the provided schema
+    columns.
+
+    Raises:
+        ValueError: listing every missing or invalid field of the record
+
+    """
+
+    errors = []
+    for col in columns:
+        if col not in record:
+            errors.append(f"{col}: missing")
+            continue
+
+        value, dt = record[col], SCHEMA[col]
+        if dt.startswith("int") and not (
+            isinstance(value, numbers.Real) and float(value).is_integer()
+        ):
+            errors.append(f"{col}: expected an integer, got {value!r}")
+        elif dt.startswith("float") and not (
+            value is None or isinstance(value, numbers.Real)
+        ):
+            errors.append(f"{col}: expected a number, got {value!r}")
+        elif dt.startswith("datetime") and not isinstance(value, str):
+            errors.append(f"{col}: expected a date string, got {value!r}")
+
+    if errors:
+        raise ValueError("Invalid record - " + "; ".join(errors))
+
+
+def from_records(records, columns=INPUT_COLUMNS, categorical=False):
+    """
+    Build a pd.DataFrame of the provided schema columns from a list of records, such as
+    the decoded JSON of a request, constructing each column directly with its dtype.
+
+    By default categorical columns hold their raw integer values (e.g. a zipcode of 98001)
+    cast to int32 rather than pd.Categorical, which is cheaper to build for small
+    requests and scores identically, since the model one-hot encodes values.
+
+    Args:
+        records (list): dicts of column -> value
+        columns (list): schema columns to include, in order
+        categorical (bool): flag for casting categorical columns to pd.Categorical
+
+    Returns:
+        pd.DataFrame
+
+    """
+
+    df = pd.DataFrame(
+        {
+            col: np.array([record[col] for record in records], dtype=VALUE_DTYPES[col])
+            for col in columns
+        },
+        columns=columns,
+    )
+
+    return apply_schema(df) if categorical else df
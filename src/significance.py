@@ -0,0 +1,273 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from src.utils import NUM_FEATURES, CAT_FEATURES
+
+
+def encode_feature(reference, current):
+    """
+    Encode reference and current values of a feature as integer codes into their sorted,
+    pooled unique values. Missing values are dropped.
+
+    Returns:
+        tuple: (reference codes, current codes, number of unique values)
+
+    """
+
+    reference = pd.Series(reference).dropna().values
+    current = pd.Series(current).dropna().values
+
+    uniques, codes = np.unique(np.concatenate([reference, current]), return_inverse=True)
+
+    return codes[: len(reference)], codes[len(reference) :], len(uniques)
+
+
+def resample_counts(ref_codes, cur_codes, n_codes, n_resamples, method, rng):
+    """
+    Draw n_resamples permutation or bootstrap resamples at once and return per-code
+    counts of the reference and current sides as (n_resamples, n_codes) matrices.
+
+    Permutation resamples shuffle the current/reference labels of the pooled sample (the
+    null hypothesis of no drift); bootstrap resamples draw each side with replacement
+    from itself (to estimate the sampling distribution of the observed statistic).
+    """
+
+    n_ref, n_cur = len(ref_codes), len(cur_codes)
+    offsets = (np.arange(n_resamples) * n_codes)[:, None]
+
+    if method == "permutation":
+        pooled = np.tile(np.concatenate([ref_codes, cur_codes]), (n_resamples, 1))
+        rng.permuted(pooled, axis=1, out=pooled)
+        cur_sample = pooled[:, :n_cur]
+        ref_sample = pooled[:, n_cur:]
+    elif method == "bootstrap":
+        cur_sample = cur_codes[rng.integers(0, n_cur, (n_resamples, n_cur))]
+        ref_sample = ref_codes[rng.integers(0, n_ref, (n_resamples, n_ref))]
+    else:
+        raise ValueError("method must be one of 'permutation' or 'bootstrap'.")
+
+    size = n_resamples * n_codes
+    cur_counts = np.bincount((cur_sample + offsets).ravel(), minlength=size)
+    ref_counts = np.bincount((ref_sample + offsets).ravel(), minlength=size)
+
+    return (
+        ref_counts.reshape(n_resamples, n_codes),
+        cur_counts.reshape(n_resamples, n_codes),
+    )
+
+
+def drift_statistic(ref_counts, cur_counts, is_categorical):
+    """
+    Vectorized drift statistic over rows of (n, n_codes) count matrices: the two-sample
+    Kolmogorov-Smirnov statistic for numerical features, or the total variation distance
+    between category frequencies for categorical features.
+    """
+
+    ref_prop = ref_counts / ref_counts.sum(axis=-1, keepdims=True)
+    cur_prop = cur_counts / cur_counts.sum(axis=-1, keepdims=True)
+
+    if is_categorical:
+        return 0.5 * np.abs(cur_prop - ref_prop).sum(axis=-1)
+
+    return np.abs(np.cumsum(cur_prop, axis=-1) - np.cumsum(ref_prop, axis=-1)).max(axis=-1)
+
+
+def _run_chunk(ref_codes, cur_codes, n_codes, is_categorical, method, n_resamples, seed_seq):
+    """Worker task: compute the drift statistic for one chunk of resamples."""
+
+    rng = np.random.default_rng(seed_seq)
+    ref_counts, cur_counts = resample_counts(
+        ref_codes, cur_codes, n_codes, n_resamples, method, rng
+    )
+
+    return drift_statistic(ref_counts, cur_counts, is_categorical)
+
+
+def drift_significance(
+    reference_df,
+    current_df,
+    num_features=NUM_FEATURES,
+    cat_features=CAT_FEATURES,
+    method="permutation",
+    n_resamples=5000,
+    time_budget=None,
+    n_jobs=None,
+    seed=42,
+    alpha=0.05,
+    max_chunk_elements=5_000_000,
+    executor=None,
+):
+    """
+    Resampling-based significance of the drift between reference and current data for
+    each feature, suitable for small current batches where asymptotic p-values are
+    unreliable.
+
+    Resamples are drawn in chunks, each computed as a handful of matrix operations, and
+    chunks for all features are spread across a process pool. Every chunk gets its own
+    RNG stream spawned from `seed`, so results do not depend on scheduling. If a
+    `time_budget` is set, chunks that have not completed when it expires are abandoned
+    (at least one chunk per feature is always used) - trading precision, reported as the
+    Monte Carlo standard error, for latency. As the budget decides which chunks are used,
+    results then vary from run to run; without one, they are reproducible.
+
+    Args:
+        reference_df (pd.DataFrame)
+        current_df (pd.DataFrame)
+        num_features (list): features tested with the Kolmogorov-Smirnov statistic
+        cat_features (list): features tested with total variation distance
+        method (str): "permutation" for p-values, "bootstrap" for confidence intervals
+        n_resamples (int): maximum number of resamples per feature
+        time_budget (float): seconds to spend before returning with fewer resamples
+        n_jobs (int): number of worker processes; defaults to os.cpu_count()
+        seed (int)
+        alpha (float): significance level for the bootstrap confidence interval
+        max_chunk_elements (int): bounds memory per chunk (resamples x sample size)
+        executor (concurrent.futures.Executor): pool to run chunks on, e.g. one shared
+            across calls - by default, a pool of n_jobs processes is started for the call
+
+    Returns:
+        pd.DataFrame: one row per feature with the observed statistic, number of
+            resamples used, and either p_value / p_value_se or ci_low / ci_high
+
+    """
+
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    tasks, observed, n_completed = [], {}, {}
+    root = np.random.SeedSequence(seed)
+    features = [(f, False) for f in num_features] + [(f, True) for f in cat_features]
+
+    for (feature, is_cat), feature_seq in zip(features, root.spawn(len(features))):
+        ref_codes, cur_codes, n_codes = encode_feature(
+            reference_df[feature], current_df[feature]
+        )
+        observed[feature] = drift_statistic(
+            np.bincount(ref_codes, minlength=n_codes)[None, :],
+            np.bincount(cur_codes, minlength=n_codes)[None, :],
+            is_cat,
+        )[0]
+
+        size = max(len(ref_codes) + len(cur_codes), n_codes)
+        chunk = int(np.clip(max_chunk_elements // size, 1, n_resamples))
+        chunk_sizes = [chunk] * (n_resamples // chunk)
+        if n_resamples % chunk:
+            chunk_sizes.append(n_resamples % chunk)
+
+        for i, (n, chunk_seq) in enumerate(
+            zip(chunk_sizes, feature_seq.spawn(len(chunk_sizes)))
+        ):
+            args = (ref_codes, cur_codes, n_codes, is_cat, method, n, chunk_seq)
+            tasks.append((feature, i, args))
+
+    # interleave chunks across features so that every feature gets resamples early on
+    tasks.sort(key=lambda task: task[1])
+    results = {feature: [] for feature, _ in features}
+
+    if executor is None and n_jobs == 1:
+        for feature, i, args in tasks:
+            expired = deadline is not None and time.monotonic() > deadline
+            if i > 0 and expired:
+                continue
+            results[feature].append(_run_chunk(*args))
+    else:
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=n_jobs)
+
+        futures, expired = {}, False
+        try:
+            futures = {
+                executor.submit(_run_chunk, *args): (feature, i)
+                for feature, i, args in tasks
+            }
+            pending = set(futures)
+            required = {f for f, (_, i) in futures.items() if i == 0}
+
+            while pending:
+                timeout = None
+                if deadline is not None and not (required & pending):
+                    timeout = max(deadline - time.monotonic(), 0)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[futures[future][0]].append(future.result())
+                if timeout is not None and time.monotonic() >= deadline:
+                    # time budget exhausted; abandon remaining chunks
+                    expired = True
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+            if own_executor:
+                # once the budget has expired, don't wait for chunks that are running
+                executor.shutdown(wait=not expired)
+
+    rows = []
+    for feature, is_cat in features:
+        stats = np.concatenate(results[feature])
+        n = len(stats)
+        row = {
+            "feature": feature,
+            "stattest": "tvd" if is_cat else "ks",
+            "statistic": observed[feature],
+            "n_resamples": n,
+        }
+
+        if method == "permutation":
+            exceed = np.sum(stats >= observed[feature] - 1e-12)
+            p = (1 + exceed) / (1 + n)
+            row.update({"p_value": p, "p_value_se": np.sqrt(p * (1 - p) / (1 + n))})
+        else:
+            row.update(
+                {
+                    "ci_low": np.quantile(stats, alpha / 2),
+                    "ci_high": np.quantile(stats, 1 - alpha / 2),
+                }
+            )
+        rows.append(row)
+
+    return pd.DataFrame(rows)
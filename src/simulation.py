@@ -44,18 +44,26 @@ import numpy as np
 import pandas as pd
 from typing import Dict
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pandas.tseries.offsets import DateOffset
-from evidently import ColumnMapping
-from evidently.dashboard import Dashboard
-from evidently.dashboard.tabs import (
-    DataDriftTab,
-    NumTargetDriftTab,
-    RegressionPerformanceTab,
-)
 import cml.metrics_v1 as metrics
 
-from src.utils import scale_prices
+from src.utils import prepare_report_data, load_partitioned, MAX_LISTING_DAYS, TARGET
+from src.schema import to_json_records
 from src.api import ApiUtility
+from src.reference import ReferenceProfile
+from src.sampling import sample_frame, REPORT_SAMPLE_SIZE, REPORT_STRATA
+from src.performance import PerformanceTracker
+from src.retraining import Retrainer
+from src.challengers import compare_models, challenger_columns
+from src.decoding import decode_metrics
+from src.drift import segmented_drift
+from src.significance import drift_significance
+from src.reports import build_reports
+from src.manifest import ReportManifest
+from src.timeseries import MetricsStore
+from src.tracing import Tracer
+from src.memory import MemoryMonitor
 from src.inference import ThreadedModelRequest
 
 logger = logging.getLogger(__name__)
@@ -81,7 +89,8 @@ class Simulation:
     Namely, it:
 
         1. Scores all training data against the deployed model so we can query metrics
-            from the Model Metrics database for evaluation
+            from the Model Metrics database for evaluation, and persists the result as a
+            reference profile for the deployed model build (skipped if one already exists)
         2. Initializes a simulation clock, which is just a list of date ranges from the
             prod_df to iterate over. These batches mimic the cadence upon which new data
             "arrives" in a production setting.
@@ -89,58 +98,148 @@ class Simulation:
             - Query the prod_df for newly *listed* recrods and score them using deployed model
             - Query the prod_df for newly *sold* records and add ground truths to metric store
             - Query the metric store for thoes newly *sold* records and generate new Evidently report
-            - Redeploy the hosted Application to surface the new monitoring report
+            - Deploy the hosted Application after the first batch, which then surfaces each
+                new monitoring report on its own
 
     Attributes:
         api (src.api.ApiUtility): utility class for help with CML APIv2 calls
         latest_deployment_details (dict): config info about deployed model
         tmr (src.inference.ThreadedModelRequest): utility for making concurrent model API calls
         master_id_uuid_mapping (dict): lookup between input data ID's and predictionUuids
+        performance (src.performance.PerformanceTracker): incremental regression performance metrics
+            of the deployed model build, accumulated across simulation runs
+        retrainer (src.retraining.Retrainer): incremental retraining of the deployed model, or
+            None if the model file isn't available locally
         dev_mode (bool): flag for running simulation with 5% of total data
         sample_size (float): fraction of data to run simulation with
+        headless (bool): flag for producing JSON metric profiles only, skipping HTML reports
+        memory (src.memory.MemoryMonitor): records the memory used by each phase and batch
+        tracer (src.tracing.Tracer): records the time (and memory) spent in each phase of the simulation
+        executor (concurrent.futures.ProcessPoolExecutor): pool shared by the batches of a running
+            simulation
 
     """
 
-    def __init__(self, model_name: str, dev_mode: bool = False):
+    def __init__(
+        self,
+        model_name: str,
+        dev_mode: bool = False,
+        headless: bool = False,
+        trace_memory: bool = False,
+    ):
         self.api = ApiUtility()
         self.latest_deployment_details = self.api.get_latest_deployment_details(
             model_name=model_name
         )
         self.tmr = ThreadedModelRequest(self.latest_deployment_details)
         self.master_id_uuid_mapping = {}
+        self.performance = PerformanceTracker.load_or_create(
+            self.latest_deployment_details["latest_build_id"], segment_cols=["zipcode"]
+        )
+        self.retrainer = None
+        if os.path.exists("model.pkl"):
+            try:
+                self.retrainer = Retrainer.from_model_file(
+                    self.latest_deployment_details["latest_build_id"]
+                )
+            except ValueError as e:
+                logger.warning(f"{e} - drift-triggered retraining disabled")
+        else:
+            logger.warning("model.pkl not found - drift-triggered retraining disabled")
         self.dev_mode = dev_mode
         self.sample_size = 0.05 if self.dev_mode is True else 0.8
+        self.headless = headless
+        self.memory = MemoryMonitor("simulation", trace_allocations=trace_memory)
+        self.tracer = Tracer("simulation", memory=self.memory)
+        self.executor = None
+
+    def run_simulation(self, train_path, prod_path):
+        """
+        Operates the main logic to simulate a production scenario.
 
-    def run_simulation(self, train_df, prod_df):
+        Training and production data are read from the partitioned datasets written by
+        scripts/prepare_data.py (see src.utils.save_partitioned), loading only the
+        partitions and columns each step needs.
+
+        Each phase of the simulation is traced, and the trace file and per-phase summary
+        are saved to logs/traces once the simulation finishes (or fails), along with the
+        per-batch and per-phase memory records in logs/memory.
+        """
+
+        # one process pool for the drift significance tests of all batches
+        self.executor = ProcessPoolExecutor()
+        try:
+            self._run_simulation(train_path, prod_path)
+        finally:
+            self.executor.shutdown()
+            self.executor = None
+            self.tracer.save()
+            self.memory.save()
+
+    def _run_simulation(self, train_path, prod_path):
         """Operates the main logic to simulate a production scenario."""
 
-        self.set_simulation_clock(prod_df, months_in_batch=1)
+        trace = self.tracer.span
 
-        # sample data
-        train_df, prod_df = [
-            self.sample_dataframe(df, self.sample_size) for df in (train_df, prod_df)
-        ]
+        self.set_simulation_clock(
+            load_partitioned(prod_path, columns=["date_sold"]), months_in_batch=1
+        )
 
         # ------------------------ Training Data ------------------------
         # make inference on training data so records are query-able, add
-        # ground truth prices to the metrics store, and query records for reporting
-        logger.info("------- Starting Section: Train Data -------")
+        # ground truth prices to the metrics store, and query records for reporting.
+        # This only needs to happen once per model build - the resulting reference
+        # profile is persisted and reused by subsequent runs.
+        build_id = self.latest_deployment_details["latest_build_id"]
 
-        train_inference_metadata = self.make_inference(train_df)
-        formatted_metadata = self.format_metadata_for_delayed_metrics(
-            train_df, is_train=True
-        )
-        self.add_delayed_metrics(*formatted_metadata)
-
-        train_metrics_df = self.query_model_metrics(
-            **{
-                k: train_inference_metadata[k]
-                for k in train_inference_metadata
-                if k != "id_uuid_mapping"
-            }
-        )
+        if ReferenceProfile.exists(build_id):
+            logger.info("------- Skipping Section: Train Data -------")
+            with trace("load_reference_profile") as span:
+                reference_profile = ReferenceProfile.load(build_id)
+                span["rows"] = len(reference_profile)
+
+        else:
+            logger.info("------- Starting Section: Train Data -------")
+
+            with trace("load_data", section="train") as span:
+                train_df = self.sample_dataframe(
+                    load_partitioned(train_path), self.sample_size
+                )
+                span["rows"] = len(train_df)
+
+            with trace("make_inference", section="train", rows=len(train_df)):
+                train_inference_metadata = self.make_inference(train_df)
+            with trace("format_metadata_for_delayed_metrics", section="train") as span:
+                formatted_metadata = self.format_metadata_for_delayed_metrics(
+                    train_df, is_train=True
+                )
+                span["rows"] = len(formatted_metadata[0])
+            with trace("add_delayed_metrics", section="train", rows=span["rows"]):
+                self.add_delayed_metrics(*formatted_metadata)
+
+            with trace("query_model_metrics", section="train") as span:
+                train_metrics_df = self.query_model_metrics(
+                    **{
+                        k: train_inference_metadata[k]
+                        for k in train_inference_metadata
+                        if k != "id_uuid_mapping"
+                    }
+                )
+                span["rows"] = len(train_metrics_df)
+                span["bytes"] = train_metrics_df.memory_usage().sum()
 
-        logger.info("------- Finished Section: Train Data -------")
+            with trace("save_reference_profile", rows=len(train_metrics_df)):
+                reference_profile = ReferenceProfile.from_metrics_df(
+                    build_id,
+                    train_metrics_df.drop(columns=challenger_columns(train_metrics_df)),
+                )
+                reference_profile.save()
+
+            if self.retrainer is not None:
+                with trace("update_retraining_statistics", rows=len(train_metrics_df)):
+                    self.retrainer.update(train_metrics_df)
+
+            logger.info("------- Finished Section: Train Data -------")
 
         # ----------------------- Production Data -----------------------
 
@@ -156,45 +255,221 @@ class Simulation:
                 f"------- Starting Section {i+1}/{len(self.date_ranges)}: Prod Data ({formatted_date_range})-------"
             )
 
-            # Query prod_df for newly *listed* records from this batch and make inference
-            # TO-DO: refactor this first call into self.make_inference()
-            new_listings_df = prod_df.loc[
-                prod_df.date_listed.between(
-                    date_range[0], date_range[1], inclusive="left"
-                )
-            ]
+            with trace("batch", batch=i + 1, date_range=formatted_date_range):
+                self.run_batch(i, date_range, prod_path, reference_profile)
+
+            self.memory.end_batch(
+                i + 1, id_uuid_mapping_size=len(self.master_id_uuid_mapping)
+            )
+
+            logger.info(
+                f"------- Finished Section {i+1}/{len(self.date_ranges)}: Prod Data ({formatted_date_range})-------"
+            )
+
+    def run_batch(self, i, date_range, prod_path, reference_profile):
+        """
+        Simulate one batch of the simulation clock: score newly listed records, add ground
+        truths for newly sold records, and build monitoring reports for them.
+
+        Args:
+            i (int): index of the batch
+            date_range (tuple): start and end timestamps of the batch
+            prod_path (str): partitioned production dataset
+            reference_profile (src.reference.ReferenceProfile)
+
+        """
+
+        trace = self.tracer.span
+
+        # Load newly *listed* records from this batch - which are sold no later than
+        # MAX_LISTING_DAYS after the batch ends - and newly *sold* records
+        with trace("load_data") as span:
+            new_listings_df = self.sample_dataframe(
+                load_partitioned(
+                    prod_path,
+                    date_range=(
+                        date_range[0],
+                        date_range[1] + DateOffset(days=MAX_LISTING_DAYS),
+                    ),
+                    filters={"date_listed": date_range},
+                ),
+                self.sample_size,
+            )
+            new_sold_df = self.sample_dataframe(
+                load_partitioned(
+                    prod_path,
+                    columns=["id", "price", "date_sold"],
+                    date_range=date_range,
+                ),
+                self.sample_size,
+            )
+            span["rows"] = len(new_listings_df) + len(new_sold_df)
+
+        # Make inference on newly *listed* records
+        # TO-DO: refactor this first call into self.make_inference()
+        with trace("make_inference", rows=len(new_listings_df)):
             inference_metadata = self.make_inference(new_listings_df)
 
-            # Query prod_df for newly *sold* records from this batch and track ground truths
+        # Track ground truths of newly *sold* records from this batch
+        with trace("format_metadata_for_delayed_metrics") as span:
             formatted_metadata = self.format_metadata_for_delayed_metrics(
-                prod_df, date_range, is_train=False
+                new_sold_df, date_range, is_train=False
             )
+            span["rows"] = len(formatted_metadata[0])
+        with trace("add_delayed_metrics", rows=span["rows"]):
             self.add_delayed_metrics(*formatted_metadata)
 
-            # Query metric store and build Evidently report
-            # Note: because we cant query by UUID, first query all records, then filter to new_sold by uuid
+        # Query metric store and build Evidently report
+        # Note: because we cant query by UUID, first query all records, then filter to new_sold by uuid
+        with trace("query_model_metrics") as span:
             metrics_df = self.query_model_metrics()
             new_sold_metrics_df = metrics_df[
                 metrics_df.predictionUuid.isin(formatted_metadata[0])
             ]
+            span["rows"] = len(metrics_df)
+            span["bytes"] = metrics_df.memory_usage().sum()
+            span["new_sold_rows"] = len(new_sold_metrics_df)
+
+        # Accumulate performance statistics now that ground truths have arrived
+        with trace("update_performance", rows=len(new_sold_metrics_df)):
+            self.performance.update(new_sold_metrics_df, replace=True)
+            self.performance.save()
+
+        if self.retrainer is not None:
+            with trace("update_retraining_statistics", rows=len(new_sold_metrics_df)):
+                self.retrainer.update(new_sold_metrics_df)
+
+        # Compare any challenger models scored in the shadow of the deployed model, then
+        # drop their predictions so the remaining reports only cover the deployed model
+        challengers = challenger_columns(new_sold_metrics_df)
+        if challengers:
+            with trace(
+                "build_challenger_report",
+                rows=len(new_sold_metrics_df),
+                challengers=len(challengers),
+            ):
+                self.build_challenger_report(
+                    current_df=new_sold_metrics_df, current_date_range=date_range
+                )
+            new_sold_metrics_df = new_sold_metrics_df.drop(columns=challengers)
 
-            self.build_evidently_reports(
-                reference_df=train_metrics_df,
+        with trace("build_segmented_drift_report", rows=len(new_sold_metrics_df)):
+            self.build_segmented_drift_report(
+                reference_profile=reference_profile,
+                current_df=new_sold_metrics_df,
+                current_date_range=date_range,
+            )
+        with trace("build_drift_significance_report", rows=len(new_sold_metrics_df)):
+            self.build_drift_significance_report(
+                reference_profile=reference_profile,
                 current_df=new_sold_metrics_df,
                 current_date_range=date_range,
+                executor=self.executor,
             )
+        with trace(
+            "build_evidently_reports",
+            rows=len(new_sold_metrics_df),
+            headless=self.headless,
+        ) as span:
+            profiles = self.build_evidently_reports(
+                reference_profile=reference_profile,
+                current_df=new_sold_metrics_df,
+                current_date_range=date_range,
+                headless=self.headless,
+            )
+            report_dir = self.get_report_dir(date_range)
+            span["bytes"] = ReportManifest.get_entry(
+                os.path.basename(os.path.normpath(report_dir)), report_dir
+            )["total_bytes"]
+
+        # Refit the model on the trailing window of sold records if this batch's
+        # reports show drift or degraded performance
+        if self.retrainer is not None:
+            with trace("retrain") as span:
+                span["model_path"] = self.retrainer.maybe_retrain(profiles, date_range)
+
+        # Create Monitoring Dashboard application once - the running application
+        # detects new reports through the report manifest and pushes them to open
+        # browsers, so it does not need to be restarted after each batch
+        if i == 0:
+            with trace("deploy_monitoring_application"):
+                self.api.deploy_monitoring_application(
+                    application_name="Price Regressor Monitoring Dashboard"
+                )
 
-            # Create/Refresh Monitoring Dashboard application
-            app_name = "Price Regressor Monitoring Dashboard"
+    def backfill_reports(self, prod_path, batches=None, n_jobs=None):
+        """
+        Regenerate the monitoring reports of past batches - e.g. after a change to the
+        report configuration - from the model metrics already in the metric store.
 
-            if i == 0:
-                self.api.deploy_monitoring_application(application_name=app_name)
-            else:
-                self.api.restart_running_application(application_name=app_name)
+        Once predictions and ground truths have been stored, the reports of each batch are
+        independent of one another, so they are built in parallel worker processes. No
+        records are scored, no metrics are written, and the monitoring application is
+        neither deployed nor restarted - it picks up regenerated reports through the
+        report manifest, which is updated (along with the metrics store) as each batch
+        completes.
 
-            logger.info(
-                f"------- Finished Section {i+1}/{len(self.date_ranges)}: Prod Data ({formatted_date_range})-------"
+        Args:
+            prod_path (str): partitioned production dataset, used to set the simulation clock
+            batches (list): indices of the batches to regenerate - all if None
+            n_jobs (int): number of worker processes - defaults to the number of CPUs
+
+        """
+
+        trace = self.tracer.span
+        build_id = self.latest_deployment_details["latest_build_id"]
+
+        if not ReferenceProfile.exists(build_id):
+            raise ValueError(
+                f"No reference profile for model build {build_id} - run the simulation first"
             )
+        reference_profile = ReferenceProfile.load(build_id)
+
+        sold_dates = load_partitioned(prod_path, columns=["date_sold"])
+        self.set_simulation_clock(sold_dates, months_in_batch=1)
+        batches = range(len(self.date_ranges)) if batches is None else batches
+
+        try:
+            with trace("query_model_metrics") as span:
+                metrics_df = self.query_model_metrics()
+                span["rows"] = len(metrics_df)
+
+            # Only production records with ground truths belong to a batch - the first
+            # batch reaches back before the production data, into the training data
+            if TARGET not in metrics_df.columns:
+                raise ValueError("No ground truths found in the metric store")
+            sold_df = metrics_df[metrics_df[TARGET].notna()]
+            date_sold = pd.to_datetime(sold_df.date_sold)
+            prod_start = sold_dates.date_sold.min()
+
+            with trace("backfill_reports", batches=len(batches)):
+                with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                    futures = {}
+                    for i in batches:
+                        date_range = self.date_ranges[i]
+                        in_batch = (date_sold >= max(date_range[0], prod_start)) & (
+                            date_sold < date_range[1]
+                        )
+                        future = executor.submit(
+                            self.build_batch_reports,
+                            reference_profile=reference_profile,
+                            current_df=sold_df[in_batch],
+                            current_date_range=date_range,
+                            headless=self.headless,
+                            # each worker builds one batch - don't nest process pools
+                            n_jobs=1,
+                        )
+                        futures[future] = i
+
+                    for future in tqdm(as_completed(futures), total=len(futures)):
+                        i = futures[future]
+                        self.record_reports(self.date_ranges[i], future.result())
+                        logger.info(
+                            f"Regenerated reports for batch {i+1}/{len(self.date_ranges)}: "
+                            f"{self.get_report_dir(self.date_ranges[i])}"
+                        )
+        finally:
+            self.tracer.save()
 
     def make_inference(self, df):
         """
@@ -219,7 +494,7 @@ class Simulation:
                 }
         """
 
-        records = self.cast_date_as_str_for_json(df).to_dict(orient="records")
+        records = to_json_records(df)
         metadata = self.tmr.threaded_call(records)
 
         self.master_id_uuid_mapping.update(metadata["id_uuid_mapping"])
@@ -363,6 +638,10 @@ class Simulation:
         """
         Return a sample of the provided dataframe.
 
+        Records are sampled by a hash of their ID, so the same records are sampled no
+        matter which partitions of a dataset are loaded - e.g. a record sampled when
+        it's listed is also sampled when it's sold.
+
         Args:
             df (pd.DataFrame)
             fraction (float): sample size of dataframe desired
@@ -371,99 +650,263 @@ class Simulation:
             pd.DataFrame
 
         """
-        return df.sample(frac=fraction, random_state=42)
+        return df[pd.util.hash_array(df.id.values) < fraction * 2 ** 64]
+
+    @staticmethod
+    def format_model_metrics_query(metrics: Dict):
+        """
+        Accepts the response dictionary from `metrics.read_metrics()`, decodes its "metrics"
+        columns, and formats as Dataframe.
+
+        Nested metrics are named by their innermost key, except challenger predictions, which
+        are prefixed with "challenger_".
+
+        Args:
+            metrics (dict): a response, or an iterable of responses (pages) - see
+                src.decoding.decode_metrics()
+
+        Returns:
+            pd.DataFrame
+        """
+        return decode_metrics(metrics)
 
     @staticmethod
-    def cast_date_as_str_for_json(df):
-        """Given a dataframe, return the same dataframe with non-numeric columns cast as string"""
+    def get_report_dir(date_range):
+        """Return the directory that reports for the provided date range are saved to."""
 
-        for column, dt in zip(df.columns, df.dtypes):
-            if dt.type not in [np.int64, np.float64]:
-                df.loc[:, column] = df.loc[:, column].astype(str)
-        return df
+        return os.path.join(
+            "apps/static/reports/",
+            f'{date_range[0].strftime("%m-%d-%Y")}_{date_range[1].strftime("%m-%d-%Y")}',
+        )
 
     @staticmethod
-    def format_model_metrics_query(metrics: Dict):
+    def build_batch_reports(
+        reference_profile, current_df, current_date_range, headless=False, n_jobs=None
+    ):
         """
-        Accepts the response dictionary from `metrics.read_metrics()`, filters out any non-"metrics" columns,
-        and formats as Dataframe.
+        Build all monitoring reports for one batch of newly sold records, without recording
+        them in the report manifest or metrics store, so that batches can be built in
+        parallel processes.
 
         Args:
-            metrics (dict)
+            reference_profile (src.reference.ReferenceProfile)
+            current_df (pd.Dataframe): formatted model metrics of the batch's sold records
+            current_date_range (tuple)
+            headless (bool)
+            n_jobs (int): number of worker processes of the drift significance tests -
+                pass 1 when batches are already built in parallel processes
 
         Returns:
-            pd.DataFrame
+            dict: report name -> Evidently profile dictionary
+
         """
-        metrics = pd.json_normalize(metrics["metrics"])
 
-        return metrics[
-            [col for col in metrics.columns if col.split(".")[0] == "metrics"]
-            + ["predictionUuid"]
-        ].rename(columns={col: col.split(".")[-1] for col in metrics.columns})
+        challengers = challenger_columns(current_df)
+        if challengers:
+            Simulation.build_challenger_report(current_df, current_date_range)
+            current_df = current_df.drop(columns=challengers)
+
+        Simulation.build_segmented_drift_report(
+            reference_profile, current_df, current_date_range
+        )
+        Simulation.build_drift_significance_report(
+            reference_profile, current_df, current_date_range, n_jobs=n_jobs
+        )
+
+        return Simulation.build_evidently_reports(
+            reference_profile,
+            current_df,
+            current_date_range,
+            headless=headless,
+            record=False,
+        )
 
     @staticmethod
-    def build_evidently_reports(reference_df, current_df, current_date_range):
+    def build_segmented_drift_report(reference_profile, current_df, current_date_range):
         """
-        Constructs a set of Evidently.ai monitoring reports (Data Drift, Numerical
-        Target Drift, and Regression Performance) provided a reference and current
-        dataframe. Save the HTML reports to disk for use in an Application.
+        Compute drift for each zipcode, waterfront, and condition segment in a single
+        vectorized pass and save the ranked table of most-drifted segments to disk
+        alongside the Evidently reports for the date range.
 
         Args:
-            reference_df (pd.Dataframe)
+            reference_profile (src.reference.ReferenceProfile)
             current_df (pd.Dataframe)
             current_date_range (tuple)
 
+        Returns:
+            pd.DataFrame: ranked segment drift table
+
         """
 
-        TARGET = "ground_truth"
-        PREDICTION = "predicted_result"
-        NUM_FEATURES = ["sqft_living", "sqft_lot", "sqft_above"]
-        CAT_FEATURES = [
-            "waterfront",
-            "zipcode",
-            "condition",
-            "view",
-            "bedrooms",
-            "bathrooms",
-        ]
+        report_dir = Simulation.get_report_dir(current_date_range)
+        os.makedirs(report_dir, exist_ok=True)
 
-        column_mapping = ColumnMapping()
-        column_mapping.target = TARGET
-        column_mapping.prediction = PREDICTION
-        column_mapping.numerical_features = NUM_FEATURES
-        column_mapping.categorical_features = CAT_FEATURES
-        column_mapping.datetime = None
+        ranked = segmented_drift(
+            reference_df=reference_profile.data,
+            current_df=prepare_report_data(current_df),
+        )
 
-        report_dir = os.path.join(
-            "apps/static/reports/",
-            f'{current_date_range[0].strftime("%m-%d-%Y")}_{current_date_range[1].strftime("%m-%d-%Y")}',
+        report_path = os.path.join(report_dir, "segment_drift.json")
+        ranked.to_json(report_path, orient="records")
+
+        top = ranked.head(5)
+        logger.info(
+            f"Generated segmented drift report: {report_path}. Most drifted segments: "
+            + ", ".join(f"{c}={s}" for c, s in zip(top.segment_col, top.segment))
         )
+
+        return ranked
+
+    @staticmethod
+    def build_challenger_report(current_df, current_date_range):
+        """
+        Compare the performance of the deployed model with the challenger models scored in
+        its shadow, and save the comparison to disk alongside the Evidently reports for the
+        date range.
+
+        Args:
+            current_df (pd.Dataframe): formatted model metrics including challenger predictions
+            current_date_range (tuple)
+
+        Returns:
+            pd.DataFrame: per-model performance comparison
+
+        """
+
+        report_dir = Simulation.get_report_dir(current_date_range)
         os.makedirs(report_dir, exist_ok=True)
 
-        reports = [
-            ("data_drift", DataDriftTab()),
-            ("num_target_drift", NumTargetDriftTab()),
-            ("reg_performance", RegressionPerformanceTab()),
-        ]
+        comparison = compare_models(current_df)
+
+        report_path = os.path.join(report_dir, "challenger_comparison.json")
+        comparison.to_json(report_path, orient="records")
+
+        best = comparison.sort_values("mean_abs_error").iloc[0]
+        logger.info(
+            f"Generated challenger comparison report: {report_path}. Lowest MAE: "
+            f"{best.model} ({best.mean_abs_error:.2f})"
+        )
+
+        return comparison
+
+    @staticmethod
+    def build_drift_significance_report(
+        reference_profile,
+        current_df,
+        current_date_range,
+        n_resamples=1000,
+        time_budget=None,
+        executor=None,
+        n_jobs=None,
+    ):
+        """
+        Compute permutation-test p-values for drift in each feature between the reference
+        profile and current batch, and save them to disk alongside the Evidently reports
+        for the date range.
+
+        By default a fixed number of resamples is drawn, so the p-values are reproducible.
+
+        Args:
+            reference_profile (src.reference.ReferenceProfile)
+            current_df (pd.Dataframe)
+            current_date_range (tuple)
+            n_resamples (int): number of permutations per feature
+            time_budget (float): optional seconds to spend on resampling before returning
+                with fewer resamples - at the cost of reproducibility
+            executor (concurrent.futures.Executor): process pool shared across batches
+            n_jobs (int): number of worker processes, if no executor is passed
+
+        Returns:
+            pd.DataFrame: per-feature drift significance
+
+        """
+
+        report_dir = Simulation.get_report_dir(current_date_range)
+        os.makedirs(report_dir, exist_ok=True)
+
+        significance = drift_significance(
+            reference_df=reference_profile.data,
+            current_df=prepare_report_data(current_df),
+            method="permutation",
+            n_resamples=n_resamples,
+            time_budget=time_budget,
+            executor=executor,
+            n_jobs=n_jobs,
+        )
+
+        report_path = os.path.join(report_dir, "drift_significance.json")
+        significance.to_json(report_path, orient="records")
+        logger.info(f"Generated drift significance report: {report_path}")
+
+        return significance
+
+    @staticmethod
+    def build_evidently_reports(
+        reference_profile, current_df, current_date_range, headless=False, record=True
+    ):
+        """
+        Constructs a set of Evidently.ai monitoring reports (Data Drift, Numerical
+        Target Drift, and Regression Performance) provided a reference profile and current
+        dataframe. Save the JSON metric profiles and HTML reports to disk for use in an
+        Application, and record the date range along with its report sizes and headline
+        drift flags in the report manifest, and its drift and performance metrics in the
+        time-series metrics store.
+
+        In headless mode, HTML rendering is skipped entirely - only the JSON profiles are
+        produced, along with the prepared inputs needed to render the HTML later on.
+
+        Both sides of the reports are stratified random samples (by REPORT_STRATA) of at most
+        REPORT_SAMPLE_SIZE records, of equal size, so the cost of the reports doesn't grow
+        with the size of a batch.
 
-        for report_name, tab in reports:
-
-            dashboard = Dashboard(tabs=[tab])
-
-            dashboard.calculate(
-                reference_data=scale_prices(reference_df)
-                .sample(n=len(current_df), random_state=42)
-                .set_index("date_sold", drop=True)
-                .sort_index()
-                .round(2),
-                current_data=scale_prices(current_df)
-                .set_index("date_sold", drop=True)
-                .sort_index()
-                .round(2),
-                column_mapping=column_mapping,
+        Args:
+            reference_profile (src.reference.ReferenceProfile)
+            current_df (pd.Dataframe)
+            current_date_range (tuple)
+            headless (bool)
+            record (bool): flag for recording the reports in the report manifest and metrics
+                store - pass False when building reports in worker processes, and record
+                them from the parent (see Simulation.backfill_reports())
+
+        Returns:
+            dict: report name -> Evidently profile dictionary
+
+        """
+
+        report_dir = Simulation.get_report_dir(current_date_range)
+
+        # Report cost is bounded by sampling both sides to the same, fixed size
+        current_data = prepare_report_data(
+            sample_frame(
+                current_df, REPORT_SAMPLE_SIZE, strata=REPORT_STRATA, seed=42
+            )
+        )
+        reference_data = reference_profile.sample(n=len(current_data), random_state=42)
+        if len(reference_data) < len(current_data):
+            current_data = sample_frame(
+                current_data, len(reference_data), strata=REPORT_STRATA, seed=42
             )
 
-            report_path = os.path.join(report_dir, f"{report_name}_report.html")
+        profiles = build_reports(
+            reference_data=reference_data,
+            current_data=current_data,
+            report_dir=report_dir,
+            headless=headless,
+        )
+        if record:
+            Simulation.record_reports(current_date_range, profiles)
 
-            dashboard.save(report_path)
-            logger.info(f"Generated new Evidently report: {report_path}")
+        return profiles
+
+    @staticmethod
+    def record_reports(current_date_range, profiles):
+        """
+        Record the reports for a date range in the report manifest, and their drift and
+        performance metrics in the time-series metrics store.
+        """
+
+        report_dir = Simulation.get_report_dir(current_date_range)
+        ReportManifest().update(report_dir, profiles)
+        MetricsStore().append(
+            os.path.basename(os.path.normpath(report_dir)), current_date_range, profiles
+        )
@@ -0,0 +1,162 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+from collections import defaultdict
+
+
+class QuantileSketch:
+    """A mergeable quantile sketch with relative accuracy guarantees.
+
+    Values are mapped to logarithmically sized buckets (separately for positive and
+    negative values) so that any quantile estimate is within `relative_accuracy` of the
+    true value. Sketches can be merged by summing bucket counts, which makes them
+    suitable for accumulating distributions across batches and segments (e.g. model
+    residuals) or across chunks of a dataset too large to hold in memory.
+
+    Attributes:
+        relative_accuracy (float)
+        positive (dict): bucket index -> count for values > min_value
+        negative (dict): bucket index -> count for values < -min_value
+        zero_count (int): count of values within min_value of zero
+
+    """
+
+    min_value = 1e-6
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.positive = defaultdict(int)
+        self.negative = defaultdict(int)
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zero_count
+
+    def bucket_index(self, values):
+        """Vectorized mapping of absolute values to bucket indices."""
+        return np.ceil(np.log(np.abs(values)) / self.log_gamma).astype(np.int64)
+
+    def add(self, values):
+        """Add an array of values to the sketch."""
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+
+        self.zero_count += int((np.abs(values) <= self.min_value).sum())
+
+        for store, mask in (
+            (self.positive, values > self.min_value),
+            (self.negative, values < -self.min_value),
+        ):
+            if mask.any():
+                idx, counts = np.unique(
+                    self.bucket_index(values[mask]), return_counts=True
+                )
+                self.add_counts(store, idx, counts)
+
+    @staticmethod
+    def add_counts(store, idx, counts):
+        for i, c in zip(idx.tolist(), counts.tolist()):
+            store[i] += c
+
+    def merge(self, other):
+        """Merge another sketch into this one in place."""
+
+        for store, other_store in (
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ):
+            for i, c in other_store.items():
+                store[i] += c
+        self.zero_count += other.zero_count
+
+        return self
+
+    def bucket_value(self, idx):
+        return 2 * self.gamma ** idx / (self.gamma + 1)
+
+    def quantile(self, q):
+        """Return the estimated q-th quantile (0 <= q <= 1), or NaN if empty."""
+
+        total = self.count
+        if total == 0:
+            return np.nan
+
+        rank = q * (total - 1)
+        cumulative = 0
+
+        # walk buckets in ascending value order: negatives (largest magnitude first),
+        # zeros, then positives (smallest magnitude first)
+        for i in sorted(self.negative, reverse=True):
+            cumulative += self.negative[i]
+            if cumulative > rank:
+                return -self.bucket_value(i)
+
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+
+        for i in sorted(self.positive):
+            cumulative += self.positive[i]
+            if cumulative > rank:
+                return self.bucket_value(i)
+
+        return np.nan
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(k): v for k, v in self.positive.items()},
+            "negative": {str(k): v for k, v in self.negative.items()},
+            "zero_count": self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(relative_accuracy=d["relative_accuracy"])
+        sketch.positive.update({int(k): v for k, v in d["positive"].items()})
+        sketch.negative.update({int(k): v for k, v in d["negative"].items()})
+        sketch.zero_count = d["zero_count"]
+
+        return sketch
@@ -0,0 +1,189 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from src.manifest import get_section_metrics, summarize_profiles
+
+TIMESERIES_PATH = "data/working/monitoring/timeseries.jsonl"
+
+DRIFT_PREFIX = "drift."
+PERFORMANCE_COLS = ["mean_error", "mean_abs_error", "mean_abs_perc_error", "error_std"]
+
+
+def extract_metrics(profiles):
+    """
+    Flatten the Evidently profiles of one batch into a single record of per-feature drift
+    scores ("drift.<feature>") and regression performance metrics.
+    """
+
+    data_drift = get_section_metrics(profiles.get("data_drift"), "data_drift")
+    performance = get_section_metrics(
+        profiles.get("reg_performance"), "regression_performance"
+    ).get("current", {})
+
+    record = {
+        f"{DRIFT_PREFIX}{feature}": values.get("drift_score", values.get("p_value"))
+        for feature, values in data_drift.items()
+        if isinstance(values, dict)
+    }
+    record.update(
+        {
+            k: v
+            for k, v in summarize_profiles(profiles).items()
+            if k not in PERFORMANCE_COLS
+        }
+    )
+    record.update({col: performance.get(col) for col in PERFORMANCE_COLS})
+
+    return record
+
+
+class MetricsStore:
+    """A compact, append-only store of per-batch monitoring metrics.
+
+    Each batch is one JSON line holding its date range, per-feature drift scores, and
+    regression performance metrics, so trends across all batches can be read without
+    opening any of the (much larger) HTML reports. If a batch is regenerated, the latest
+    record for its date range wins.
+
+    Attributes:
+        path (str): location of the store
+
+    """
+
+    def __init__(self, path=TIMESERIES_PATH):
+        self.path = path
+
+    def append(self, key, date_range, profiles):
+        """
+        Append the metrics for one batch of reports.
+
+        Args:
+            key (str): report directory name of the batch
+            date_range (tuple): start and end timestamps of the batch
+            profiles (dict): report name -> Evidently profile dictionary
+
+        """
+
+        record = {
+            "key": key,
+            "start": date_range[0].strftime("%Y-%m-%d"),
+            "end": date_range[1].strftime("%Y-%m-%d"),
+            **extract_metrics(profiles),
+        }
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, default=float) + "\n")
+
+    def load(self):
+        """Return all batches as a pd.DataFrame, one row per date range sorted by start."""
+
+        empty = pd.DataFrame(columns=["key", "start", "end"])
+        if not os.path.exists(self.path):
+            return empty
+
+        with open(self.path, "r") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        if not records:
+            return empty
+
+        return (
+            pd.DataFrame(records)
+            .drop_duplicates(subset="key", keep="last")
+            .sort_values("start")
+            .reset_index(drop=True)
+        )
+
+    @staticmethod
+    def query(df, columns, start=None, end=None, max_points=None):
+        """
+        Select metric columns for batches starting within [start, end), downsampled to at
+        most max_points by averaging consecutive batches.
+
+        Args:
+            df (pd.DataFrame): output of MetricsStore.load()
+            columns (list): metric columns to return
+            start (str): inclusive start date, "%Y-%m-%d"
+            end (str): exclusive end date, "%Y-%m-%d"
+            max_points (int): at least 1
+
+        Returns:
+            dict: {"start": [...], "end": [...], "series": {column: [...]}}
+
+        Raises:
+            ValueError: if max_points is less than 1
+
+        """
+
+        if max_points is not None and max_points < 1:
+            raise ValueError(f"max_points must be at least 1, got {max_points}")
+
+        if start is not None:
+            df = df[df.start >= start]
+        if end is not None:
+            df = df[df.start < end]
+
+        values = df.reindex(columns=columns).astype(np.float64).values
+        starts, ends = df.start.values, df.end.values
+
+        if max_points is not None and len(df) > max_points:
+            groups = np.array_split(np.arange(len(df)), max_points)
+            first = np.array([g[0] for g in groups])
+            last = np.array([g[-1] for g in groups])
+            sums = np.add.reduceat(np.nan_to_num(values), first, axis=0)
+            counts = np.add.reduceat(~np.isnan(values), first, axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values = sums / counts
+            starts, ends = starts[first], ends[last]
+
+        return {
+            "start": starts.tolist(),
+            "end": ends.tolist(),
+            "series": {
+                col: [None if np.isnan(v) else v for v in values[:, j].tolist()]
+                for j, col in enumerate(columns)
+            },
+        }
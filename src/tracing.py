@@ -0,0 +1,213 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import json
+import time
+import logging
+import threading
+import pandas as pd
+from contextlib import contextmanager, nullcontext
+
+TRACE_DIR = "logs/traces"
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+
+class Tracer:
+    """A lightweight recorder of nested, timed phases ("spans") of a run.
+
+    Spans are recorded as Chrome trace "complete" events, so a saved trace can be opened
+    directly in chrome://tracing or https://ui.perfetto.dev. Attributes passed to (or set
+    on) a span, such as row counts and bytes, are attached to its event.
+
+    Attributes:
+        name (str): name of the traced run, used to name the trace file
+        events (list): recorded trace events
+        memory (src.memory.MemoryMonitor): optionally, records the memory used by each
+            span and attaches it to the span's event
+
+    """
+
+    def __init__(self, name, memory=None):
+        self.name = name
+        self.memory = memory
+        self.events = []
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.started_at = time.strftime("%Y%m%d-%H%M%S")
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Time the enclosed block as a span.
+
+        Yields a dictionary of the span's attributes, which can be added to from within the
+        block once values (e.g. the size of a result) are known.
+
+        Args:
+            name (str): phase name
+            **attributes: initial attributes of the span
+
+        """
+
+        memory = (
+            self.memory.phase(name, attributes)
+            if self.memory is not None
+            else nullcontext({})
+        )
+
+        memory_stats = {}
+        start = time.perf_counter()
+        try:
+            with memory as memory_stats:
+                yield attributes
+        finally:
+            end = time.perf_counter()
+            attributes.update(memory_stats)
+            event = {
+                "name": name,
+                "cat": self.name,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": self.pid,
+                "tid": threading.get_ident(),
+                "args": {k: self.to_json(v) for k, v in attributes.items()},
+            }
+            with self.lock:
+                self.events.append(event)
+
+    @staticmethod
+    def to_json(value):
+        """Cast numpy scalars and other non-JSON attribute values to JSON types."""
+
+        if isinstance(value, (bool, int, float, str)) or value is None:
+            return value
+        if hasattr(value, "item"):
+            return value.item()
+        return str(value)
+
+    def summary(self):
+        """
+        Aggregate recorded spans by phase name.
+
+        Returns:
+            pd.DataFrame: one row per phase with its call count, total/mean/max seconds,
+                and share of the total traced wall time, sorted by total time
+
+        """
+
+        columns = ["phase", "count", "total_s", "mean_s", "max_s", "share"]
+        if not self.events:
+            return pd.DataFrame(columns=columns)
+
+        df = pd.DataFrame(
+            {
+                "phase": [e["name"] for e in self.events],
+                "dur": [e["dur"] / 1e6 for e in self.events],
+                "start": [e["ts"] for e in self.events],
+                "end": [e["ts"] + e["dur"] for e in self.events],
+            }
+        )
+        wall_time = (df.end.max() - df.start.min()) / 1e6
+
+        summary = (
+            df.groupby("phase")
+            .dur.agg(["count", "sum", "mean", "max"])
+            .rename(columns={"sum": "total_s", "mean": "mean_s", "max": "max_s"})
+            .sort_values("total_s", ascending=False)
+            .reset_index()
+        )
+        summary["share"] = summary.total_s / wall_time if wall_time > 0 else 0.0
+
+        return summary[columns]
+
+    def save(self, trace_dir=TRACE_DIR):
+        """
+        Write the trace file and per-phase summary table of the run, and log the summary.
+
+        Args:
+            trace_dir (str)
+
+        Returns:
+            str: path of the saved trace file
+
+        """
+
+        os.makedirs(trace_dir, exist_ok=True)
+        stem = os.path.join(trace_dir, f"{self.name}_{self.started_at}")
+
+        with self.lock:
+            events = list(self.events)
+
+        process_name = {
+            "name": "process_name",
+            "ph": "M",
+            "pid": self.pid,
+            "args": {"name": self.name},
+        }
+        with open(f"{stem}.json", "w") as f:
+            json.dump(
+                {"traceEvents": [process_name] + events, "displayTimeUnit": "ms"}, f
+            )
+
+        summary = self.summary()
+        summary.to_csv(f"{stem}_summary.csv", index=False)
+
+        logger.info(
+            f"Saved trace to {stem}.json with phase summary:\n"
+            + summary.to_string(index=False, float_format="{:.3f}".format)
+        )
+
+        return f"{stem}.json"
@@ -0,0 +1,230 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import scipy
+import logging
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.linear_model import Ridge
+from sklearn.impute import SimpleImputer
+from sklearn.model_selection import KFold
+from sklearn.preprocessing import OneHotEncoder, MinMaxScaler, StandardScaler
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+log_file = "logs/simulation.log"
+os.makedirs(os.path.dirname(log_file), exist_ok=True)
+file_handler = logging.FileHandler(log_file)
+file_handler.setLevel(logging.DEBUG)
+file_handler.setFormatter(formatter)
+
+if not logger.handlers:
+    logger.addHandler(file_handler)
+
+# define the intended features and type
+NUM_COLS = ["sqft_living", "sqft_lot", "sqft_above"]
+CAT_COLS = ["bedrooms", "bathrooms", "waterfront", "zipcode", "condition", "view"]
+
+
+def make_pipeline(alpha=1.0):
+    """
+    Construct the full price regression pipeline: numerical and categorical
+    preprocessing followed by a ridge regression on the log10 of the price.
+    """
+
+    # define our numerical and categorical pipelines
+    num_pipe = Pipeline(
+        steps=[
+            ("impute", SimpleImputer(strategy="mean")),
+            ("standardize", StandardScaler()),
+            ("scale", MinMaxScaler()),
+        ]
+    )
+    cat_pipe = Pipeline(
+        steps=[
+            ("impute", SimpleImputer(strategy="most_frequent")),
+            ("one-hot", OneHotEncoder(handle_unknown="ignore", sparse=False)),
+        ]
+    )
+
+    # combine preprocessing pipelines
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ("numerical", num_pipe, NUM_COLS),
+            ("categorical", cat_pipe, CAT_COLS),
+        ]
+    )
+
+    # define estimator - TransformedTargetRegressor to normalize the target variable
+    estimator = TransformedTargetRegressor(
+        regressor=Ridge(alpha=alpha), func=np.log10, inverse_func=scipy.special.exp10
+    )
+
+    # construct full pipeline
+    return Pipeline(steps=[("preprocess", preprocessor), ("model", estimator)])
+
+
+def ridge_path(X, y, alphas):
+    """
+    Solve ridge regressions with an intercept for every alpha at once.
+
+    The centered design matrix is decomposed once, X_c = U S V', after which the
+    coefficients for any alpha are V diag(s / (s^2 + alpha)) U' y_c - the same solution
+    Ridge finds for each alpha separately.
+
+    Args:
+        X (np.ndarray): n x p design matrix
+        y (np.ndarray): n targets
+        alphas (np.ndarray): k regularization strengths
+
+    Returns:
+        np.ndarray: p x k coefficients
+        np.ndarray: k intercepts
+
+    """
+
+    X_mean, y_mean = X.mean(axis=0), y.mean()
+    U, s, Vt = np.linalg.svd(X - X_mean, full_matrices=False)
+
+    shrinkage = s[:, None] / (s[:, None] ** 2 + alphas[None, :])
+    coefs = Vt.T @ (shrinkage * (U.T @ (y - y_mean))[:, None])
+
+    return coefs, y_mean - X_mean @ coefs
+
+
+def score_fold(preprocessor, regressor, X, y, train_idx, test_idx, alphas):
+    """
+    Fit preprocessing once on a training fold, and return the negative mean absolute
+    error on the test fold of the ridge regression for every alpha.
+    """
+
+    preprocessor = clone(preprocessor)
+    X_train = preprocessor.fit_transform(X.iloc[train_idx])
+    X_test = preprocessor.transform(X.iloc[test_idx])
+
+    y_train = regressor.func(np.asarray(y)[train_idx]).astype(np.float64)
+    coefs, intercepts = ridge_path(X_train, y_train, alphas)
+
+    predictions = regressor.inverse_func(X_test @ coefs + intercepts)
+    y_test = np.asarray(y)[test_idx]
+
+    return -np.abs(predictions - y_test[:, None]).mean(axis=0)
+
+
+class RidgePathSearch:
+    """A fast, drop-in alternative to GridSearchCV over the ridge alpha of a pipeline.
+
+    Since only the alpha of the final ridge regression varies, the preprocessing steps
+    of the pipeline are fit just once per fold (rather than once per fold and alpha),
+    and the ridge regressions for the whole alpha grid are solved together from a single
+    SVD of each fold. Folds are processed in parallel. Folds, scoring (negative mean
+    absolute error) and the selection and refit of the best model match those of
+    GridSearchCV(pipeline, {"model__regressor__alpha": alphas}, cv=cv,
+    scoring="neg_mean_absolute_error"), so very dense alpha grids come almost for free.
+
+    The last step of the pipeline must be a TransformedTargetRegressor wrapping a Ridge.
+
+    Attributes:
+        pipeline (sklearn.pipeline.Pipeline)
+        alphas (np.ndarray)
+        cv (int): number of folds
+        n_jobs (int): number of folds processed in parallel
+        cv_results_ (dict): scores of each alpha, in the format of GridSearchCV
+        best_index_ (int)
+        best_params_ (dict)
+        best_score_ (float)
+        best_estimator_ (sklearn.pipeline.Pipeline): pipeline refit with the best alpha
+
+    """
+
+    def __init__(self, pipeline, alphas, cv=5, n_jobs=None):
+        self.pipeline = pipeline
+        self.alphas = np.asarray(alphas, dtype=np.float64)
+        self.cv = cv
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+
+        model_step, regressor = self.pipeline.steps[-1]
+        preprocessor = self.pipeline[:-1]
+        param_name = f"{model_step}__regressor__alpha"
+
+        folds = KFold(n_splits=self.cv).split(X, y)
+        scores = np.array(
+            Parallel(n_jobs=self.n_jobs)(
+                delayed(score_fold)(
+                    preprocessor, regressor, X, y, train_idx, test_idx, self.alphas
+                )
+                for train_idx, test_idx in folds
+            )
+        )
+
+        mean_scores = scores.mean(axis=0)
+        self.best_index_ = int(np.argmax(mean_scores))
+        self.best_params_ = {param_name: self.alphas[self.best_index_]}
+        self.best_score_ = mean_scores[self.best_index_]
+
+        self.cv_results_ = {
+            f"param_{param_name}": self.alphas,
+            "params": [{param_name: alpha} for alpha in self.alphas],
+            **{f"split{k}_test_score": fold for k, fold in enumerate(scores)},
+            "mean_test_score": mean_scores,
+            "std_test_score": scores.std(axis=0),
+            "rank_test_score": (
+                np.argsort(np.argsort(-mean_scores, kind="mergesort")) + 1
+            ).astype(np.int32),
+        }
+
+        logger.info(
+            f"Searched {len(self.alphas)} alphas over {self.cv} folds, best: "
+            f"{self.best_params_} (score {self.best_score_:.2f})"
+        )
+
+        self.best_estimator_ = clone(self.pipeline).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y)
+
+        return self
@@ -39,38 +39,44 @@
 # ###########################################################################
 
 import os
+import gzip
+import json
+import shutil
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from pandas.tseries.offsets import DateOffset
 
-col_order = [
-    "id",
-    "price",
-    "bedrooms",
-    "bathrooms",
-    "sqft_living",
-    "sqft_lot",
-    "floors",
+from src.schema import SCHEMA
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# column names in the order the model is trained on, see src.schema for their dtypes
+col_order = list(SCHEMA)
+
+# columns used to construct monitoring reports from formatted model metrics
+TARGET = "ground_truth"
+PREDICTION = "predicted_result"
+NUM_FEATURES = ["sqft_living", "sqft_lot", "sqft_above"]
+CAT_FEATURES = [
     "waterfront",
-    "view",
-    "condition",
-    "grade",
-    "sqft_above",
-    "sqft_basement",
-    "yr_built",
-    "yr_renovated",
     "zipcode",
-    "lat",
-    "long",
-    "sqft_living15",
-    "sqft_lot15",
-    "date_sold",
-    "date_listed",
+    "condition",
+    "view",
+    "bedrooms",
+    "bathrooms",
 ]
 
+# maximum number of days between the artificial listing date and the sold date of a record
+MAX_LISTING_DAYS = 60
 
-def random_day_offset(ts: pd._libs.tslibs.timestamps.Timestamp, max_days=60):
+
+def random_day_offset(
+    ts: pd._libs.tslibs.timestamps.Timestamp, max_days=MAX_LISTING_DAYS
+):
     """
     Given a pandas Timestamp, return a new timestep offset to an earlier date by
     a random number of days between 0 and max_days.
@@ -78,6 +84,16 @@ def random_day_offset(ts: pd._libs.tslibs.timestamps.Timestamp, max_days=60):
     return ts - DateOffset(np.random.randint(0, max_days))
 
 
+def random_day_offsets(
+    dates: pd.Series, rng: np.random.Generator, max_days=MAX_LISTING_DAYS
+):
+    """
+    Vectorized random_day_offset(): offset each date in a pd.Series to an earlier date
+    by a random number of days between 0 and max_days, drawn from the provided generator.
+    """
+    return dates - pd.to_timedelta(rng.integers(0, max_days, size=len(dates)), unit="D")
+
+
 def get_active_feature_names(
     column_transformer,
 ):
@@ -130,6 +146,14 @@ def scale_prices(df):
     return copy
 
 
+def prepare_report_data(df):
+    """
+    Prepare formatted model metrics for use in an Evidently report: scale prices, index
+    and sort by sold date, and round values.
+    """
+    return scale_prices(df).set_index("date_sold", drop=True).sort_index().round(2)
+
+
 def find_latest_report(report_dir):
     """
     Use date prefixed report titles located in a provided report_dir to identify the
@@ -147,3 +171,395 @@ def find_latest_report(report_dir):
     latest_report = max(date_map.keys(), key=lambda d: datetime.strptime(d, "%Y-%m-%d"))
 
     return reports[date_map[latest_report]]
+
+
+def save_frame(df, path):
+    """
+    Persist a pd.DataFrame to disk as a compressed set of numpy arrays (.npz),
+    one array per column plus the index.
+
+    Object columns are stored as fixed-width unicode arrays so that the file can be
+    loaded back without unpickling, along with a mask of their missing values (which
+    would otherwise be stored as the string "nan" or "None").
+    """
+
+    arrays = {}
+
+    def _add_array(name, values):
+        values = np.asarray(values)
+        if values.dtype == object:
+            nulls = pd.isna(values)
+            arrays[f"nulls_{name}"] = nulls
+            values = np.where(nulls, "", values).astype(str)
+        arrays[name] = values
+
+    for i, col in enumerate(df.columns):
+        _add_array(f"col_{i}", df[col].values)
+    _add_array("index", df.index.values)
+    arrays["columns"] = np.array(df.columns, dtype=str)
+    arrays["index_name"] = np.array([df.index.name or ""], dtype=str)
+    arrays["object_cols"] = np.array(
+        [str(col) for col in df.columns if df[col].dtype == object], dtype=str
+    )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **arrays)
+
+
+def load_frame(path):
+    """
+    Load a pd.DataFrame that was saved with save_frame().
+    """
+
+    with np.load(path, allow_pickle=False) as npz:
+        columns = npz["columns"].tolist()
+        object_cols = set(npz["object_cols"].tolist())
+        index_name = npz["index_name"][0] or None
+
+        def _get_array(name, is_object):
+            values = npz[name]
+            if not (is_object or f"nulls_{name}" in npz.files):
+                return values
+
+            values = values.astype(object)
+            if f"nulls_{name}" in npz.files:
+                values[npz[f"nulls_{name}"]] = None
+            return values
+
+        data = {
+            col: _get_array(f"col_{i}", col in object_cols)
+            for i, col in enumerate(columns)
+        }
+        index = _get_array("index", npz["index"].dtype.kind == "U")
+
+    return pd.DataFrame(data, index=pd.Index(index, name=index_name), columns=columns)
+
+
+PARTITION_METADATA_FILE = "_metadata.json"
+# file name suffix of the mask of missing values of a partition's string column
+NULLS_SUFFIX = ".nulls.npy"
+
+
+def save_partitioned(df, path, partition_col="date_sold"):
+    """
+    Persist a pd.DataFrame to disk as a columnar dataset partitioned by the month of a
+    datetime column: one directory per month ("<partition_col>=%Y-%m") holding one
+    uncompressed .npy file per column, so that partitions and columns can be read
+    selectively and memory-mapped. A metadata file records the column order and dtypes,
+    and the date range and number of rows of each partition.
+
+    Object columns are stored as fixed-width unicode arrays, and categorical columns as
+    arrays of their values. As in save_frame(), missing values of string columns are
+    stored as a separate mask, so they don't come back as the string "nan". Any existing
+    dataset at path is replaced.
+    """
+
+    months = df[partition_col].dt.to_period("M")
+    tmp_path = path.rstrip("/") + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+
+    partitions = [
+        write_partition(df.iloc[positions], tmp_path, partition_col, month)
+        for month, positions in sorted(months.groupby(months).indices.items())
+    ]
+    write_partition_metadata(tmp_path, df, partition_col, partitions)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+
+def write_partition(df, path, partition_col, month):
+    """
+    Write the rows of a pd.DataFrame that fall within one month (a pd.Period) as a
+    partition of the dataset at path, and return its metadata entry.
+    """
+
+    key = str(month)
+    partition_dir = os.path.join(path, f"{partition_col}={key}")
+    os.makedirs(partition_dir)
+
+    for col in df.columns:
+        values = np.asarray(df[col].values)
+        if values.dtype == object:
+            nulls = pd.isna(values)
+            if nulls.any():
+                np.save(os.path.join(partition_dir, f"{col}{NULLS_SUFFIX}"), nulls)
+            values = np.where(nulls, "", values).astype(str)
+        np.save(os.path.join(partition_dir, f"{col}.npy"), values)
+
+    return {
+        "key": key,
+        "start": str(month.start_time.date()),
+        "end": str((month + 1).start_time.date()),
+        "rows": len(df),
+    }
+
+
+def write_partition_metadata(path, df, partition_col, partitions):
+    """Write the metadata file of a partitioned dataset, taking column dtypes from df."""
+
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, PARTITION_METADATA_FILE), "w") as f:
+        json.dump(
+            {
+                "partition_col": partition_col,
+                "columns": df.columns.tolist(),
+                "dtypes": {col: str(dt) for col, dt in df.dtypes.items()},
+                "partitions": partitions,
+            },
+            f,
+            indent=2,
+        )
+
+
+def merge_partitioned(paths, path, date_range=None, prepare=None):
+    """
+    Merge datasets that were saved with save_partitioned() into a single dataset at path,
+    one month at a time, so that only one partition of the merged dataset is held in
+    memory. Rows of each month are concatenated in the order of paths and then stably
+    sorted by the partition column. Any existing dataset at path is replaced.
+
+    Args:
+        paths (list): dataset directories with the same columns and partition column
+        path (str): directory of the merged dataset
+        date_range (tuple): (start, end) of the partition column to keep, inclusive of
+            start and exclusive of end; either may be None for an open-ended range
+        prepare (callable): applied to each merged partition before it is written,
+            e.g. to cast columns to their final dtypes
+
+    Returns:
+        int: number of rows of the merged dataset
+
+    """
+
+    metadata = [load_partition_metadata(source) for source in paths]
+    partition_col = metadata[0]["partition_col"]
+    start, end = date_range or (None, None)
+
+    tmp_path = path.rstrip("/") + ".tmp"
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+
+    months = sorted(
+        {pd.Period(p["key"], freq="M") for m in metadata for p in m["partitions"]}
+    )
+    partitions, template, n_rows = [], None, 0
+    for month in months:
+        lower, upper = month.start_time, (month + 1).start_time
+        if start is not None:
+            lower = max(lower, pd.Timestamp(start))
+        if end is not None:
+            upper = min(upper, pd.Timestamp(end))
+        if lower >= upper:
+            continue
+
+        df = pd.concat(
+            [
+                load_partitioned(source, date_range=(lower, upper), mmap=False)
+                for source, m in zip(paths, metadata)
+                if any(p["key"] == str(month) for p in m["partitions"])
+            ],
+            ignore_index=True,
+        )
+        if prepare is not None:
+            df = prepare(df)
+        if df.empty:
+            continue
+
+        df = df.sort_values(partition_col, kind="mergesort")
+        partitions.append(write_partition(df, tmp_path, partition_col, month))
+        template, n_rows = df.iloc[:0], n_rows + len(df)
+
+    if template is None:
+        template = pd.DataFrame(
+            {
+                col: pd.Series([], dtype=metadata[0]["dtypes"][col])
+                for col in metadata[0]["columns"]
+            }
+        )
+        if prepare is not None:
+            template = prepare(template)
+    write_partition_metadata(tmp_path, template, partition_col, partitions)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.rename(tmp_path, path)
+
+    return n_rows
+
+
+def load_partition_metadata(path):
+    with open(os.path.join(path, PARTITION_METADATA_FILE), "r") as f:
+        return json.load(f)
+
+
+def load_partitioned(path, columns=None, date_range=None, filters=None, mmap=True):
+    """
+    Load (part of) a dataset that was saved with save_partitioned().
+
+    Filters are pushed down to storage: partitions that can't hold any rows within
+    date_range are never opened, only the requested columns are read, and with mmap the
+    column files are memory-mapped so that only the filtered rows are copied into memory.
+
+    Args:
+        path (str): dataset directory
+        columns (list): columns to load, defaults to all columns
+        date_range (tuple): (start, end) of the partition column to load, inclusive of
+            start and exclusive of end; either may be None for an open-ended range
+        filters (dict): column -> (start, end) additional half-open row filters
+        mmap (bool): flag for memory-mapping column files rather than reading them whole
+
+    Returns:
+        pd.DataFrame
+
+    """
+
+    metadata = load_partition_metadata(path)
+    partition_col = metadata["partition_col"]
+    columns = list(columns or metadata["columns"])
+    dtypes = metadata["dtypes"]
+
+    filters = dict(filters or {})
+    partitions = metadata["partitions"]
+    if date_range is not None:
+        start, end = date_range
+        filters[partition_col] = date_range
+        partitions = [
+            p
+            for p in partitions
+            if (end is None or pd.Timestamp(p["start"]) < pd.Timestamp(end))
+            and (start is None or pd.Timestamp(p["end"]) > pd.Timestamp(start))
+        ]
+
+    def bound(value, dtype):
+        return pd.Timestamp(value).to_datetime64() if dtype.startswith("datetime") else value
+
+    frames = []
+    for p in partitions:
+        partition_dir = os.path.join(path, f"{partition_col}={p['key']}")
+
+        def read(col):
+            return np.load(
+                os.path.join(partition_dir, f"{col}.npy"),
+                mmap_mode="r" if mmap else None,
+                allow_pickle=False,
+            )
+
+        def read_rows(col):
+            values = np.array(read(col) if mask is None else read(col)[mask])
+
+            nulls_path = os.path.join(partition_dir, f"{col}{NULLS_SUFFIX}")
+            if os.path.exists(nulls_path):
+                nulls = np.load(nulls_path, allow_pickle=False)
+                values = values.astype(object)
+                values[nulls if mask is None else nulls[mask]] = None
+            return values
+
+        mask = None
+        for col, (start, end) in filters.items():
+            values = read(col)
+            col_mask = np.ones(len(values), dtype=bool)
+            if start is not None:
+                col_mask &= values >= bound(start, dtypes[col])
+            if end is not None:
+                col_mask &= values < bound(end, dtypes[col])
+            mask = col_mask if mask is None else mask & col_mask
+
+        if mask is not None and not mask.any():
+            continue
+
+        frames.append(pd.DataFrame({col: read_rows(col) for col in columns}))
+
+    if not frames:
+        return pd.DataFrame(
+            {col: pd.Series([], dtype=dtypes[col]) for col in columns}
+        )
+
+    df = pd.concat(frames, ignore_index=True)
+    for col in columns:
+        if dtypes[col] in ("object", "category"):
+            df[col] = df[col].astype(dtypes[col])
+
+    return df
+
+
+# content-encoding -> file extension of precompressed files, in order of preference
+COMPRESSED_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def compress_file(path, remove_original=True):
+    """
+    Write precompressed copies of a file next to it: gzip always, and brotli if the
+    optional `brotli` package is installed. Output is deterministic for identical input.
+
+    Returns:
+        list: paths of the compressed files
+
+    """
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    outputs = []
+    gz_path = path + COMPRESSED_EXTENSIONS["gzip"]
+    with open(gz_path, "wb") as raw, gzip.GzipFile(
+        filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0
+    ) as f:
+        f.write(content)
+    outputs.append(gz_path)
+
+    if brotli is not None:
+        br_path = path + COMPRESSED_EXTENSIONS["br"]
+        with open(br_path, "wb") as f:
+            f.write(brotli.compress(content, mode=brotli.MODE_TEXT))
+        outputs.append(br_path)
+
+    if remove_original:
+        os.remove(path)
+
+    return outputs
+
+
+def find_stored_file(path):
+    """
+    Return the paths of the stored variants of a file that may have been saved
+    precompressed, as a dict of content-encoding ("identity", "br", "gzip") -> path.
+    """
+
+    variants = {}
+    if os.path.exists(path):
+        variants["identity"] = path
+    for encoding, ext in COMPRESSED_EXTENSIONS.items():
+        if os.path.exists(path + ext):
+            variants[encoding] = path + ext
+
+    return variants
+
+
+def read_stored_file(variants):
+    """
+    Read the uncompressed content of a stored file from whichever of its variants (as
+    returned by `find_stored_file`) can be read here: the uncompressed file itself, the
+    gzip variant, or the brotli variant if the optional `brotli` package is installed.
+
+    Returns:
+        tuple: (content-encoding of the variant that was read, uncompressed bytes)
+
+    Raises:
+        LookupError: if no stored variant can be decompressed
+
+    """
+
+    if "identity" in variants:
+        with open(variants["identity"], "rb") as f:
+            return "identity", f.read()
+    if "gzip" in variants:
+        with gzip.open(variants["gzip"], "rb") as f:
+            return "gzip", f.read()
+    if "br" in variants and brotli is not None:
+        with open(variants["br"], "rb") as f:
+            return "br", brotli.decompress(f.read())
+
+    raise LookupError(f"no readable variant among {sorted(variants)}")
@@ -0,0 +1,181 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+"""
+Shared fixtures of the test suite. The CML-only `cml` and `cmlapi` modules are
+replaced with the offline stand-ins of the benchmark suite, so the tests run anywhere.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks import offline
+
+offline.install()
+
+from src.utils import TARGET, PREDICTION, NUM_FEATURES, CAT_FEATURES
+
+ZIPCODES = [98001 + i for i in range(40)]
+
+
+def make_records(n, seed=0):
+    """
+    Synthetic formatted model metrics: the logged features of n housing records, sold
+    over four months, with ground truths and predictions.
+    """
+
+    rng = np.random.default_rng(seed)
+    sqft_living = rng.integers(600, 5000, n)
+    df = pd.DataFrame(
+        {
+            "sqft_living": sqft_living,
+            "sqft_lot": rng.integers(1000, 20000, n),
+            "sqft_above": (sqft_living * rng.uniform(0.6, 1.0, n)).astype(np.int64),
+            "waterfront": rng.choice([0, 1], n, p=[0.95, 0.05]),
+            "zipcode": rng.choice(ZIPCODES, n),
+            "condition": rng.integers(1, 6, n),
+            "view": rng.integers(0, 5, n),
+            "bedrooms": rng.integers(1, 7, n),
+            "bathrooms": rng.choice([1.0, 1.5, 2.0, 2.5, 3.0, 3.5], n),
+            "date_sold": pd.Timestamp("2014-05-01")
+            + pd.to_timedelta(rng.integers(0, 120, n), unit="D"),
+        }
+    )
+    df[TARGET] = 50_000 + 200 * df.sqft_living + rng.normal(0, 20_000, n)
+    df[PREDICTION] = df[TARGET] * rng.uniform(0.85, 1.15, n)
+
+    return df[NUM_FEATURES + CAT_FEATURES + ["date_sold", TARGET, PREDICTION]]
+
+
+@pytest.fixture
+def records():
+    return make_records(3000)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run a test from an empty directory, for code that writes to relative paths."""
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class Response:
+    """A stand-in for the responses of the CML APIv2 client."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self
+
+    def to_dict(self):
+        return self.value
+
+
+class StubClient:
+    """A stand-in CML APIv2 client for a project with one deployed model, which counts
+    the calls made to each of its methods."""
+
+    def __init__(self):
+        self.calls = []
+
+    def list_models(self, **kwargs):
+        self.calls.append("list_models")
+        return Response(
+            {
+                "models": [
+                    {
+                        "name": "Price Regressor",
+                        "id": "model-id",
+                        "crn": "model-crn",
+                        "access_key": "access-key",
+                    }
+                ]
+            }
+        )
+
+    def list_model_builds(self, **kwargs):
+        return Response({"model_builds": [{"id": "build-id"}]})
+
+    def list_model_deployments(self, **kwargs):
+        self.calls.append("list_model_deployments")
+        return Response(
+            {
+                "model_deployments": [
+                    {"build_id": "build-id", "crn": "deployment-crn"},
+                    {"build_id": "old-build-id", "crn": "old-deployment-crn"},
+                ]
+            }
+        )
+
+    def get_project(self, project_id):
+        return Response({"id": project_id, "default_engine_type": "ml_runtime"})
+
+    def list_runtimes(self, **kwargs):
+        self.calls.append("list_runtimes")
+        return Response(
+            {
+                "runtimes": [
+                    {"full_version": "2023.05.1-b4", "image_identifier": "runtime-old"},
+                    {"full_version": "2023.08.2-b8", "image_identifier": "runtime-new"},
+                ]
+            }
+        )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Make cmlapi.default_client() return a StubClient."""
+
+    import cmlapi
+
+    stub = StubClient()
+    monkeypatch.setattr(cmlapi, "default_client", lambda: stub)
+    monkeypatch.setenv("CDSW_PROJECT_ID", "project-id")
+    monkeypatch.setenv("CDSW_API_URL", "https://ml.example.com/api/v1")
+
+    return stub
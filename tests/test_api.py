@@ -0,0 +1,97 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import time
+import pytest
+
+from src.api import ApiUtility, TTLCache, cache_key
+
+
+def test_equivalent_calls_share_a_cache_key():
+    def lookup(self, model_name, page=1):
+        pass
+
+    key = cache_key(lookup, ("Price Regressor",), {})
+    assert key == cache_key(lookup, (), {"model_name": "Price Regressor"})
+    assert key == cache_key(lookup, ("Price Regressor", 1), {})
+    assert key != cache_key(lookup, ("Price Regressor", 2), {})
+
+
+def test_cache_expires_entries_and_drops_failures():
+    cache, calls = TTLCache(), []
+
+    def lookup(value):
+        calls.append(value)
+        if value is None:
+            raise ValueError("lookup failed")
+        return value
+
+    assert cache.get(("lookup", 1), 60, lookup, 1) == 1
+    assert cache.get(("lookup", 1), 60, lookup, 1) == 1
+    assert calls == [1]
+
+    cache.get(("lookup", 2), 0, lookup, 2)
+    time.sleep(0.01)
+    cache.get(("lookup", 2), 0, lookup, 2)
+    assert calls == [1, 2, 2]
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.get(("lookup", None), 60, lookup, None)
+    assert calls == [1, 2, 2, None, None]
+
+
+def test_deployment_details_are_looked_up_once(client):
+    api = ApiUtility()
+
+    details = api.get_latest_deployment_details(model_name="Price Regressor")
+    assert api.get_latest_deployment_details("Price Regressor") == details
+    assert details["latest_build_id"] == "build-id"
+    assert details["latest_deployment_crn"] == "deployment-crn"
+    assert client.calls.count("list_models") == 1
+    assert client.calls.count("list_model_deployments") == 1
+
+    # the model outlives its deployment details in the cache
+    assert api.get_model("Price Regressor")["id"] == "model-id"
+    assert client.calls.count("list_models") == 1
+
+    # the runtime lookup was prefetched along with the deployment details
+    assert api.get_latest_standard_runtime() == "runtime-new"
+    assert client.calls.count("list_runtimes") == 1
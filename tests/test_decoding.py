@@ -0,0 +1,99 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+import pandas as pd
+
+from src.decoding import decode_metrics
+from src.utils import TARGET, PREDICTION
+
+
+def make_response(start, n, with_ground_truth=True):
+    """A metrics.read_metrics() response, in which every other record has been sold."""
+
+    records = []
+    for i in range(start, start + n):
+        metrics = {
+            "input_features": {"bedrooms": 3, "bathrooms": 2.5, "zipcode": 98001},
+            PREDICTION: 500_000.0 + i,
+            "challenger_predictions": {"retrained": 510_000.0 + i},
+        }
+        if with_ground_truth and i % 2:
+            metrics.update({TARGET: 505_000.0, "date_sold": "2014-11-03"})
+        records.append({"predictionUuid": f"uuid-{i}", "metrics": metrics})
+
+    return {"metrics": records}
+
+
+def test_decode_metrics_matches_json_normalize():
+    response = make_response(0, 6)
+
+    df = decode_metrics(response)
+    expected = pd.json_normalize(response["metrics"])
+
+    assert df.columns.tolist() == [
+        "bedrooms",
+        "bathrooms",
+        "zipcode",
+        PREDICTION,
+        "challenger_retrained",
+        TARGET,
+        "date_sold",
+        "predictionUuid",
+    ]
+    assert df.bedrooms.dtype == np.int64 and df.bathrooms.dtype == np.float64
+    np.testing.assert_array_equal(
+        df[TARGET].values, expected[f"metrics.{TARGET}"].astype(np.float64).values
+    )
+    assert df.predictionUuid.tolist() == expected.predictionUuid.tolist()
+
+
+def test_decode_metrics_concatenates_pages():
+    pages = [make_response(0, 4), lambda: make_response(4, 3, with_ground_truth=False)]
+
+    df = decode_metrics(iter(pages))
+
+    assert len(df) == 7
+    assert df.columns[-1] == "predictionUuid"
+    assert df[TARGET].isna().sum() == 5
+
+
+def test_decode_metrics_of_no_pages_is_empty():
+    assert decode_metrics(iter([])).columns.tolist() == ["predictionUuid"]
@@ -0,0 +1,79 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+
+from src.drift import population_stability_index, segmented_drift
+
+
+def test_psi_is_zero_for_identical_distributions():
+    counts = np.array([[10, 20, 30], [5, 5, 5]])
+    np.testing.assert_allclose(population_stability_index(counts, counts * 3), 0)
+
+
+def test_psi_grows_with_the_shift_between_distributions():
+    reference = np.array([25, 25, 25, 25])
+    psi = population_stability_index(
+        np.tile(reference, (3, 1)),
+        np.array([[25, 25, 25, 25], [30, 25, 25, 20], [70, 10, 10, 10]]),
+    )
+
+    assert psi[0] == 0
+    assert 0 < psi[1] < psi[2]
+
+
+def test_psi_is_nan_without_observations():
+    psi = population_stability_index(
+        np.array([[1, 2], [0, 0]]), np.array([[0, 0], [1, 2]])
+    )
+    assert np.isnan(psi).all()
+
+
+def test_segmented_drift_ranks_the_drifted_segment_first(records):
+    current = records.copy()
+    shifted = current.zipcode == 98001
+    current.loc[shifted, "sqft_living"] *= 3
+
+    ranked = segmented_drift(records, current)
+
+    top = ranked.iloc[0]
+    assert (top.segment_col, top.segment) == ("zipcode", 98001)
+    assert top.most_drifted_feature == "sqft_living"
+    assert ranked.mean_psi.is_monotonic_decreasing
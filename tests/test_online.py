@@ -0,0 +1,104 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+
+from src.online import DriftReference, OnlineDriftMonitor
+from src.utils import PREDICTION
+from conftest import make_records
+
+
+def make_monitor(records, **kwargs):
+    reference = DriftReference.from_frame(records, records[PREDICTION].values)
+    return OnlineDriftMonitor(reference, **kwargs)
+
+
+def test_reference_bins_hold_every_record(records):
+    reference = DriftReference.from_frame(records, records[PREDICTION].values)
+
+    for feature in reference.features:
+        assert sum(reference.counts[feature]) == len(records)
+    # one bin per zipcode, plus one for missing values and unseen zipcodes
+    assert reference.n_bins("zipcode") == records.zipcode.nunique() + 1
+
+
+def test_features_are_reported_once_their_bins_can_be_filled(records):
+    monitor = make_monitor(records, window=1000, min_records=100)
+    required = dict(zip(monitor.reference.features, monitor.required_records))
+    assert required["waterfront"] == 100
+    assert required["zipcode"] == 10 * monitor.reference.n_bins("zipcode")
+
+    current = make_records(required["zipcode"] - 1, seed=1)
+    monitor.update(current, current[PREDICTION].values)
+    status = monitor.status()
+
+    assert not status["ready"]
+    assert status["psi"]["zipcode"] is None
+    assert status["psi"]["waterfront"] is not None
+    assert status["drifted_features"] == []
+    assert status["dataset_drift"] is None
+
+
+def test_no_drift_is_flagged_for_records_like_the_reference(records):
+    monitor = make_monitor(records, window=1000)
+
+    current = make_records(1500, seed=1)
+    monitor.update(current, current[PREDICTION].values)
+    status = monitor.status()
+
+    assert status["ready"]
+    assert status["n_records"] == 1000 and status["n_seen"] == 1500
+    assert status["drifted_features"] == []
+    assert status["dataset_drift"] is False
+
+
+def test_drift_is_flagged_for_shifted_records(records):
+    monitor = make_monitor(records, window=1000)
+
+    current = make_records(1000, seed=1)
+    current[["sqft_living", "sqft_above", "sqft_lot"]] *= 2
+    current[PREDICTION] *= 2
+    current["bedrooms"] = np.minimum(current.bedrooms + 2, 6)
+    current["condition"] = 5
+    monitor.update(current, current[PREDICTION].values)
+    status = monitor.status()
+
+    assert {"sqft_living", "sqft_lot", PREDICTION} <= set(status["drifted_features"])
+    assert status["dataset_drift"] is True
@@ -0,0 +1,108 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+
+from src.performance import PerformanceTracker, OVERALL
+from src.sketch import QuantileSketch
+from src.utils import TARGET, PREDICTION
+
+
+def test_sketch_quantiles_are_within_relative_accuracy():
+    values = np.random.default_rng(0).normal(0, 1000, 10_000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.add(values)
+
+    ordered = np.sort(values)
+    for q in (0.05, 0.25, 0.5, 0.75, 0.95):
+        expected = ordered[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - expected) <= 0.011 * abs(expected) + 1e-9
+
+
+def test_merged_sketches_equal_a_sketch_of_all_values():
+    values = np.random.default_rng(1).normal(0, 10, 1000)
+    merged, full = QuantileSketch(), QuantileSketch()
+    for part in np.array_split(values, 3):
+        sketch = QuantileSketch()
+        sketch.add(part)
+        merged.merge(sketch)
+    full.add(values)
+
+    assert merged.count == full.count == len(values)
+    assert merged.to_dict() == QuantileSketch.from_dict(full.to_dict()).to_dict()
+
+
+def test_tracker_matches_metrics_computed_directly(records, workdir):
+    tracker = PerformanceTracker("build-a", segment_cols=["zipcode"])
+    tracker.update(records)
+
+    overall = tracker.query().set_index("segment").loc[OVERALL]
+    error = records[PREDICTION] - records[TARGET]
+    assert overall.n == len(records)
+    np.testing.assert_allclose(overall.mae, error.abs().mean())
+    np.testing.assert_allclose(overall.rmse, np.sqrt((error ** 2).mean()))
+
+    by_zipcode = tracker.query(segment_col="zipcode")
+    assert by_zipcode.n.sum() == len(records)
+
+
+def test_tracker_replaces_the_days_of_a_rerun_batch(records, workdir):
+    tracker = PerformanceTracker("build-a", segment_cols=["zipcode"])
+    tracker.update(records, replace=True)
+    tracker.save()
+
+    resumed = PerformanceTracker.load_or_create("build-a")
+    resumed.update(records, replace=True)
+
+    assert resumed.query().equals(tracker.query())
+    assert resumed.query(segment_col="zipcode").equals(
+        tracker.query(segment_col="zipcode")
+    )
+
+
+def test_trackers_of_different_builds_are_kept_apart(records, workdir):
+    tracker = PerformanceTracker("build-a", segment_cols=["zipcode"])
+    tracker.update(records)
+    tracker.save()
+
+    assert PerformanceTracker.load_or_create("build-b").stats == {}
+    assert PerformanceTracker.load_or_create("build-a").query().n.tolist() == [
+        len(records)
+    ]
@@ -0,0 +1,82 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+import pandas as pd
+
+from src.reference import ReferenceProfile
+from src.utils import save_frame, load_frame, prepare_report_data
+
+
+def test_reference_profiles_are_saved_and_loaded_per_model_build(records, tmp_path):
+    directory = str(tmp_path / "reference")
+    profile = ReferenceProfile.from_metrics_df("build-a", records, directory=directory)
+
+    assert not ReferenceProfile.exists("build-a", directory=directory)
+    path = profile.save()
+
+    assert path == ReferenceProfile.get_path("build-a", directory=directory)
+    assert ReferenceProfile.exists("build-a", directory=directory)
+    assert not ReferenceProfile.exists("build-b", directory=directory)
+
+    loaded = ReferenceProfile.load("build-a", directory=directory)
+    assert len(loaded) == len(records)
+    pd.testing.assert_frame_equal(
+        loaded.data, prepare_report_data(records), check_freq=False
+    )
+
+
+def test_saved_frames_keep_missing_values_of_object_columns(tmp_path):
+    df = pd.DataFrame(
+        {
+            "key": np.array(["a", None, "c"], dtype=object),
+            "value": [1.0, np.nan, 3.0],
+        },
+        index=pd.Index([10, 20, 30], name="id"),
+    )
+    path = str(tmp_path / "frame.npz")
+
+    save_frame(df, path)
+    loaded = load_frame(path)
+
+    assert loaded.key.isna().tolist() == [False, True, False]
+    assert loaded.key.dropna().tolist() == ["a", "c"]
+    np.testing.assert_array_equal(loaded.value.values, df.value.values)
+    assert loaded.index.tolist() == [10, 20, 30] and loaded.index.name == "id"
@@ -0,0 +1,160 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import os
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.special
+from sklearn.compose import ColumnTransformer, TransformedTargetRegressor
+from sklearn.linear_model import Ridge
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from src.challengers import ShadowScorer
+from src.retraining import RidgeStatistics, Retrainer
+from src.schema import INPUT_COLUMNS
+from src.utils import TARGET, NUM_FEATURES
+
+
+def make_model(records, columns=NUM_FEATURES, alpha=1.0):
+    """A fitted pipeline shaped like src.training.make_pipeline()."""
+
+    model = Pipeline(
+        steps=[
+            (
+                "preprocess",
+                ColumnTransformer(
+                    transformers=[("numerical", StandardScaler(), list(columns))]
+                ),
+            ),
+            (
+                "model",
+                TransformedTargetRegressor(
+                    regressor=Ridge(alpha=alpha),
+                    func=np.log10,
+                    inverse_func=scipy.special.exp10,
+                ),
+            ),
+        ]
+    )
+    X = records.reindex(columns=INPUT_COLUMNS).assign(lat=47.5)
+    return model.fit(X, records[TARGET])
+
+
+def test_statistics_solve_the_ridge_regression_of_a_window():
+    rng = np.random.default_rng(0)
+    X, y = rng.normal(size=(500, 4)), rng.normal(size=500)
+    dates = pd.Series(
+        pd.Timestamp("2014-05-01") + pd.to_timedelta(np.arange(500) % 50, "D")
+    )
+
+    stats = RidgeStatistics(n_features=4)
+    stats.update(X, y, dates)
+    coef, intercept, n = stats.solve(alpha=2.0, start="2014-05-11", end="2014-06-01")
+
+    window = ((dates >= "2014-05-11") & (dates < "2014-06-01")).values
+    ridge = Ridge(alpha=2.0).fit(X[window], y[window])
+    assert n == window.sum()
+    np.testing.assert_allclose(coef, ridge.coef_)
+    np.testing.assert_allclose(intercept, ridge.intercept_)
+
+
+def test_statistics_replace_rerun_days_and_survive_a_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    X, y = rng.normal(size=(100, 3)), rng.normal(size=100)
+    dates = pd.Series(
+        pd.Timestamp("2014-05-01") + pd.to_timedelta(np.arange(100) % 10, "D")
+    )
+
+    stats = RidgeStatistics(n_features=3)
+    stats.update(X, y, dates, replace=True)
+    stats.update(X, y, dates, replace=True)
+    assert len(stats) == 100
+
+    path = str(tmp_path / "stats.npz")
+    stats.save(path)
+    loaded = RidgeStatistics.load(path)
+    for expected, actual in zip(stats.solve(1.0), loaded.solve(1.0)):
+        np.testing.assert_allclose(expected, actual)
+
+
+def test_retrained_model_is_saved_as_a_challenger_of_the_champion(
+    records, workdir, monkeypatch
+):
+    with open("model.pkl", "wb") as f:
+        pickle.dump(make_model(records), f)
+    retrainer = Retrainer.from_model_file(
+        "build-id", directory="retraining", model_dir="challengers"
+    )
+    retrainer.update(records)
+    assert len(retrainer.stats) == len(records)
+
+    # refitting on every record reproduces the deployed model's regression
+    model, n = retrainer.refit()
+    regressor = model.steps[-1][1].regressor_
+    np.testing.assert_allclose(
+        regressor.coef_, retrainer.regressor.regressor_.coef_, rtol=1e-6
+    )
+
+    monkeypatch.setattr(retrainer, "check_triggers", lambda profiles: ["dataset_drift"])
+    date_range = (pd.Timestamp("2014-05-01"), pd.Timestamp("2014-09-01"))
+    path = retrainer.maybe_retrain({}, date_range)
+
+    assert os.path.dirname(path) == "challengers"
+    assert os.path.exists(os.path.join("retraining", "retraining_log.jsonl"))
+
+    # a later retrain replaces the build's challenger rather than adding another
+    date_range = (pd.Timestamp("2014-06-01"), pd.Timestamp("2014-09-01"))
+    assert retrainer.maybe_retrain({}, date_range) == path
+    assert os.listdir("challengers") == [os.path.basename(path)]
+
+    with open("model.pkl", "rb") as f:
+        scorer = ShadowScorer.from_directory(pickle.load(f), directory="challengers")
+    assert len(scorer.groups) == 1
+    assert len(scorer.groups[0][1]) == 2
+
+
+def test_retrainer_rejects_models_using_unlogged_features(records):
+    model = make_model(records, columns=NUM_FEATURES + ["lat"])
+
+    with pytest.raises(ValueError, match="lat"):
+        Retrainer("build-id", model)
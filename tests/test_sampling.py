@@ -0,0 +1,82 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+import pandas as pd
+
+from src.sampling import allocate, sample_frame
+
+
+def test_allocate_is_proportional_and_exact():
+    allocation = allocate(pd.Series({"a": 50, "b": 30, "c": 20}), 9)
+
+    assert allocation.sum() == 9
+    assert allocation.to_dict() == {"a": 4, "b": 3, "c": 2}
+
+
+def test_stratified_sample_matches_the_strata_proportions(records):
+    sample = sample_frame(records, 300, strata="zipcode")
+
+    assert len(sample) == 300
+    assert sample.index.is_monotonic_increasing
+    expected = allocate(records.zipcode.value_counts().sort_index(), 300)
+    assert sample.zipcode.value_counts().reindex(expected.index).equals(expected)
+
+
+def test_sample_is_reproducible_and_independent_of_chunking(records):
+    whole = sample_frame(records, 200, strata="zipcode", seed=7)
+    chunked = sample_frame(records, 200, strata="zipcode", seed=7, chunk_rows=500)
+
+    assert whole.equals(sample_frame(records, 200, strata="zipcode", seed=7))
+    assert len(chunked) == 200
+    assert chunked.zipcode.value_counts().equals(whole.zipcode.value_counts())
+
+
+def test_records_without_weight_are_never_sampled(records):
+    weighted = records.assign(weight=np.where(records.waterfront == 1, 0.0, 1.0))
+
+    sample = sample_frame(weighted, 500, weights="weight")
+
+    assert len(sample) == 500
+    assert (sample.waterfront == 0).all()
+
+
+def test_sample_of_a_small_frame_holds_every_record(records):
+    assert sample_frame(records.iloc[:50], 100).equals(records.iloc[:50])
@@ -0,0 +1,77 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from src.significance import drift_significance
+
+
+def test_drift_significance_is_reproducible(records):
+    reference, current = records.iloc[:2000], records.iloc[2000:]
+
+    first = drift_significance(reference, current, n_resamples=200, n_jobs=1)
+    second = drift_significance(reference, current, n_resamples=200, n_jobs=1)
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_drift_significance_does_not_depend_on_the_pool(records):
+    reference, current = records.iloc[:2000], records.iloc[2000:]
+
+    serial = drift_significance(reference, current, n_resamples=200, n_jobs=1)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        shared = drift_significance(
+            reference, current, n_resamples=200, executor=executor
+        )
+
+    pd.testing.assert_frame_equal(serial, shared)
+
+
+def test_drift_significance_detects_a_shifted_feature(records):
+    reference, current = records.iloc[:2000], records.iloc[2000:].copy()
+    current["sqft_lot"] = current.sqft_lot * 1.5
+
+    result = drift_significance(
+        reference, current, n_resamples=200, n_jobs=1
+    ).set_index("feature")
+
+    assert result.loc["sqft_lot", "p_value"] < 0.01
+    assert result.drop(index="sqft_lot").p_value.min() > 0.01
@@ -0,0 +1,69 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import pytest
+import pandas as pd
+
+from src.timeseries import MetricsStore
+
+
+def make_metrics(n):
+    starts = pd.date_range("2014-05-01", periods=n, freq="7D")
+    return pd.DataFrame(
+        {
+            "key": [f"batch-{i}" for i in range(n)],
+            "start": starts.strftime("%Y-%m-%d"),
+            "end": (starts + pd.Timedelta(days=7)).strftime("%Y-%m-%d"),
+            "mean_abs_error": [float(i) for i in range(n)],
+        }
+    )
+
+
+def test_query_averages_consecutive_batches_down_to_max_points():
+    result = MetricsStore.query(make_metrics(6), ["mean_abs_error"], max_points=3)
+
+    assert result["series"]["mean_abs_error"] == [0.5, 2.5, 4.5]
+    assert result["start"] == ["2014-05-01", "2014-05-15", "2014-05-29"]
+    assert result["end"] == ["2014-05-15", "2014-05-29", "2014-06-12"]
+
+
+def test_query_rejects_fewer_than_one_point():
+    with pytest.raises(ValueError):
+        MetricsStore.query(make_metrics(6), ["mean_abs_error"], max_points=0)
@@ -0,0 +1,94 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import pytest
+import numpy as np
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV
+
+from src.utils import TARGET
+from src.training import ridge_path, make_pipeline, RidgePathSearch, NUM_COLS, CAT_COLS
+from conftest import make_records
+
+
+def test_ridge_path_matches_ridge_for_each_alpha():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, 8))
+    y = X @ rng.normal(size=8) + rng.normal(0, 0.1, 200) + 3
+    alphas = np.array([0.01, 1.0, 100.0])
+
+    coefs, intercepts = ridge_path(X, y, alphas)
+
+    for i, alpha in enumerate(alphas):
+        ridge = Ridge(alpha=alpha).fit(X, y)
+        np.testing.assert_allclose(coefs[:, i], ridge.coef_, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(intercepts[i], ridge.intercept_, rtol=1e-6)
+
+
+@pytest.mark.parametrize("n_jobs", [None, 2])
+def test_ridge_path_search_matches_grid_search(n_jobs):
+    df = make_records(600)
+    X, y = df[NUM_COLS + CAT_COLS], df[TARGET]
+    alphas = np.arange(0.1, 1, 0.1)
+
+    grid = GridSearchCV(
+        make_pipeline(),
+        {"model__regressor__alpha": alphas},
+        cv=5,
+        scoring="neg_mean_absolute_error",
+    ).fit(X, y)
+    search = RidgePathSearch(make_pipeline(), alphas, cv=5, n_jobs=n_jobs).fit(X, y)
+
+    assert search.best_params_ == grid.best_params_
+    assert search.best_score_ == pytest.approx(grid.best_score_, rel=1e-6)
+    np.testing.assert_allclose(
+        search.cv_results_["mean_test_score"],
+        grid.cv_results_["mean_test_score"],
+        rtol=1e-6,
+    )
+    np.testing.assert_array_equal(
+        search.cv_results_["rank_test_score"], grid.cv_results_["rank_test_score"]
+    )
+    assert search.best_estimator_.get_params()["model__regressor__alpha"] == (
+        grid.best_estimator_.get_params()["model__regressor__alpha"]
+    )
+    np.testing.assert_allclose(
+        search.best_estimator_.predict(X), grid.best_estimator_.predict(X), rtol=1e-9
+    )
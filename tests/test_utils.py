@@ -0,0 +1,103 @@
+# ###########################################################################
+#
+#  CLOUDERA APPLIED MACHINE LEARNING PROTOTYPE (AMP)
+#  (C) Cloudera, Inc. 2021
+#  All rights reserved.
+#
+#  Applicable Open Source License: Apache 2.0
+#
+#  NOTE: Cloudera open source products are modular software products
+#  made up of hundreds of individual components, each of which was
+#  individually copyrighted.  Each Cloudera open source product is a
+#  collective work under U.S. Copyright Law. Your license to use the
+#  collective work is as provided in your written agreement with
+#  Cloudera.  Used apart from the collective work, this file is
+#  licensed for your use pursuant to the open source license
+#  identified above.
+#
+#  This code is provided to you pursuant a written agreement with
+#  (i) Cloudera, Inc. or (ii) a third-party authorized to distribute
+#  this code. If you do not have a written agreement with Cloudera nor
+#  with an authorized and properly licensed third party, you do not
+#  have any rights to access nor to use this code.
+#
+#  Absent a written agreement with Cloudera, Inc. (“Cloudera”) to the
+#  contrary, A) CLOUDERA PROVIDES THIS CODE TO YOU WITHOUT WARRANTIES OF ANY
+#  KIND; (B) CLOUDERA DISCLAIMS ANY AND ALL EXPRESS AND IMPLIED
+#  WARRANTIES WITH RESPECT TO THIS CODE, INCLUDING BUT NOT LIMITED TO
+#  IMPLIED WARRANTIES OF TITLE, NON-INFRINGEMENT, MERCHANTABILITY AND
+#  FITNESS FOR A PARTICULAR PURPOSE; (C) CLOUDERA IS NOT LIABLE TO YOU,
+#  AND WILL NOT DEFEND, INDEMNIFY, NOR HOLD YOU HARMLESS FOR ANY CLAIMS
+#  ARISING FROM OR RELATED TO THE CODE; AND (D)WITH RESPECT TO YOUR EXERCISE
+#  OF ANY RIGHTS GRANTED TO YOU FOR THE CODE, CLOUDERA IS NOT LIABLE FOR ANY
+#  DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, PUNITIVE OR
+#  CONSEQUENTIAL DAMAGES INCLUDING, BUT NOT LIMITED TO, DAMAGES
+#  RELATED TO LOST REVENUE, LOST PROFITS, LOSS OF INCOME, LOSS OF
+#  BUSINESS ADVANTAGE OR UNAVAILABILITY, OR LOSS OR CORRUPTION OF
+#  DATA.
+#
+# ###########################################################################
+
+import numpy as np
+import pandas as pd
+
+from src.schema import apply_schema
+from src.utils import (
+    save_partitioned,
+    load_partitioned,
+    merge_partitioned,
+    load_partition_metadata,
+)
+
+
+def test_merged_datasets_equal_a_dataset_of_all_records(records, tmp_path):
+    records = records[["zipcode", "sqft_living", "date_sold"]]
+    parts = np.array_split(np.arange(len(records)), 3)
+    paths = []
+    for i, part in enumerate(parts):
+        paths.append(str(tmp_path / f"part-{i}"))
+        save_partitioned(records.iloc[part], paths[-1])
+
+    merged = str(tmp_path / "merged")
+    n_rows = merge_partitioned(
+        paths, merged, date_range=(None, "2014-08-01"), prepare=apply_schema
+    )
+
+    expected = apply_schema(records[records.date_sold < "2014-08-01"]).sort_values(
+        "date_sold", kind="mergesort"
+    )
+    loaded = load_partitioned(merged)
+    assert n_rows == len(expected)
+    pd.testing.assert_frame_equal(loaded, expected.reset_index(drop=True))
+    assert load_partition_metadata(merged)["dtypes"]["zipcode"] == "category"
+    assert [p["key"] for p in load_partition_metadata(merged)["partitions"]] == [
+        "2014-05",
+        "2014-06",
+        "2014-07",
+    ]
+
+
+def test_partitioned_datasets_keep_missing_values_of_string_columns(tmp_path):
+    df = pd.DataFrame(
+        {
+            "city": np.array(["Seattle", None, "Kent", np.nan], dtype=object),
+            "grade": pd.Categorical(["A", np.nan, "B", "A"]),
+            "price": [1.0, np.nan, 3.0, 4.0],
+            "date_sold": pd.to_datetime(
+                ["2014-05-02", "2014-05-20", "2014-06-03", "2014-06-30"]
+            ),
+        }
+    )
+    path = str(tmp_path / "dataset")
+
+    save_partitioned(df, path)
+    loaded = load_partitioned(path)
+
+    assert loaded.city.isna().tolist() == [False, True, False, True]
+    assert loaded.grade.isna().tolist() == [False, True, False, False]
+    assert "nan" not in loaded.grade.cat.categories
+    pd.testing.assert_frame_equal(loaded, df, check_dtype=False)
+
+    # masks of missing values follow row filters
+    june = load_partitioned(path, date_range=("2014-06-10", None))
+    assert june.city.isna().tolist() == [True]